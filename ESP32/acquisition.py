@@ -0,0 +1,93 @@
+import utime
+import uasyncio
+from machine import Pin
+
+# Time between FIFO reads in ms if no interrupt pin is used.
+poll_period = 50
+
+
+class Acquisition:
+    def __init__(self, sensor, pin=None, flag=None):
+        """
+        Initiation of Acquisition class responsible for waking main loop up when sensor has samples to read. If 'pin'
+        connected to INT output of sensor is given, FIFO almost full interrupt is enabled and FIFO is read only after
+        it occurs. Pin interrupt handler only sets 'flag', uasyncio.ThreadSafeFlag by default, so it allocates nothing.
+        Without pin FIFO is polled every poll_period ms.
+        """
+        self.sensor = sensor
+        self.pin = pin
+
+        # Amount of reads, interrupts which woke the loop up, and waits which timed out.
+        self.reads = 0
+        self.interrupts = 0
+        self.timeouts = 0
+
+        # Time of the last interrupt in us ticks, and the longest and total time in us from interrupt until the loop
+        # woke up by it ran. It is how late FIFO is read, e.g. while other tasks block the loop.
+        self.interrupt_time = 0
+        self.latency_max = 0
+        self.latency_total = 0
+        # Time in us from interrupt until the last wake up by it, None if the last wait timed out or no pin is used.
+        self.latency = None
+
+        if pin is not None:
+            self.flag = uasyncio.ThreadSafeFlag() if flag is None else flag
+            # INT output is open drain and active low.
+            pin.init(Pin.IN, Pin.PULL_UP)
+            pin.irq(trigger=Pin.IRQ_FALLING, handler=self.interrupt)
+            sensor.enable_fifo_interrupt()
+
+    def interrupt(self, pin):
+        """
+        Pin interrupt handler. Remember when it came and wake the loop up.
+        """
+        self.interrupt_time = utime.ticks_us()
+        self.flag.set()
+
+    async def wait(self):
+        """
+        Wait until samples are ready to read.
+        """
+        self.latency = None
+        if self.pin is None:
+            await uasyncio.sleep_ms(poll_period)
+            return
+        # FIFO is read anyway if no interrupt came in twice the time it takes to fill up to almost full level. It
+        # happens only if any interrupt was missed. It is counted every time, as sensor profile sets sample period.
+        sensor = self.sensor
+        timeout = 2 * sensor.almost_full * sensor.sample_period // 1000
+        try:
+            await uasyncio.wait_for_ms(self.flag.wait(), timeout)
+            self.interrupts += 1
+            latency = utime.ticks_diff(utime.ticks_us(), self.interrupt_time)
+            self.latency = latency
+            self.latency_total += latency
+            if latency > self.latency_max:
+                self.latency_max = latency
+        except uasyncio.TimeoutError:
+            self.timeouts += 1
+        # Clear interrupts, so the next one makes INT output fall again.
+        self.sensor.read_interrupt_status()
+
+    def timing(self):
+        """
+        Get amount of wake ups by interrupt, and the longest and mean time in us from interrupt until the loop ran.
+        """
+        mean = self.latency_total // max(self.interrupts, 1)
+        return {'wakeups': self.interrupts, 'latency_max': self.latency_max, 'latency_mean': mean}
+
+    async def read(self, red_buf, ir_buf, time_buf, origin):
+        """
+        Wait until samples are ready, then read all of them into given buffors, timed in ms since 'origin' ticks. See
+        Max30102.read_samples. Return amount of samples read.
+        """
+        await self.wait()
+        return self.read_now(red_buf, ir_buf, time_buf, origin)
+
+    def read_now(self, red_buf, ir_buf, time_buf, origin):
+        """
+        Read all samples ready into given buffors, without waiting. See read.
+        """
+        self.reads += 1
+        now = utime.ticks_diff(utime.ticks_ms(), origin)
+        return self.sensor.read_samples(red_buf, ir_buf, time_buf, now)
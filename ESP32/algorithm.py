@@ -1,4 +1,7 @@
 import mathfunctions as math
+from array import array
+from buffers import RingBuffer, MovingAverage
+from profiler import Profiler
 
 # Indexes of specified samples types.
 IR = -1
@@ -10,13 +13,34 @@ TIME_PREVIOUS = -6
 # Previous sample of ir equals to ir-2, previous sample of red equals to red-2, and previous sample of time equals to
 # time-1.
 
+# Signals processed for every sample, IR first. Kept as constant tuple, so iterating them allocates nothing.
+SIGNALS = (IR, RED)
+
+# Block ingestion settings, in ms. Samples read at full sensor rate are smoothed by moving average of SMOOTHING_TIME,
+# and each one is compared with the sample taken COMPARE_TIME before to detect edges. Both are turned into the nearest
+# amount of samples for every sample rate. Every sample is checked for an extremum, not one in 50 ms as main loop did,
+# so comparing samples only 50 ms apart made noise give false beats, with more of them the higher the rate was. These
+# times keep detection error at or below the one of burst mean path from 25 to 400 sps (see Host/bench_block.py).
+SMOOTHING_TIME = 275
+COMPARE_TIME = 125
+
+# Stages of algorithm counted by profiler. Setup is called on every reset of measure.
+PROFILED_STAGES = ('reorder_samples', 'detect_edge', 'detect_extremum', 'detect_heartbeat', 'try_to_count_spo2',
+                   'setup')
+
 
 class HrSpOalgorithm:
-    def __init__(self):
+    def __init__(self, profile=False):
         """
         Initiation of HrSpOalgorithm responsible for calculation hr and spo2 based on readings from IR and RED leds.
         Variables declared in __init__ are overwritten through algorithm work, so they can be declared only once.
+
+        If 'profile' is set, calls and time of every stage are counted by profiler, see PROFILED_STAGES.
         """
+        # Buffors with last 10 collected bpm and spo2 values. They are cleared in place by setup().
+        self.bpm_buf = RingBuffer(10)
+        self.spo_buf = RingBuffer(10)
+
         self.setup()
 
         # Rising and falling edge flags.
@@ -49,6 +73,15 @@ class HrSpOalgorithm:
 
         # New values flag.
         self.new_values = False
+        # Result slots of count_hr_spo_block: new values flag, bpm and spo2. The same list is refilled on every call.
+        self.result = [False, 0, 0]
+
+        # Profiler of algorithm stages. Stage methods are replaced by counting ones only if profiling is on, so there
+        # is no overhead otherwise.
+        self.profiler = None
+        if profile:
+            self.profiler = Profiler(PROFILED_STAGES)
+            self.profiler.wrap(self)
 
     def setup(self):
         """
@@ -64,7 +97,7 @@ class HrSpOalgorithm:
         self.bpm = 0
 
         # Buffor with collected bpm values.
-        self.bpm_buf = []
+        self.bpm_buf.reset()
 
         # Beat time. [-1] is present one, [-2] is previous one.
         self.beat_time = 2 * [0]
@@ -73,7 +106,7 @@ class HrSpOalgorithm:
         self.spo = 0
 
         # Buffor with collected spo2 values.
-        self.spo_buf = []
+        self.spo_buf.reset()
 
         # Buffors with true local maximums and minimums and their times. True extremum is a local extremum of signal
         # waveform, not caused by body shake or any other, unexpected change of value
@@ -146,7 +179,9 @@ class HrSpOalgorithm:
         """
         nom = self.local_min[i-2] - self.local_min[i]
         denom = self.local_min_time[i-2] - self.local_min_time[i]
-        dc = (nom / denom) * self.local_max_time[i] + (self.local_min[i-2] - (nom / denom) * self.local_min_time[i-2])
+        # Slope is divided once and used twice, so one float object less is made.
+        slope = nom / denom
+        dc = slope * self.local_max_time[i] + (self.local_min[i-2] - slope * self.local_min_time[i-2])
         return dc
 
     @staticmethod
@@ -171,14 +206,11 @@ class HrSpOalgorithm:
             self.beat_time[-2] = self.beat_time[-1]
             self.beats += 1
             if self.beats > 1:
-                # If more than one beat collected append the bpm buffor with this value.
+                # If more than one beat collected append the bpm buffor with this value. It keeps last 10 values only.
                 self.bpm_buf.append(bpm)
-                if len(self.bpm_buf) > 10:
-                    # If more than 10 values collected, reject the oldest one.
-                    self.bpm_buf = self.bpm_buf[1::]
                 # Calculate bpm value as a mean of last 2-10 values gotten. It lowers impact of incorrect
                 # values gotten. Set beat and new values flag as true.
-                self.bpm = int(math.mean(self.bpm_buf))
+                self.bpm = int(self.bpm_buf.mean())
                 self.new_values = True
                 self.beat = True
             else:
@@ -217,14 +249,11 @@ class HrSpOalgorithm:
         """
         spo = 104 - 17 * self.r
         if 100 > spo > 60:
-            # Spo can not be higher than 100. Value lower than 60 is likely unlikely.
+            # Spo can not be higher than 100. Value lower than 60 is likely unlikely. Spo2 buffor keeps last 10 values.
             self.spo_buf.append(spo)
-            if len(self.spo_buf) > 10:
-                # If more than 10 values collected, reject the oldest one.
-                self.spo_buf = self.spo_buf[1::]
             # Calculate spo2 value as a mean of last 2-10 values gotten, and round it to two decimals.
             # Set beat flag as False.
-            self.spo = round(math.mean(self.spo_buf), 2)
+            self.spo = round(self.spo_buf.mean(), 2)
             self.beat = False
 
     def try_to_count_spo2(self, signal):
@@ -253,12 +282,12 @@ class HrSpOalgorithm:
                 # Two local minimums have to be detected to corrcetly count spo2 value.
                 pass
 
-    def count_hr_spo(self, ir_value, red_value, time_value):
-        """ Main algorithm responsible for all calculations."""
-        self.new_values = False
-        self.reorder_samples(ir_value, red_value, time_value)
+    def process_sample(self):
+        """
+        Detect edges, extremums, heartbeat and spo2 for samples placed in samples buffor.
+        """
         # Calculations are made for both of signals.
-        for signal in [IR, RED]:
+        for signal in SIGNALS:
             # Try to detect any edge and any extremum.
             self.detect_edge(signal)
             self.detect_extremum(signal)
@@ -271,4 +300,87 @@ class HrSpOalgorithm:
                     continue
             self.try_to_count_spo2(signal)
 
-        return self.new_values, self.bpm, self.spo
\ No newline at end of file
+    def count_hr_spo(self, ir_value, red_value, time_value):
+        """ Main algorithm responsible for all calculations."""
+        self.new_values = False
+        self.reorder_samples(ir_value, red_value, time_value)
+        self.process_sample()
+
+        return self.new_values, self.bpm, self.spo
+
+    def set_sample_period(self, period):
+        """
+        Prepare block ingestion of samples read from sensor every 'period' us. Moving average and compared samples
+        buffors are made once here, so count_hr_spo_block allocates no buffors.
+        """
+        n = max(1, (SMOOTHING_TIME * 1000 + period // 2) // period)
+        self.lag = max(1, (COMPARE_TIME * 1000 + period // 2) // period)
+        self.ir_average = MovingAverage(n)
+        self.red_average = MovingAverage(n)
+        # Moving average is late by half of its length, so time of each sample is moved back by the same time.
+        self.delay = (n - 1) * period // 2000
+        # Last 'lag' smoothed samples of each signal. The oldest one is compared with present sample.
+        self.ir_history = array('i', self.lag * [0])
+        self.red_history = array('i', self.lag * [0])
+        self.history_index = 0
+
+    def shift_time(self, shift):
+        """
+        Move times of samples, extremums and beats back by 'shift' ms, after origin they are counted from was moved on
+        by it, so measure goes on.
+        """
+        sample = self.sample
+        sample[TIME] -= shift
+        sample[TIME_PREVIOUS] -= shift
+        for times in (self.beat_time, self.local_max_time, self.local_min_time):
+            for i in range(len(times)):
+                times[i] -= shift
+
+    def count_hr_spo_block(self, ir_values, red_values, time_values, count):
+        """
+        Process block of 'count' samples read from sensor FIFO at once, each one with its own time in ms. Every sample
+        is smoothed and compared with the one taken COMPARE_TIME ms before, so extremums and beats are timed with
+        sensor sample resolution. set_sample_period() has to be called first. Return the same values as count_hr_spo,
+        after the last sample of block, in result list which is filled in place on every call, so no tuple is made.
+        New values flag is set if any sample of block gave new values. Samples raising ZeroDivisionError are skipped,
+        the same way main loop skips them.
+        """
+        ir_average = self.ir_average
+        red_average = self.red_average
+        ir_history = self.ir_history
+        red_history = self.red_history
+        new = False
+        for i in range(count):
+            ir_value = ir_average.update(ir_values[i])
+            red_value = red_average.update(red_values[i])
+            if not ir_average.ready():
+                continue
+
+            # Samples buffor is made again by setup(), so it can not be kept aside for the whole block.
+            sample = self.sample
+            j = self.history_index
+            sample[TIME_PREVIOUS] = sample[TIME]
+            sample[IR_PREVIOUS] = ir_history[j]
+            sample[RED_PREVIOUS] = red_history[j]
+            sample[IR] = ir_value
+            sample[RED] = red_value
+            sample[TIME] = time_values[i] - self.delay
+            ir_history[j] = ir_value
+            red_history[j] = red_value
+            j += 1
+            self.history_index = 0 if j == self.lag else j
+
+            self.new_values = False
+            try:
+                self.process_sample()
+            except ZeroDivisionError:
+                continue
+            if self.new_values:
+                new = True
+
+        self.new_values = new
+        result = self.result
+        result[0] = new
+        result[1] = self.bpm
+        result[2] = self.spo
+        return result
@@ -0,0 +1,100 @@
+import utime
+
+# Offset of local time from UTC in s. Central European Time is UTC+1, summer time is UTC+2 (7200).
+timezone_offset = 3600
+
+# Clock anchor is moved on once a day, so time since anchor is always counted within ticks_ms range. Origin samples
+# are timed from is moved on by the same period, as ticks_diff wraps once 2^29 ms (about 6 days) passed since it.
+anchor_period = 86400
+
+# Seconds from Unix epoch (1970) to epoch utime counts from, 2000 on MicroPython ports (localtime keeps UTC there, so it
+# works as gmtime, which v1.13 lacks). Clock keeps Unix epoch seconds, the ones PC app reads from data sent.
+unix_offset = 946684800 if utime.localtime(0)[0] == 2000 else 0
+
+# Strings shown before clock is set.
+no_time = '--------'
+no_date = '----------'
+
+
+class Clock:
+    def __init__(self, offset=timezone_offset):
+        """
+        Initiation of Clock class keeping present time as epoch seconds of its anchor and ticks_ms since then, so RTC
+        is read only once. Local time is UTC moved by 'offset' s. Time (hh:mm:ss) and date (dd.mm.yyyy) strings are
+        made again only when the second or the day changes.
+        """
+        self.offset = offset
+
+        # Unix epoch seconds (UTC) of the anchor and ticks_ms it was taken at. None until clock is set.
+        self.epoch = None
+        self.anchor = 0
+
+        # Ticks_ms clock was set at and its Unix epoch seconds. Samples are timed in ms since origin, so their time is
+        # origin_epoch * 1000 plus their own one, with no strings made.
+        self.origin = utime.ticks_ms()
+        self.origin_epoch = None
+
+        # Local second and day strings were made for.
+        self.second = None
+        self.day = None
+        self.time = no_time
+        self.date = no_date
+
+    def set(self):
+        """
+        Anchor clock at RTC time, set to UTC by ntptime.settime. RTC counts whole seconds, so anchor is taken just as
+        its second changes, which takes up to 1 s.
+        """
+        second = utime.time()
+        while utime.time() == second:
+            utime.sleep_ms(1)
+        self.anchor = utime.ticks_ms()
+        self.epoch = second + 1 + unix_offset
+        self.origin = self.anchor
+        self.origin_epoch = self.epoch
+
+    def origin_due(self, now=None):
+        """
+        Check if origin has to be moved on, as anchor_period s passed since it. 'now' is present ticks_ms.
+        """
+        if now is None:
+            now = utime.ticks_ms()
+        return utime.ticks_diff(now, self.origin) >= anchor_period * 1000
+
+    def move_origin(self):
+        """
+        Move origin on by anchor_period s, together with its epoch seconds if clock is set. Return amount of ms it was
+        moved by, so times counted from the old origin can be moved back by it.
+        """
+        shift = anchor_period * 1000
+        self.origin = utime.ticks_add(self.origin, shift)
+        if self.origin_epoch is not None:
+            self.origin_epoch += anchor_period
+        return shift
+
+    def update(self, now=None):
+        """
+        Bring time and date strings up to present time. 'now' is present ticks_ms. Return True if time string changed.
+        """
+        if self.epoch is None:
+            return False
+        if now is None:
+            now = utime.ticks_ms()
+        elapsed = utime.ticks_diff(now, self.anchor)
+        if elapsed >= anchor_period * 1000:
+            self.anchor = utime.ticks_add(self.anchor, anchor_period * 1000)
+            self.epoch += anchor_period
+            elapsed -= anchor_period * 1000
+        local = self.epoch + elapsed // 1000 + self.offset
+        if local == self.second:
+            return False
+        self.second = local
+
+        seconds = local % 86400
+        self.time = '%02d:%02d:%02d' % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+        day = local // 86400
+        if day != self.day:
+            self.day = day
+            y, m, d = utime.localtime(day * 86400 - unix_offset)[0:3]
+            self.date = '%02d.%02d.%d' % (d, m, y)
+        return True
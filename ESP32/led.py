@@ -1,4 +1,4 @@
-import utime
+import uasyncio
 from machine import Pin
 
 class Led():
@@ -8,10 +8,10 @@ class Led():
         """
         self.led = Pin(2, Pin.OUT)
 
-    def toggle(self):
+    async def blink(self):
         """
-        Turn on the led just for 1ms.
+        Turn on the led just for 2ms. Other tasks run meanwhile.
         """
         self.led(1)
-        utime.sleep_ms(2)
+        await uasyncio.sleep_ms(2)
         self.led(0)
\ No newline at end of file
@@ -0,0 +1,88 @@
+import utime
+from array import array
+
+# Upper bounds of histogram buckets in us. The last bucket counts everything above the last bound.
+bounds = (250, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+# Names of histograms kept by Metrics, in order they are published.
+names = ('iteration', 'overshoot', 'i2c', 'flush', 'publish', 'gc')
+
+
+class Histogram:
+    __slots__ = ('counts', 'max')
+
+    def __init__(self):
+        """
+        Initiation of Histogram class counting times in fixed buckets (see bounds), in preallocated array, so adding
+        time allocates nothing. The longest time added is kept as well.
+        """
+        self.counts = array('I', (len(bounds) + 1) * [0])
+        self.max = 0
+
+    def add(self, time):
+        """
+        Count 'time' in us in its bucket.
+        """
+        bucket = 0
+        for bound in bounds:
+            if time <= bound:
+                break
+            bucket += 1
+        self.counts[bucket] += 1
+        if time > self.max:
+            self.max = time
+
+    def reset(self):
+        """
+        Clear all buckets in place.
+        """
+        counts = self.counts
+        for i in range(len(counts)):
+            counts[i] = 0
+        self.max = 0
+
+
+class Metrics:
+    def __init__(self, period):
+        """
+        Initiation of Metrics class collecting timing of main loop in histograms, in us:
+            iteration - step of algorithm task, from samples read to values shown and queued,
+            overshoot - how late acquisition task woke up, after its period or sensor interrupt,
+            i2c       - reading samples from sensor FIFO,
+            flush     - sending all pages changed to display,
+            publish   - single MQTT publish,
+            gc        - garbage collection made in idle slot (see memory.py),
+        and counters of errors excepted by algorithm task and by publish. Snapshot is due every 'period' ms.
+        """
+        self.period = period
+        self.iteration = Histogram()
+        self.overshoot = Histogram()
+        self.i2c = Histogram()
+        self.flush = Histogram()
+        self.publish = Histogram()
+        self.gc = Histogram()
+        self.algorithm_errors = 0
+        self.publish_errors = 0
+        self.start = utime.ticks_ms()
+
+    def due(self):
+        """
+        Check if 'period' ms passed since the last snapshot.
+        """
+        return utime.ticks_diff(utime.ticks_ms(), self.start) >= self.period
+
+    def snapshot(self):
+        """
+        Get bucket bounds, time in ms since the last snapshot, and counts of every bucket followed by the longest time
+        of every histogram, by its name. Errors are counted since start. Histograms are cleared, so every snapshot
+        covers its own window.
+        """
+        now = utime.ticks_ms()
+        snapshot = {'bounds': bounds, 'window': utime.ticks_diff(now, self.start),
+                    'errors': {'algorithm': self.algorithm_errors, 'publish': self.publish_errors}}
+        for name in names:
+            histogram = getattr(self, name)
+            snapshot[name] = list(histogram.counts) + [histogram.max]
+            histogram.reset()
+        self.start = now
+        return snapshot
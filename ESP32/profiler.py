@@ -0,0 +1,68 @@
+import sys
+
+if sys.implementation.name == 'micropython':
+    from utime import ticks_us as ticks, ticks_diff
+    # Unit of time counted.
+    UNIT = 'us'
+else:
+    # CPython on the host.
+    from time import perf_counter_ns as ticks
+    UNIT = 'ns'
+
+    def ticks_diff(end, start):
+        return end - start
+
+
+class Profiler:
+    def __init__(self, stages):
+        """
+        Initiation of Profiler class counting calls and cumulative time of each of 'stages'. Stages are names of
+        methods of profiled object. Time is counted by ticks_us under MicroPython and by perf_counter_ns under CPython.
+        Time of stage called by other stage is counted in both of them.
+        """
+        self.stages = stages
+        self.calls = len(stages) * [0]
+        self.time = len(stages) * [0]
+
+    def wrap(self, instance):
+        """
+        Replace stage methods of 'instance' with ones counting their calls and time. Nothing is replaced unless it is
+        called, so instance which is not profiled runs its own methods with no overhead at all.
+        """
+        for i, name in enumerate(self.stages):
+            setattr(instance, name, self.timed(i, getattr(instance, name)))
+
+    def timed(self, i, method):
+        """
+        Get function calling 'method' and counting its call and time as stage number 'i'.
+        """
+        calls = self.calls
+        time = self.time
+
+        def wrapper(*args):
+            start = ticks()
+            try:
+                return method(*args)
+            finally:
+                time[i] += ticks_diff(ticks(), start)
+                calls[i] += 1
+
+        return wrapper
+
+    def reset(self):
+        """
+        Clear all counters.
+        """
+        for i in range(len(self.stages)):
+            self.calls[i] = 0
+            self.time[i] = 0
+
+    def snapshot(self):
+        """
+        Get compact snapshot of counters: dictionary with unit of time and [calls, time] of every stage. It can be
+        dumped to JSON and published as it is.
+        """
+        snapshot = {'unit': UNIT}
+        for i, name in enumerate(self.stages):
+            snapshot[name] = [self.calls[i], self.time[i]]
+        return snapshot
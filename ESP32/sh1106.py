@@ -21,20 +21,18 @@ class SH1106:
 
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        self.view = memoryview(self.buffer)
         fb = framebuf.FrameBuffer(self.buffer, self.width, self.height, framebuf.MVLSB)
         self.framebuf = fb
 
-        # Shortcuts of the methods of framebuf
-        self.fill = fb.fill
-        self.fill_rect = fb.fill_rect
-        self.hline = fb.hline
-        self.vline = fb.vline
-        self.line = fb.line
-        self.rect = fb.rect
-        self.pixel = fb.pixel
-        self.scroll = fb.scroll
-        self.text = fb.text
-        self.blit = fb.blit
+        # Columns changed on each page since the last show, from dirty_start up to dirty_end. Page is not changed if
+        # dirty_start is not lower than dirty_end. Every drawing method marks area it draws on, so show() sends only
+        # changed parts of pages.
+        self.dirty_start = bytearray(self.pages)
+        self.dirty_end = bytearray(self.pages)
+
+        # Page and column address commands sent before data of every page, written at once from preallocated buffer.
+        self.page_commands = bytearray(3)
 
         self.init_display()
 
@@ -44,6 +42,72 @@ class SH1106:
         self.poweron()
         self.show()
 
+    def mark(self, x, y, w, h):
+        # Mark rectangle as changed. Parts out of display are skipped.
+        x_start = max(x, 0)
+        x_end = min(x + w, self.width)
+        if x_start >= x_end or h <= 0:
+            return
+        start = self.dirty_start
+        end = self.dirty_end
+        for page in range(max(y, 0) >> 3, min((y + h - 1) >> 3, self.pages - 1) + 1):
+            if start[page] >= end[page]:
+                start[page] = x_start
+                end[page] = x_end
+            else:
+                start[page] = min(start[page], x_start)
+                end[page] = max(end[page], x_end)
+
+    def mark_all(self):
+        for page in range(self.pages):
+            self.dirty_start[page] = 0
+            self.dirty_end[page] = self.width
+
+    # Methods of framebuf, marking area they draw on.
+    def fill(self, c):
+        self.framebuf.fill(c)
+        self.mark_all()
+
+    def fill_rect(self, x, y, w, h, c):
+        self.framebuf.fill_rect(x, y, w, h, c)
+        self.mark(x, y, w, h)
+
+    def hline(self, x, y, w, c):
+        self.framebuf.hline(x, y, w, c)
+        self.mark(x, y, w, 1)
+
+    def vline(self, x, y, h, c):
+        self.framebuf.vline(x, y, h, c)
+        self.mark(x, y, 1, h)
+
+    def line(self, x1, y1, x2, y2, c):
+        self.framebuf.line(x1, y1, x2, y2, c)
+        self.mark(min(x1, x2), min(y1, y2), abs(x2 - x1) + 1, abs(y2 - y1) + 1)
+
+    def rect(self, x, y, w, h, c):
+        self.framebuf.rect(x, y, w, h, c)
+        self.mark(x, y, w, h)
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return self.framebuf.pixel(x, y)
+        self.framebuf.pixel(x, y, c)
+        self.mark(x, y, 1, 1)
+
+    def scroll(self, xstep, ystep):
+        self.framebuf.scroll(xstep, ystep)
+        self.mark_all()
+
+    def text(self, string, x, y, c=1):
+        # Every character is 8x8 pixels.
+        self.framebuf.text(string, x, y, c)
+        self.mark(x, y, 8 * len(string), 8)
+
+    def blit(self, fbuf, x, y, key=-1, width=None, height=None):
+        # FrameBuffer does not tell its size, so everything right and down from x, y is marked if it is not given.
+        self.framebuf.blit(fbuf, x, y, key)
+        self.mark(x, y, self.width - x if width is None else width, self.height - y if height is None else height)
+
     def poweroff(self):
         self.write_cmd(set_disp | 0x00)
 
@@ -58,6 +122,8 @@ class SH1106:
             self.write_cmd(set_seg_remap | 0x00)
             self.write_cmd(set_scan_dir | 0x00)
         if update:
+            # Display RAM is mirrored, so all pages have to be sent again.
+            self.mark_all()
             self.show()
 
     def sleep(self, value):
@@ -70,12 +136,38 @@ class SH1106:
     def invert(self, invert):
         self.write_cmd(set_norm_inv | (invert & 1))
 
+    def dirty(self):
+        # Check if any page changed since it was sent.
+        start = self.dirty_start
+        end = self.dirty_end
+        for page in range(self.pages):
+            if start[page] < end[page]:
+                return True
+        return False
+
+    def show_page(self, page):
+        # Send only changed columns of 'page', if any. Display RAM has 132 columns, display shows them from column 2.
+        # Return True if anything was sent.
+        start = self.dirty_start
+        end = self.dirty_end
+        if start[page] >= end[page]:
+            return False
+        column = start[page] + 2
+        commands = self.page_commands
+        commands[0] = set_page_address | page
+        commands[1] = low_column_address | (column & 0x0f)
+        commands[2] = high_column_address | (column >> 4)
+        self.write_cmds(commands)
+        offset = self.width * page
+        self.write_data(self.view[offset + start[page]:offset + end[page]])
+        start[page] = 0
+        end[page] = 0
+        return True
+
     def show(self):
-        for page in range(self.height // 8):
-            self.write_cmd(set_page_address | page)
-            self.write_cmd(low_column_address | 2)
-            self.write_cmd(high_column_address | 0)
-            self.write_data(self.buffer[ self.width * page:self.width * page + self.width])
+        # Send only changed columns of changed pages.
+        for page in range(self.pages):
+            self.show_page(page)
 
     def reset(self, res):
         if res is not None:
@@ -116,22 +208,30 @@ class Spi(SH1106):
         if self.cs is not None:
             self.cs.init(self.cs.OUT, value=1)
 
+        # Display is the only device on the bus, so bus is set up once here, not before every write.
+        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        # Buffer of single command, so writing commands allocates nothing.
+        self.command = bytearray(1)
+
         super().__init__(external_vcc, width, height)
 
     def write_cmd(self, cmd):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+        self.command[0] = cmd
+        self.write_cmds(self.command)
+
+    def write_cmds(self, buf):
+        # Write all commands of 'buf' in one transaction.
         if self.cs is not None:
             self.cs(1)
             self.dc(0)
             self.cs(0)
-            self.spi.write(bytearray([cmd]))
+            self.spi.write(buf)
             self.cs(1)
         else:
             self.dc(0)
-            self.spi.write(bytearray([cmd]))
+            self.spi.write(buf)
 
     def write_data(self, buf):
-        self.spi.init(baudrate=self.rate, polarity=0, phase=0)
         if self.cs is not None:
             self.cs(1)
             self.dc(1)
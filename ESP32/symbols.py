@@ -1,3 +1,5 @@
+import framebuf
+
 # Symbol of circle required to show Celsius degree on display.
 circle = [
          [0, 0, 0, 0, 1, 1, 0, 0],
@@ -8,4 +10,22 @@ circle = [
          [0, 0, 0, 0, 0, 0, 0, 0],
          [0, 0, 0, 0, 0, 0, 0, 0],
          [0, 0, 0, 0, 0, 0, 0, 0],
-                                ]
\ No newline at end of file
+                                ]
+
+
+def render(symbol):
+    """
+    Render symbol given as rows of pixels into FrameBuffer, so it is drawn on display by one blit call. Return
+    FrameBuffer together with its width and height, as FrameBuffer does not tell its size.
+    """
+    height = len(symbol)
+    width = len(symbol[0])
+    fb = framebuf.FrameBuffer(bytearray((width + 7) // 8 * height), width, height, framebuf.MONO_HLSB)
+    for y, row in enumerate(symbol):
+        for x, c in enumerate(row):
+            fb.pixel(x, y, c)
+    return fb, width, height
+
+
+# Symbols rendered once, when module is imported.
+circle_image = render(circle)
@@ -62,8 +62,9 @@ class Wireless:
         """
         return self.mqtt_is_connected
 
-    def publish(self, data):
+    def publish(self, data, subtopic=None):
         """
-        Publish 'data' on set topic.
+        Publish 'data' on set topic, or on its 'subtopic' if given.
         """
-        self.client.publish(self.topic, data)
\ No newline at end of file
+        topic = self.topic if subtopic is None else self.topic + '/' + subtopic
+        self.client.publish(topic, data)
\ No newline at end of file
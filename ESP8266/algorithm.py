@@ -1,4 +1,7 @@
 import mathfunctions as math
+from array import array
+from buffers import RingBuffer, MovingAverage
+from profiler import Profiler
 
 # Indexes of specified samples types.
 IR = -1
@@ -10,13 +13,54 @@ TIME_PREVIOUS = -6
 # Previous sample of ir equals to ir-2, previous sample of red equals to red-2, and previous sample of time equals to
 # time-1.
 
+# Signals processed for every sample, IR first. Kept as constant tuple, so iterating them allocates nothing.
+SIGNALS = (IR, RED)
+
+# Block ingestion settings, in ms. Samples read at full sensor rate are smoothed by moving average of SMOOTHING_TIME,
+# and each one is compared with the sample taken COMPARE_TIME before to detect edges. Both are turned into the nearest
+# amount of samples for every sample rate. Every sample is checked for an extremum, not one in 50 ms as main loop did,
+# so comparing samples only 50 ms apart made noise give false beats, with more of them the higher the rate was. These
+# times keep detection error at or below the one of burst mean path from 25 to 400 sps (see Host/bench_block.py).
+SMOOTHING_TIME = 275
+COMPARE_TIME = 125
+
+# Stages of algorithm counted by profiler. Setup is called on every reset of measure.
+PROFILED_STAGES = ('reorder_samples', 'detect_edge', 'detect_extremum', 'detect_heartbeat', 'try_to_count_spo2',
+                   'setup')
+
+# Scales of values kept as integers in fixed point mode. Bpm and spo2 are kept in hundredths, ac/dc ratio and R factor
+# are multiplied by 2^14. MicroPython keeps integers lower than 2^30 without allocation, so scales are chosen to keep
+# every intermediate result of usual signals below it. R factor is counted as a product of RED/IR ac ratio scaled by
+# 2^15 and IR/RED dc ratio scaled by 2^13, as small ac/dc ratios lose too much precision when scaled on their own.
+BPM_SCALE = 100
+SPO_SCALE = 100
+RATIO_SCALE = 1 << 14
+AC_SHIFT = 15
+DC_SHIFT = 13
+R_SHIFT = 14
+R_SCALE = 1 << R_SHIFT
+
 
 class HrSpOalgorithm:
-    def __init__(self):
+    def __init__(self, fixed_point=False, profile=False):
         """
         Initiation of HrSpOalgorithm responsible for calculation hr and spo2 based on readings from IR and RED leds.
         Variables declared in __init__ are overwritten through algorithm work, so they can be declared only once.
+
+        If 'fixed_point' is set, all calculations are made on integers scaled by constants declared above. Every float
+        result allocates memory on MicroPython, so it lets garbage collector run much less often. Results differ from
+        float ones by rounding: bpm by at most 1, spo2 by at most 0.05 in 9 of 10 values. Spo2 value close to 60 or 100
+        may be kept in buffor by one of variants only, then mean differs by up to few tenths until the value leaves it.
+
+        If 'profile' is set, calls and time of every stage are counted by profiler, see PROFILED_STAGES.
         """
+        self.fixed_point = fixed_point
+
+        # Buffors with last 10 collected bpm and spo2 values. They are cleared in place by setup().
+        typecode = 'i' if fixed_point else 'd'
+        self.bpm_buf = RingBuffer(10, typecode)
+        self.spo_buf = RingBuffer(10, typecode)
+
         self.setup()
 
         # Rising and falling edge flags.
@@ -54,6 +98,15 @@ class HrSpOalgorithm:
 
         # New values flag.
         self.new_values = False
+        # Result slots of count_hr_spo_block: new values flag, bpm and spo2. The same list is refilled on every call.
+        self.result = [False, 0, 0]
+
+        # Profiler of algorithm stages. Stage methods are replaced by counting ones only if profiling is on, so there
+        # is no overhead otherwise.
+        self.profiler = None
+        if profile:
+            self.profiler = Profiler(PROFILED_STAGES)
+            self.profiler.wrap(self)
 
     def setup(self):
         """ Declaration of variables which have to be cleared before every measure try. """
@@ -67,7 +120,7 @@ class HrSpOalgorithm:
         self.bpm = 0
 
         # Buffor with collected bpm values.
-        self.bpm_buf = []
+        self.bpm_buf.reset()
 
         # Beat time. [-1] is present one, [-2] is previous one.
         self.beat_time = 2 * [0]
@@ -76,7 +129,7 @@ class HrSpOalgorithm:
         self.spo = 0
 
         # Buffor with collected spo2 values.
-        self.spo_buf = []
+        self.spo_buf.reset()
 
         # Buffors with true local maximums and minimums and their times. True extremum is a local extremum of signal
         # waveform, not caused by body shake or any other, unexpected change of value
@@ -145,7 +198,12 @@ class HrSpOalgorithm:
         """ Get a dc of last local maximum of given signal."""
         nom = self.local_min[i-2] - self.local_min[i]
         denom = self.local_min_time[i-2] - self.local_min_time[i]
-        dc = (nom / denom) * self.local_max_time[i] + (self.local_min[i-2] - (nom / denom) * self.local_min_time[i-2])
+        if self.fixed_point:
+            # The same line between two last local minimums, counted from the older one.
+            return self.local_min[i-2] + nom * (self.local_max_time[i] - self.local_min_time[i-2]) // denom
+        # Slope is divided once and used twice, so one float object less is made.
+        slope = nom / denom
+        dc = slope * self.local_max_time[i] + (self.local_min[i-2] - slope * self.local_min_time[i-2])
         return dc
 
     @staticmethod
@@ -160,84 +218,208 @@ class HrSpOalgorithm:
 
         return output
 
-    def count_hr_spo(self, ir_value, red_value, time_value):
-        """ Main algorithm responsible for all calculations."""
-        self.new_values = False
-        self.reorder_samples(ir_value, red_value, time_value)
+    def check_anti_shake_condition(self, bpm):
+        """ Check if signal change occured is actually made by heartbeat instead of some body shake. """
+        if self.fixed_point:
+            difference = math.abs(bpm - self.bpm * BPM_SCALE) < 20 * BPM_SCALE
+        else:
+            difference = math.abs(bpm - self.bpm) < 20
+        if (self.bpm < 50) or difference or (self.beats < 10):
+            self.beat_time[-2] = self.beat_time[-1]
+            self.beats += 1
+            if self.beats > 1:
+                # If more than one beat collected append the bpm buffor with this value. It keeps last 10 values only.
+                self.bpm_buf.append(bpm)
+                # Calculate bpm value as a mean of last 2-10 values gotten. It lowers impact of incorrect
+                # values gotten. Set beat and new values flag as true.
+                if self.fixed_point:
+                    self.bpm = self.bpm_buf.floor_mean() // BPM_SCALE
+                else:
+                    self.bpm = int(self.bpm_buf.mean())
+                self.new_values = True
+                self.beat = True
+            else:
+                # It has to be more than one true local maximum collected to properly count the bpm.
+                pass
+        else:
+            # If difference between saved and gotten bpm is greater by offset value set then the measure is
+            # likely faulty.
+            pass
+
+    def detect_heartbeat(self, signal):
+        """
+        If IR signal is processed then attempt to detect heartbeat is made. Return False if algorithm had to be set up
+        again, True otherwise.
+        """
+        # If true local maximum was detected and difference between it and the previouse one is higher than
+        # minimal declared value and higher than maximal declared value count it as a heartbeat.
+        max_min_diff = self.local_max[signal] - self.local_min[signal]
+        if (self.extremum[signal]) and (max_min_diff > self.min_diff) and (max_min_diff < self.max_diff):
+            # Save previous time as a present beat time, then count time between present and previous beat time.
+            self.beat_time[-1] = self.sample[TIME_PREVIOUS]
+            delta = self.beat_time[-1] - self.beat_time[-2]
+            # Calculate the bpm based on delta time in ms.
+            if self.fixed_point:
+                bpm = (60000 * BPM_SCALE + delta // 2) // delta
+            else:
+                bpm = 60 / (delta/1000)
+            # If time between beats is greater than 3 seconds then setting everything up again is needed.
+            if delta >= 3000 and self.beats > 2:
+                self.setup()
+                return False
+            # Anti shake condition. If difference between saved and gotten bpm is lower by value set then the
+            # measure is likely valid. It counts as soon as 10 continous beats are obtained. Every measure
+            # counts if saved bpm is lower than 50
+            self.check_anti_shake_condition(bpm)
+        return True
+
+    def count_spo2(self):
+        """ Count SpO2 level based on equation from AN6409 maxim integrated PDF. """
+        if self.fixed_point:
+            spo = 104 * SPO_SCALE - ((17 * SPO_SCALE * self.r + R_SCALE // 2) >> R_SHIFT)
+            valid = 100 * SPO_SCALE > spo > 60 * SPO_SCALE
+        else:
+            spo = 104 - 17 * self.r
+            valid = 100 > spo > 60
+        if valid:
+            # Spo can not be higher than 100. Value lower than 60 is likely unlikely. Spo2 buffor keeps last 10 values.
+            self.spo_buf.append(spo)
+            # Calculate spo2 value as a mean of last 2-10 values gotten, and round it to two decimals.
+            # Set beat flag as False.
+            if self.fixed_point:
+                self.spo = self.spo_buf.floor_mean() / SPO_SCALE
+            else:
+                self.spo = round(self.spo_buf.mean(),2)
+            self.beat = False
+
+    def try_to_count_spo2(self, signal):
+        """
+        Start spo2 count tryout. If everything goes fine specific function to counting final value of spo2 is called.
+        """
+        previous = signal - 2
+        if self.extremum[signal] == False and self.beat:
+            # If true local minimum occured and beat was detected before then spo2 calculation can start.
+            if self.local_min[previous] != 0:
+                # It has to be two local minimums detected to calculate the spo2 value.
+                self.dc[signal] = self.get_dc_value(signal)
+                self.ac[signal] = self.local_max[signal] - self.dc[signal]
+                if self.fixed_point:
+                    self.acdc_ratio[signal] = self.ac[signal] * RATIO_SCALE // self.dc[signal]
+                else:
+                    self.acdc_ratio[signal] = self.ac[signal]/self.dc[signal]
+                # If the processed signal is a signal from the RED LED, then the signal from the IR LED has already
+                # been processed in this cycle.
+                if signal == RED:
+                    try:
+                        # Try to count R factor. Leave function if ZeroDivisionError occurs.
+                        if self.fixed_point:
+                            ac = (self.ac[RED] << AC_SHIFT) // self.ac[IR]
+                            dc = (self.dc[IR] << DC_SHIFT) // self.dc[RED]
+                            self.r = (ac * dc) >> (AC_SHIFT + DC_SHIFT - R_SHIFT)
+                        else:
+                            self.r = self.acdc_ratio[RED] / self.acdc_ratio[IR]
+                    except ZeroDivisionError:
+                        return
+                    # Count spo2 value based on equation from AN6409 maxim integrated PDF.
+                    self.count_spo2()
+            else:
+                # Two local minimums have to be detected to corrcetly count spo2 value.
+                pass
+
+    def process_sample(self):
+        """ Detect edges, extremums, heartbeat and spo2 for samples placed in samples buffor. """
         # Calculations are made for both of signals.
-        for signal in [IR, RED]:
-            previous = signal - 2
+        for signal in SIGNALS:
             # Try to detect any edge and any extremum.
             self.detect_edge(signal)
             self.detect_extremum(signal)
-            # Heartbeat is detected based on value from IR led.
-            if signal == IR:
-                # If true local maximum was detected and difference between it and the previouse one is higher than
-                # minimal declared value and higher than maximal declared value count it as a heartbeat.
-                max_min_diff = self.local_max[signal] - self.local_min[signal]
-                if (self.extremum[signal]) and (max_min_diff > self.min_diff) and (max_min_diff < self.max_diff):
-                    # Save previous time as a present beat time, then count time between present and previous beat time.
-                    self.beat_time[-1] = self.sample[TIME_PREVIOUS]
-                    delta = self.beat_time[-1] - self.beat_time[-2]
-                    # Calculate the bpm based on delta time in ms.
-                    bpm = 60 / (delta/1000)
-                    # If time between beats is greater than 3 seconds then setting everything up again is needed.
-                    if delta >= 3000 and self.beats > 2:
-                        self.setup()
-                        continue
-                    # Anti shake condition. If difference between saved and gotten bpm is lower by value set then the
-                    # measure is likely valid. It counts as soon as 10 continous beats are obtained. Every measure
-                    # counts if saved bpm is lower than 50
-                    if (self.bpm < 50) or (math.abs(bpm - self.bpm) < 20) or (self.beats < 10):
-                        self.beat_time[-2] = self.beat_time[-1]
-                        self.beats += 1
-                        if self.beats > 1:
-                            # If more than one beat collected append the bpm buffor with this value.
-                            self.bpm_buf.append(bpm)
-                            if len(self.bpm_buf) > 10:
-                                # If more than 10 values collected, reject the oldest one.
-                                self.bpm_buf = self.bpm_buf[1::]
-                            # Calculate bpm value as a mean of last 2-10 values gotten. It lowers impact of incorrect
-                            # values gotten. Set beat and new values flag as true.
-                            self.bpm = int(math.mean(self.bpm_buf))
-                            self.new_values = True
-                            self.beat = True
-                        else:
-                            # It has to be more than one true local maximum collected to properly count the bpm.
-                            pass
-                    else:
-                        # If difference between saved and gotten bpm is greater by offset value set then the measure is
-                        # likely faulty.
-                        pass
-            if self.extremum[signal] == False and self.beat:
-                # If true local minimum occured and beat was detected before then spo2 calculation can start.
-                if self.local_min[previous] != 0:
-                    # It has to be two local minimums detected to calculate the spo2 value.
-                    self.dc[signal] = self.get_dc_value(signal)
-                    self.ac[signal] = self.local_max[signal] - self.dc[signal]
-                    self.acdc_ratio[signal] = self.ac[signal]/self.dc[signal]
-                    # If the processed signal is a signal from the RED LED, then the signal from the IR LED has already
-                    # been processed in this cycle.
-                    if signal == RED:
-                        try:
-                            # Try to count R factor. Leave function if ZeroDivisionError occurs.
-                            self.r = self.acdc_ratio[RED] / self.acdc_ratio[IR]
-                        except ZeroDivisionError:
-                            return
-                        # Count spo2 value based on equation from AN6409 maxim integrated PDF.
-                        spo = 104 - 17 * self.r
-                        if 100 > spo > 60:
-                            # Spo can not be higher than 100. Value lower than 60 is likely unlikely.
-                            self.spo_buf.append(spo)
-                            if len(self.spo_buf) > 10:
-                                # If more than 10 values collected, reject the oldest one.
-                                self.spo_buf = self.spo_buf[1::]
-                            # Calculate spo2 value as a mean of last 2-10 values gotten, and round it to two decimals.
-                            # Set beat flag as False.
-                            self.spo = round(math.mean(self.spo_buf),2)
-                            self.beat = False
-                else:
-                    # Two local minimums have to be detected to corrcetly count spo2 value.
-                    pass
+            # Heartbeat is detected based on value from IR led. If algorithm had to be set up again, go on with next
+            # signal.
+            if signal == IR and not self.detect_heartbeat(signal):
+                continue
+            self.try_to_count_spo2(signal)
+
+    def count_hr_spo(self, ir_value, red_value, time_value):
+        """ Main algorithm responsible for all calculations."""
+        self.new_values = False
+        self.reorder_samples(ir_value, red_value, time_value)
+        self.process_sample()
+
+        return self.new_values, self.bpm, self.spo
+
+    def set_sample_period(self, period):
+        """
+        Prepare block ingestion of samples read from sensor every 'period' us. Moving average and compared samples
+        buffors are made once here, so count_hr_spo_block allocates no buffors.
+        """
+        n = max(1, (SMOOTHING_TIME * 1000 + period // 2) // period)
+        self.lag = max(1, (COMPARE_TIME * 1000 + period // 2) // period)
+        self.ir_average = MovingAverage(n)
+        self.red_average = MovingAverage(n)
+        # Moving average is late by half of its length, so time of each sample is moved back by the same time.
+        self.delay = (n - 1) * period // 2000
+        # Last 'lag' smoothed samples of each signal. The oldest one is compared with present sample.
+        self.ir_history = array('i', self.lag * [0])
+        self.red_history = array('i', self.lag * [0])
+        self.history_index = 0
+
+    def shift_time(self, shift):
+        """
+        Move times of samples, extremums and beats back by 'shift' ms, after origin they are counted from was moved on
+        by it, so measure goes on.
+        """
+        sample = self.sample
+        sample[TIME] -= shift
+        sample[TIME_PREVIOUS] -= shift
+        for times in (self.beat_time, self.local_max_time, self.local_min_time):
+            for i in range(len(times)):
+                times[i] -= shift
+
+    def count_hr_spo_block(self, ir_values, red_values, time_values, count):
+        """
+        Process block of 'count' samples read from sensor FIFO at once, each one with its own time in ms. Every sample
+        is smoothed and compared with the one taken COMPARE_TIME ms before, so extremums and beats are timed with
+        sensor sample resolution. set_sample_period() has to be called first. Return the same values as count_hr_spo,
+        after the last sample of block, in result list which is filled in place on every call, so no tuple is made.
+        New values flag is set if any sample of block gave new values. Samples raising ZeroDivisionError are skipped,
+        the same way main loop skips them.
+        """
+        ir_average = self.ir_average
+        red_average = self.red_average
+        ir_history = self.ir_history
+        red_history = self.red_history
+        new = False
+        for i in range(count):
+            ir_value = ir_average.update(ir_values[i])
+            red_value = red_average.update(red_values[i])
+            if not ir_average.ready():
+                continue
+
+            # Samples buffor is made again by setup(), so it can not be kept aside for the whole block.
+            sample = self.sample
+            j = self.history_index
+            sample[TIME_PREVIOUS] = sample[TIME]
+            sample[IR_PREVIOUS] = ir_history[j]
+            sample[RED_PREVIOUS] = red_history[j]
+            sample[IR] = ir_value
+            sample[RED] = red_value
+            sample[TIME] = time_values[i] - self.delay
+            ir_history[j] = ir_value
+            red_history[j] = red_value
+            j += 1
+            self.history_index = 0 if j == self.lag else j
+
+            self.new_values = False
+            try:
+                self.process_sample()
+            except ZeroDivisionError:
+                continue
+            if self.new_values:
+                new = True
 
-        return self.new_values, self.bpm, self.spo
\ No newline at end of file
+        self.new_values = new
+        result = self.result
+        result[0] = new
+        result[1] = self.bpm
+        result[2] = self.spo
+        return result
@@ -0,0 +1,89 @@
+from array import array
+
+
+class RingBuffer:
+    __slots__ = ('size', 'data', 'index', 'count', 'sum', 'exact')
+
+    def __init__(self, size, typecode='d'):
+        """
+        Initiation of RingBuffer class responsible for keeping last 'size' values in preallocated array. It keeps sum of
+        values collected as well, so mean of integer values is counted without walking whole buffor. Float values are
+        kept in preallocated list instead, as the float objects given, so every value is read back exactly as it was
+        put and reading it allocates nothing, while float array would make new float object on every read.
+        """
+        self.size = size
+        # Sum of integers does not depend on order they are added in, so running sum gives the same mean as sum of all.
+        self.exact = typecode not in 'fd'
+        self.data = array(typecode, size * [0]) if self.exact else size * [0.0]
+        self.reset()
+
+    def reset(self):
+        """ Clear the buffor in place. """
+        for i in range(self.size):
+            self.data[i] = 0
+        self.index = 0
+        self.count = 0
+        self.sum = 0
+
+    def append(self, value):
+        """
+        Put new value in place of the oldest one. Sum is kept for integer values only, as mean of floats sums them
+        again, so keeping it would only allocate new float objects.
+        """
+        if self.exact:
+            self.sum += value - self.data[self.index]
+        self.data[self.index] = value
+        self.index += 1
+        if self.index == self.size:
+            self.index = 0
+        if self.count < self.size:
+            self.count += 1
+
+    def mean(self):
+        """
+        Get mean value of all values collected. Float values are summed again from the oldest one, the way
+        mathfunctions.mean sums list of them. Running sum of floats differs from such sum in the last bits, which could
+        change mean rounded by algorithm. Every float addition and the result make new float object.
+        """
+        if self.exact:
+            return self.sum / self.count
+        total = 0
+        i = self.index - self.count
+        if i < 0:
+            i += self.size
+        for k in range(self.count):
+            total += self.data[i]
+            i += 1
+            if i == self.size:
+                i = 0
+        return total / self.count
+
+    def floor_mean(self):
+        """ Get mean value of all values collected, rounded down to integer. Nothing but integers is allocated. """
+        return self.sum // self.count
+
+    def __len__(self):
+        return self.count
+
+
+class MovingAverage(RingBuffer):
+    __slots__ = ()
+
+    def __init__(self, size, typecode='i'):
+        """
+        Initiation of MovingAverage class responsible for smoothing samples one by one. It keeps last 'size' samples
+        in preallocated window and sum of them, so getting new average does not need to allocate any memory.
+        """
+        super().__init__(size, typecode)
+
+    def update(self, value):
+        """
+        Put new sample in place of the oldest one and return average of last 'size' samples. Integer division is used
+        to keep result as an integer.
+        """
+        self.append(value)
+        return self.sum // self.size
+
+    def ready(self):
+        """ Check if window is filled with samples, so average is counted from 'size' samples. """
+        return self.count == self.size
@@ -6,7 +6,10 @@ class Data:
         self.reset()
 
     def update(self, *args):
-        """ Update all buffors with measured vales. """
+        """
+        Update all buffors with measured vales: date and time strings, beat time in ms since clock origin, hr, spo2,
+        temperature and alarm code (see monitor.py).
+        """
         self.date_buf.append(args[0])
         self.runtime_buf.append(args[1])
         self.realtime_buf.append(args[2])
@@ -1,3 +1,5 @@
+import utime
+import uasyncio
 import symbols
 from sh1106 import Spi
 
@@ -10,68 +12,191 @@ class Display(Spi):
         self.display = Spi()
         super().__init__()
 
+        # Device id, time and date shown last. Only these which changed are drawn again, so only their part of display
+        # is sent by show(). None means that the field has to be drawn.
+        self.forget_time()
+
+        # Values shown last, the same way. Labels of values are drawn only if no value is shown. State of lower part of
+        # display, 'idle' or 'work', is kept too, so it is drawn only when it changes, not on every sensor read.
+        self.forget_values()
+
+        # Set once display task runs refresh. Drawing methods only change the framebuffer then, and the task sends it.
+        self.refreshing = False
+
+        # Amount of flushes and page writes made by refresh, and the longest and total time in us a page write
+        # blocked other tasks for.
+        self.flushes = 0
+        self.page_writes = 0
+        self.block_max = 0
+        self.block_total = 0
+        # Time in us all page writes of the last flush took, not counting time other tasks ran between them.
+        self.flush_time = 0
+
     def show_time(self, time, date, id):
         """ Show present date, time and device id on display. These are being displayed constantly. """
-        # Fill the 128x16 pixels rectangle starting from 0x0 with 0s. It makes this part of display
-        # completely clean. Any part of display may be cleared like this. It can be also filled with
-        # 1s. 0 is dark pixel, seen as no pixel, 1 is 'blue' pixel.
-        self.display.fill_rect(0, 0, 128, 16, 0)
+        display = self.display
+        id = str(id)
+        if self.shown_id is None:
+            # Fill the 128x16 pixels rectangle starting from 0x0 with 0s. It makes this part of display
+            # completely clean. Any part of display may be cleared like this. It can be also filled with
+            # 1s. 0 is dark pixel, seen as no pixel, 1 is 'blue' pixel.
+            display.fill_rect(0, 0, 128, 16, 0)
+
+        # Display text 'id' starting from 0x0, time and date. Each of them is drawn only if it changed, on its old
+        # one cleared.
+        if id != self.shown_id:
+            self.redraw(self.shown_id, id, 0, 0)
+            self.shown_id = id
+        if time != self.shown_time:
+            self.redraw(self.shown_time, time, 32, 0)
+            self.shown_time = time
+        if date != self.shown_date:
+            self.redraw(self.shown_date, date, 24, 8)
+            self.shown_date = date
+        self.flush()
+
+    def redraw(self, old, new, x, y):
+        """ Draw text 'new' at x, y in place of text 'old' drawn there before, if any. """
+        if old is not None:
+            self.display.fill_rect(x, y, 8 * len(old), 8, 0)
+        self.display.text(new, x, y, 1)
+
+    def forget_time(self):
+        """ Make show_time draw all of its fields again, e.g. after display was cleared. """
+        self.shown_id = None
+        self.shown_time = None
+        self.shown_date = None
+
+    def flush(self):
+        """ Send changed parts of the framebuffer to display now, unless display task does it. """
+        if not self.refreshing:
+            self.display.show()
+
+    async def refresh(self):
+        """
+        Step of display task, the only one writing to display once it runs. Pages changed since the last flush are
+        sent, so all drawings made meanwhile are sent at once. Task sleeps for 1 ms after every page written, so other
+        tasks woken meanwhile run before the next one, and sensor read waits for a single page write at most.
+        """
+        self.refreshing = True
+        display = self.display
+        if not display.dirty():
+            return
+        flush_time = 0
+        for page in range(display.pages):
+            before = utime.ticks_us()
+            if display.show_page(page):
+                elapsed = utime.ticks_diff(utime.ticks_us(), before)
+                flush_time += elapsed
+                self.page_writes += 1
+                self.block_total += elapsed
+                if elapsed > self.block_max:
+                    self.block_max = elapsed
+                await uasyncio.sleep_ms(1)
+        self.flush_time = flush_time
+        self.flushes += 1
 
-        # Display text 'str(id)' starting from 0x0.
-        self.display.text(str(id), 0, 0, 1)
-        self.display.text(time, 32, 0, 1)
-        self.display.text(date, 24, 8, 1)
-        self.display.show()
+    def timing(self):
+        """ Get amount of flushes made by display task, and the longest and mean time in us a page write took. """
+        mean = self.block_total // max(self.page_writes, 1)
+        return {'flushes': self.flushes, 'block_max': self.block_max, 'block_mean': mean}
 
     def show_values(self, bpm, spo, temperature):
-        """ Show measured values on display. """
-        self.display.fill_rect(0, 36, 128, 28, 0)
-        self.display.text('Pulse: ' + str(int(bpm)) + ' bpm', 0, 36, 1)
-        self.display.text('SpO2 : ' + str("%.2f" % spo) + " %", 0, 46, 1)
-        self.display.text('Temp.: ' + str("%.2f" % temperature) + "  C", 0, 56, 1)
-        for y, row in enumerate(symbols.circle):
-            for x, c in enumerate(row):
-                self.display.pixel(x + 104, y + 56, c)
+        """ Show measured values on display. Only values which changed are formatted and drawn again. """
+        display = self.display
+        if self.shown_bpm is None:
+            self.shown_state = None
+            display.fill_rect(0, 36, 128, 28, 0)
+            display.text('Pulse:', 0, 36, 1)
+            display.text('SpO2 :', 0, 46, 1)
+            display.text('Temp.:', 0, 56, 1)
+
+        # Every value is drawn from 8th character, in place of the old one.
+        bpm = int(bpm)
+        if bpm != self.shown_bpm:
+            display.fill_rect(56, 36, 72, 8, 0)
+            display.text(str(bpm) + ' bpm', 56, 36, 1)
+            self.shown_bpm = bpm
+        if spo != self.shown_spo:
+            display.fill_rect(56, 46, 72, 8, 0)
+            display.text('%.2f %%' % spo, 56, 46, 1)
+            self.shown_spo = spo
+        if temperature != self.shown_temperature:
+            display.fill_rect(56, 56, 72, 8, 0)
+            display.text('%.2f' % temperature, 56, 56, 1)
+            # Degree symbol is blitted from FrameBuffer rendered once by symbols module.
+            image, width, height = symbols.circle_image
+            display.blit(image, 104, 56, -1, width, height)
+            display.text('C', 112, 56, 1)
+            self.shown_temperature = temperature
+
+    def forget_values(self):
+        """ Make show_values draw labels and all values again, e.g. after this part of display was cleared. """
+        self.shown_bpm = None
+        self.shown_spo = None
+        self.shown_temperature = None
+        self.shown_alarm = None
+        self.shown_state = None
 
     def show_wifi_status(self, status):
         """ Show WiFi status on display."""
         if status:
             self.display.setup()
+            self.forget_time()
+            self.forget_values()
             self.display.text('Connection', 24, 20, 1)
             self.display.text('to WiFi', 36, 28, 1)
             self.display.text('succeed!', 32, 36, 1)
-            self.display.show()
+            self.flush()
         else:
             self.display.setup()
+            self.forget_time()
+            self.forget_values()
             self.display.text('Connection', 24, 20, 1)
             self.display.text('to WiFi', 36, 28, 1)
             self.display.text('failed!', 36, 36, 1)
-            self.display.show()
+            self.flush()
 
     def show_alarm(self, alarm):
-        """ Show alarm if any occured. """
-        if alarm != '':
+        """ Show alarm if any occured. 'alarm' is alarm code (see monitor.py), 0 if none. Drawn only when changed. """
+        if alarm == self.shown_alarm:
+            return
+        self.shown_alarm = alarm
+        self.shown_state = None
+        if alarm:
             self.display.fill_rect(0, 23, 128, 8, 0)
             self.display.text('ALARM!', 40, 23, 1)
         else:
             self.display.fill_rect(0, 23, 128, 8, 0)
 
     def idle_state(self):
-        """ Set display in its idle state. Lower part of display is cleared. """
+        """ Set display in its idle state. Lower part of display is cleared, unless it already is. """
+        if self.shown_state == 'idle':
+            return
         self.display.fill_rect(0, 23, 128, 41, 0)
+        self.forget_values()
+        self.shown_state = 'idle'
 
     def work_state(self):
-        """ Set display in its work state. Inform that sensor tries to measure. """
+        """ Set display in its work state, unless it already is. Inform that sensor tries to measure. """
+        if self.shown_state == 'work':
+            return
         self.display.fill_rect(0, 23, 128, 41, 0)
+        self.forget_values()
         self.display.text('Waiting for beat!', 0, 23, 1)
+        self.shown_state = 'work'
 
     def clear(self):
         """ Clear whole display. """
         self.display.clear()
+        self.forget_time()
+        self.forget_values()
 
     def setup(self):
         """
          Call all the functions responsible for running display such as powerup, turn off sleep mode and clear pixels.
          Just in case.
          """
-        self.display.setup()
\ No newline at end of file
+        self.display.setup()
+        self.forget_time()
+        self.forget_values()
\ No newline at end of file
@@ -1,4 +1,4 @@
-import utime
+import uasyncio
 from machine import Pin
 
 class Led():
@@ -7,8 +7,8 @@ class Led():
         self.led = Pin(2, Pin.OUT)
         self.led.on() # Defualt states are swapped -> on==off and off==on.
 
-    def toggle(self):
-        """ Turn on the led just for 1ms. """
+    async def blink(self):
+        """ Turn on the led just for 1ms. Other tasks run meanwhile. """
         self.led.off()
-        utime.sleep_ms(1)
+        await uasyncio.sleep_ms(1)
         self.led.on()
\ No newline at end of file
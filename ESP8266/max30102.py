@@ -26,12 +26,65 @@ temp_config = 0x21         # Temperature read mode configuration
 # Default I2C address of MAX30102 sensor.
 address = 0x57
 
+# Value overflow counter of FIFO saturates at.
+overflow_max = 0x1f
+
+# Amount of samples FIFO keeps, and size of each of them in bytes: 3 bytes of IR and 3 bytes of RED value.
+fifo_depth = 32
+sample_size = 6
+
+# Sample frequences and amounts of averaged samples selected by bits of SpO2 and FIFO configuration registers.
+sample_rates = (50, 100, 200, 400, 800, 1000, 1600, 3200)
+sample_averages = (1, 2, 4, 8, 16, 32, 32, 32)
+
+# LED pulse widths in us and ADC full scale ranges in nA selected by bits of SpO2 configuration register. Pulse width
+# sets ADC resolution from 15 bits for the shortest one to 18 bits for the longest one.
+pulse_widths = (69, 118, 215, 411)
+adc_ranges = (2048, 4096, 8192, 16384)
+
+# Acquisition profiles: sample rate in sps, amount of samples averaged by sensor, LED pulse width in us, ADC range in
+# nA, and currents of LED 1 and LED 2 as register values (0.2 mA per bit). Each one trades power, CPU time and I2C
+# traffic against signal quality:
+#   - idle - used when no body is detected, only to detect it. IR LED only, at low current, 25 samples per second,
+#   - normal - settings sensor worked with so far, 100 sps averaged by 4, so algorithm gets 25 samples per second,
+#   - high_res - 400 sps averaged by 2, so algorithm gets 200 samples per second with less noise.
+# Samples FIFO keeps are read less often at lower rates, so CPU and bus load follow amount of samples per second.
+profiles = {
+    'idle': (100, 4, 118, 4096, 0x10, 0x00),
+    'normal': (100, 4, 411, 4096, 0x2f, 0x2f),
+    'high_res': (400, 2, 411, 4096, 0x2f, 0x2f),
+}
+
+# Profile set while a body is detected. It is the one of the lowest CPU time and bus load whose mean bpm error stays
+# within the bound Host/bench_profiles.py checks (5 bpm) at noise of 100 counts per ADC sample. Sensor averaging by 4
+# lowers noise of normal samples enough, so high_res is not needed.
+work_profile = 'normal'
+
+# Maximal difference in ms between time of samples counted by sample period and time they are read. Samples are timed
+# from the time of read once again if it is exceeded, e.g. after FIFO overflow.
+max_time_drift = 100
+
 
 class Max30102:
     def __init__(self, scl = Pin(5), sda = Pin(4), freq = 400000):
         """ Initiate MAX30102 class ond each function responsible for correct device start-up. """
         # Define I2C connections and frequence.
         self.i2c = I2C(scl = scl, sda = sda, freq = freq)
+        # Buffors preallocated for register access and FIFO burst reads, so reading samples allocates nothing. View of
+        # first n samples of FIFO buffor is made once for every n.
+        self.register = bytearray(1)
+        self.status = bytearray(2)
+        self.temperature = bytearray(2)
+        self.pointers = bytearray(3)
+        self.fifo = bytearray(fifo_depth * sample_size)
+        fifo = memoryview(self.fifo)
+        self.fifo_views = [fifo[:n * sample_size] for n in range(fifo_depth + 1)]
+        # Running counts of samples read and lost by FIFO overflow, amount of reads which found FIFO overflown, and
+        # samples lost found by the last read.
+        self.samples_read = 0
+        self.samples_lost = 0
+        self.overflows = 0
+        self.overflow = 0
         # Reset registers to default values.
         self.reset()
         time.sleep(1)
@@ -42,7 +95,7 @@ class Max30102:
 
     def write(self, reg, value):
         """ Set value named 'value' in register named 'reg'. """
-        data = bytearray(1)  # One byte long array.
+        data = self.register  # One byte long array.
         data[0] = value
         self.i2c.writeto_mem(address, reg, data)
 
@@ -65,37 +118,97 @@ class Max30102:
         self.write(fifo_read_pointer, 0x00)
         self.write(overflow_counter, 0x00)
 
-        # FIFO config settings - sample average = 4, fifo rollover = enable(?), fifo almost full value = 17.
-        self.write(fifo_config, 0x5f) # 0b010 1 1111 = 0x5f
-
         # Set mode. HR mode - 0b010; SpO2 mode - 0b011; Multi-LED mode - 0b111.
         self.write(mode_config, 0x03) # 0b011 = 0x03
 
-        # SpO2 mode settings. ADC range (15,63 / 4096) - 01; Sample frequence - 100 - 001; LED pulse width - 411us - 11.
-        self.write(spo_config, 0x27)  # 0b0 01 001 11 = 0x27
+        # Time of the last sample read, in ms, and its part lower than 1 ms, in us. Samples are timed from time of read
+        # once again if 'retime' is set.
+        self.sample_time = 0
+        self.sample_time_fraction = 0
+        self.retime = True
+
+        # Sample rate, averaging, pulse width, ADC range and LED currents are set by profile. Start with idle one, until
+        # any body is detected.
+        self.profile = None
+        self.set_profile('idle')
+
+    def set_profile(self, name):
+        """
+        Switch to acquisition profile named 'name' (see profiles). Sample period and almost full level are set to
+        match it. FIFO is cleared, as samples taken before have other period, and the next samples read are timed
+        from time of read. Return True if profile was changed, so algorithm has to get the new sample period. Nothing
+        is written if profile is already set.
+        """
+        if name == self.profile:
+            return False
+        rate, average, pulse_width, adc_range, led_1, led_2 = profiles[name]
+
+        # FIFO config settings - sample average, fifo rollover = enable, fifo almost full value = 17.
+        fifo_config_value = sample_averages.index(average) << 5 | 0x1f  # 0bxxx 1 1111
+        self.write(fifo_config, fifo_config_value)
+        # Amount of samples in FIFO which makes almost full interrupt occur.
+        self.almost_full = fifo_depth - (fifo_config_value & 0x0f)
+
+        # SpO2 mode settings - ADC range, sample frequence and LED pulse width.
+        spo_config_value = (adc_ranges.index(adc_range) << 5 | sample_rates.index(rate) << 2
+                            | pulse_widths.index(pulse_width))
+        self.write(spo_config, spo_config_value)
+
+        # Current of each LED.
+        self.write(led_pa_1, led_1)
+        self.write(led_pa_2, led_2)
+
+        # Clear FIFO. Write pointer, overflow counter and read pointer are placed one after another, so all of them are
+        # written in one transaction.
+        self.pointers[0] = self.pointers[1] = self.pointers[2] = 0
+        self.i2c.writeto_mem(address, fifo_write_pointer, self.pointers)
 
-        # Set idle current level for each LED.
-        self.set_idle_current()
+        # Time between samples written to FIFO in us.
+        self.sample_period = 1000000 * average // rate
+        self.retime = True
+        self.profile = name
+        return True
 
     def set_idle_current(self):
-        """ Set lower current when no body was detected. Let us save power by a bit. """
-        self.write(led_pa_1, 0x10)
-        self.write(led_pa_2, 0x0)
+        """ Set idle profile when no body was detected. Let us save power by a bit. """
+        return self.set_profile('idle')
 
     def set_work_current(self):
-        self.write(led_pa_1, 0x2f)
-        self.write(led_pa_2, 0x2f)
+        """ Set work profile (see work_profile) before work start. """
+        return self.set_profile(work_profile)
+
+    def enable_fifo_interrupt(self):
+        """
+        Enable FIFO almost full interrupt. INT output of sensor goes low as soon as FIFO keeps 'almost_full' samples,
+        and stays low until interrupt status is read.
+        """
+        self.write(interrupt_enable_1, 0x80)  # 0b10000000 = 0x80
+        self.read_interrupt_status()
+
+    def read_interrupt_status(self):
+        """
+        Read both of interrupt status registers. It clears all interrupts, so INT output goes high again. Return value
+        of the first one. FIFO almost full interrupt is its highest bit.
+        """
+        self.i2c.readfrom_mem_into(address, interrupt_status_1, self.status)
+        return self.status[0]
 
     def get_data_samples(self):
-        """ Check amount of samples ready to read. """
-        write_pointer = self.i2c.readfrom_mem(address, fifo_write_pointer, 1)[0]
-        read_pointer = self.i2c.readfrom_mem(address, fifo_read_pointer, 1)[0]
-        samples = write_pointer - read_pointer
+        """ Check amount of samples ready to read. Count samples lost by FIFO overflow. """
+        # Write pointer, overflow counter and read pointer registers are placed one after another, so all of them are
+        # read in one transaction.
+        self.i2c.readfrom_mem_into(address, fifo_write_pointer, self.pointers)
+        # Pointers wrap around at FIFO depth.
+        samples = (self.pointers[0] - self.pointers[2]) % fifo_depth
 
-        if samples < 0:
-            samples += 32  # Take pointer wrap around into account.
-        else:
-            pass
+        # Overflow counter counts samples lost since the last sample was read. Pointers are equal for both of empty and
+        # full FIFO, but samples are lost only when it is full. Counter saturates at overflow_max, then the rest of
+        # samples lost is counted by read_samples.
+        self.overflow = self.pointers[1]
+        if self.overflow:
+            samples = fifo_depth
+            self.samples_lost += self.overflow
+            self.overflows += 1
 
         return samples
 
@@ -131,6 +244,83 @@ class Max30102:
         temperature = self.read_temperature()
         return red, ir, temperature
 
+    def read_samples(self, red_buf, ir_buf, time_buf, now):
+        """
+        Read all samples waiting in FIFO into 'red_buf' and 'ir_buf' buffors, and time of each of them in ms into
+        'time_buf'. Samples are timed by sensor sample period, on from the last sample read before. If it drifts from
+        'now', time of read in ms, by more than max_time_drift, the last sample is timed 'now' and the older ones are
+        timed back from it. Samples lost by FIFO overflow since the previous read are counted, and time of samples
+        read skips them. Return amount of samples read.
+
+        All samples are read in one I2C transaction into preallocated buffor and decoded through its memoryview, so
+        nothing is allocated.
+        """
+        samples = min(self.get_data_samples(), len(red_buf))
+        if samples:
+            data = self.fifo_views[samples]
+            self.i2c.readfrom_mem_into(address, fifo_data_register, data)
+            # Mask bytes unused bytes[23:18]. Channels are swapped in used model of sensor.
+            j = 0
+            for i in range(samples):
+                ir_buf[i] = (data[j] << 16 | data[j + 1] << 8 | data[j + 2]) & 0x3ffff
+                red_buf[i] = (data[j + 3] << 16 | data[j + 4] << 8 | data[j + 5]) & 0x3ffff
+                j += sample_size
+            self.samples_read += samples
+
+        # Time the last sample would have if samples were timed on from the previous read. Samples lost by overflow
+        # were measured before the ones read, so time goes on over them and algorithm sees the gap.
+        period = self.sample_period
+        time = self.sample_time
+        fraction = self.sample_time_fraction + self.overflow * period
+        back = samples * period
+        last_time = time + (fraction + back) // 1000
+        if self.overflow == overflow_max and now - last_time > max_time_drift:
+            # Overflow counter saturated, so samples lost beyond it are counted from time they would take.
+            self.samples_lost += (now - last_time) * 1000 // period
+        if self.retime or last_time - now > max_time_drift or now - last_time > max_time_drift:
+            # Time the first sample back from the time of read, so the last one is timed 'now'.
+            time = now - (back + 999) // 1000
+            fraction = -back % 1000
+            self.retime = False
+
+        for i in range(samples):
+            fraction += period
+            time += fraction // 1000
+            fraction %= 1000
+            time_buf[i] = time
+        self.sample_time = time
+        self.sample_time_fraction = fraction
+
+        return samples
+
+    def shift_time(self, shift):
+        """ Move time of the last sample read back by 'shift' ms, after origin samples are timed from was moved on. """
+        self.sample_time -= shift
+
+    def counters(self):
+        """ Get running counts of samples read, samples lost by FIFO overflow and reads which found FIFO overflown. """
+        return {'read': self.samples_read, 'lost': self.samples_lost, 'overflows': self.overflows}
+
+    def start_temperature(self):
+        """ Start single temperature conversion. It takes about 29 ms. Result is read by read_temperature_value. """
+        self.write(temp_config, 0x01)  # 0b00000001 = 0x01
+
+    def temperature_ready(self):
+        """ Check if temperature conversion has ended. Sensor clears conversion enable bit when it ends. """
+        self.i2c.readfrom_mem_into(address, temp_config, self.register)
+        return not self.register[0] & 0x01
+
+    def read_temperature_value(self):
+        """
+        Read result of temperature conversion. Integer and fraction registers are read in one transaction. Integer
+        value is two's complement.
+        """
+        self.i2c.readfrom_mem_into(address, temp_integer, self.temperature)
+        integer = self.temperature[0]
+        if integer > 127:
+            integer -= 256
+        return integer + self.temperature[1] * 0.0625
+
     def read_temperature(self):
         """ Read temperature as sum of integer and fraction value. """
         # Initiate single temperature read.
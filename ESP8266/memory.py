@@ -0,0 +1,64 @@
+import gc
+import utime
+
+# Bytes which have to be allocated since the last collection before it is made again in idle slot.
+idle_margin = 1024
+
+
+class Memory:
+    def __init__(self, pauses=None):
+        """
+        Initiation of Memory class making garbage collections in idle slots, e.g. after publish or while no body is
+        detected, so they do not land in the middle of beat detection. Automatic collection is kept as last resort:
+        it is made once a quarter of free heap is allocated since the previous one. Time of every collection in us is
+        added to 'pauses' histogram (see metrics.py), if given. High water marks of heap are kept as well.
+        """
+        self.pauses = pauses
+        gc.collect()
+        gc.threshold(gc.mem_free() // 4 + gc.mem_alloc())
+
+        # Bytes allocated right after the last collection, the most bytes allocated and the least free ones seen.
+        self.collected = gc.mem_alloc()
+        self.alloc_max = self.collected
+        self.free_min = gc.mem_free()
+
+        # Amount of collections made, and the longest one in us.
+        self.collections = 0
+        self.pause_max = 0
+
+    def sample(self):
+        """ Update high water marks of heap. Heap is the fullest right before collection. """
+        alloc = gc.mem_alloc()
+        free = gc.mem_free()
+        if alloc > self.alloc_max:
+            self.alloc_max = alloc
+        if free < self.free_min:
+            self.free_min = free
+
+    def collect(self):
+        """ Make garbage collection now. """
+        self.sample()
+        start = utime.ticks_us()
+        gc.collect()
+        pause = utime.ticks_diff(utime.ticks_us(), start)
+        self.collected = gc.mem_alloc()
+        self.collections += 1
+        if pause > self.pause_max:
+            self.pause_max = pause
+        if self.pauses is not None:
+            self.pauses.add(pause)
+
+    def idle(self):
+        """ Make garbage collection in idle slot if more than idle_margin bytes were allocated since the last one. """
+        if gc.mem_alloc() - self.collected > idle_margin:
+            self.collect()
+
+    def stats(self):
+        """
+        Get bytes free and allocated now, their high water marks, threshold of automatic collection, and amount of
+        collections made and the longest one in us.
+        """
+        self.sample()
+        return {'free': gc.mem_free(), 'alloc': gc.mem_alloc(), 'free_min': self.free_min,
+                'alloc_max': self.alloc_max, 'threshold': gc.threshold(), 'collections': self.collections,
+                'pause_max': self.pause_max}
@@ -0,0 +1,314 @@
+import utime
+import ujson
+import uasyncio
+from array import array
+from tasks import Runtime, Signal
+from metrics import Metrics
+from memory import Memory
+import wire
+
+# Periods and deadlines of tasks in ms. Sensor FIFO is polled by acquisition task, and algorithm is released by
+# samples acquisition read. Algorithm has to end before the next poll, as samples read are kept in one set of buffors.
+acquisition_period = 50
+acquisition_deadline = 10
+algorithm_deadline = 50
+display_period = 100
+clock_period = 250
+uplink_period = 1000
+
+# Amount of measures sent in one batch. Delta batch (see wire.py) takes about 7 bytes per measure, so larger batches
+# can be sent per publish over weak WiFi.
+batch_size = 10
+
+# Loop metrics are published every minute (see metrics.py).
+metrics_period = 60000
+
+# Limits of measured values. Alarm is shown and sent if any value is out of them.
+hr_min = 50
+hr_max = 90
+spo2_min = 93
+temperature_max = 37
+
+# Alarm codes, one bit for every value out of its limits. Alarm code 0 means no alarm.
+alarm_hr_low = 1
+alarm_hr_high = 2
+alarm_spo2_low = 4
+alarm_temperature_high = 8
+
+
+def alarm_name(code):
+    """ Get alarm string PC app reads for alarm 'code'. If no alarm was detected it is sent as '-'. """
+    name = ''
+    if code & alarm_hr_low:
+        name += 'HR_TOO_LOW|'
+    if code & alarm_hr_high:
+        name += 'HR_TOO_HIGH|'
+    if code & alarm_spo2_low:
+        name += 'SPO2_TOO_LOW|'
+    if code & alarm_temperature_high:
+        name += 'TEMP_TOO_HIGH'
+    return name or '-'
+
+
+# Alarm strings for every alarm code, made once, so checking alarms with every beat makes no strings.
+alarm_names = tuple(alarm_name(code) for code in range(16))
+
+
+class Monitor:
+    def __init__(self, device_id, wireless, sensor, algorithm, temperature_monitor, display, led, data, clock,
+                 profile=False, work_profile='normal', wire_version=wire.delta_version):
+        """
+        Initiation of Monitor class doing all the work of device as tasks of one Runtime (see tasks.py), in order of
+        their priority, the highest first:
+            acquisition - reads all samples from sensor FIFO every acquisition_period ms, detects body and sets
+                          sensor profile, 'work_profile' while a body is detected,
+            algorithm   - counts hr and spo2 from samples read, shows them, checks alarms and queues data to send,
+            display     - sends changes of display at most every display_period ms,
+            clock       - shows present time and date kept by 'clock' (see clock.py), once NTP set it,
+            uplink      - publishes queued data on MQTT broker.
+        Set 'profile' to publish snapshot of algorithm profiler counters together with data. Data is sent in binary
+        batches of 'wire_version' (see wire.py), as JSON if it is None. Timing of tasks, sensor reads, display flushes
+        and publishing is collected by Metrics, and published on 'metrics' subtopic every metrics_period ms, together
+        with heap statistics. Garbage is collected by Memory in idle slots: after messages are published, and while
+        no body is detected.
+        """
+        self.device_id = device_id
+        self.wireless = wireless
+        self.sensor = sensor
+        self.algorithm = algorithm
+        self.temperature_monitor = temperature_monitor
+        self.display = display
+        self.led = led
+        self.data = data
+        self.clock = clock
+        self.profile = profile
+        self.work_profile = work_profile
+        self.wire_version = wire_version
+
+        # Buffors for all samples read from sensor FIFO at once. FIFO keeps up to 32 samples. Samples are timed in ms
+        # since clock origin, whose epoch seconds are sent with data. Algorithm smooths samples itself, so it needs to
+        # know how often they are taken. It gets sample period again whenever sensor profile is switched.
+        self.red_buf = array('i', 32 * [0])
+        self.ir_buf = array('i', 32 * [0])
+        self.time_buf = array('i', 32 * [0])
+        self.origin = clock.origin
+        algorithm.set_sample_period(sensor.sample_period)
+
+        # Amount of samples handed to algorithm task, and amount of reads made before it took the previous ones.
+        self.count = 0
+        self.overruns = 0
+        self.samples = Signal()
+
+        # Messages waiting for uplink task, as (data, subtopic) pairs.
+        self.outbox = []
+
+        self.metrics = Metrics(metrics_period)
+        metrics = self.metrics
+        self.memory = Memory(metrics.gc)
+
+        self.runtime = Runtime()
+        runtime = self.runtime
+        runtime.add('acquisition', self.acquire, acquisition_period, priority=4, deadline=acquisition_deadline,
+                    overshoot=metrics.overshoot)
+        runtime.add('algorithm', self.process, priority=3, deadline=algorithm_deadline, wait=self.samples.wait,
+                    step_time=metrics.iteration)
+        runtime.add('display', self.refresh, display_period, priority=2)
+        runtime.add('clock', self.update_clock, clock_period, priority=1)
+        runtime.add('uplink', self.uplink, uplink_period, priority=0)
+
+    async def run(self):
+        """ Run all tasks, forever. """
+        await self.runtime.run()
+
+    async def acquire(self):
+        """
+        Step of acquisition task. Read all samples measured since the last read. Body detection is based on the last
+        one. Samples are handed to algorithm task only while a body is detected.
+        """
+        # Origin is moved on only when algorithm task took all samples timed from the old one.
+        if self.count == 0 and self.clock.origin_due():
+            self.move_origin()
+        now = utime.ticks_diff(utime.ticks_ms(), self.origin)
+        start = utime.ticks_us()
+        count = self.sensor.read_samples(self.red_buf, self.ir_buf, self.time_buf, now)
+        self.metrics.i2c.add(utime.ticks_diff(utime.ticks_us(), start))
+        if count == 0:
+            return
+        ir = self.ir_buf[count - 1]
+        sensor = self.sensor
+        algorithm = self.algorithm
+
+        # Determine if any body was detected by sensor based on IR value.
+        if ir <= 30000:
+            # No body was detected. Set the idle state. No samples are processed, so it is time to collect garbage.
+            self.display.idle_state()
+            self.memory.idle()
+            if sensor.set_profile('idle'):
+                algorithm.set_sample_period(sensor.sample_period)
+            return
+        elif ir > 30000 and ir < 70000:
+            # Something was detected. Don't know what exactly though. Prepare algorithm and sensor to work.
+            algorithm.setup()
+            if sensor.set_profile(self.work_profile):
+                algorithm.set_sample_period(sensor.sample_period)
+            return
+        elif ir > 70000 and algorithm.beats == 0:
+            # Most likely the human body was detected. Set work state of display. Data is dropped once, not on every
+            # read until the first beat, so waiting allocates nothing.
+            if self.data.check_amount():
+                self.data.reset()
+            self.display.work_state()
+
+        if self.count:
+            self.overruns += 1
+        self.count = count
+        self.samples.set()
+
+    async def process(self):
+        """ Step of algorithm task. Count hr and spo2 from samples acquisition task read, then show and queue them. """
+        count = self.count
+        self.count = 0
+        if count == 0:
+            return
+        algorithm = self.algorithm
+
+        # Start temperature conversion or read its result if it is time to.
+        self.temperature_monitor.update()
+
+        # Samples raising ZeroDivisionEror are skipped by algorithm, but except all errors to make sure device will not
+        # hang on.
+        try:
+            new, hr, spo2 = algorithm.count_hr_spo_block(self.ir_buf, self.red_buf, self.time_buf, count)
+        except:
+            self.metrics.algorithm_errors += 1
+            return
+
+        # If new values gotten, and both of hr and spo2 are not zeros it can be assumed that proper value was obtained.
+        if not (new and hr != 0 and spo2 != 0):
+            return
+
+        # Temperature is the latest one read, rounded to two decimals.
+        beat_time = int(algorithm.beat_time[-1])
+        temperature = round(self.temperature_monitor.value, 2)
+
+        # Turn on the led shortly just to inform that new data was received, and display gotten values.
+        await self.led.blink()
+        self.display.show_values(hr, spo2, temperature)
+
+        # Decide what type of alarm occured, if any, and show it.
+        alarm = 0
+        if hr < hr_min:
+            alarm |= alarm_hr_low
+        elif hr > hr_max:
+            alarm |= alarm_hr_high
+        if spo2 < spo2_min:
+            alarm |= alarm_spo2_low
+        if temperature > temperature_max:
+            alarm |= alarm_temperature_high
+        self.display.show_alarm(alarm)
+
+        # Check if connected to any broker. If not this point is the step end.
+        if self.wireless.mqtt_status:
+            data = self.data
+            data.update(self.clock.date, self.clock.time, beat_time, hr, spo2, temperature, alarm)
+
+            # Queue data to send if batch_size measures collected. Then reset the data buffor.
+            if data.check_amount() >= batch_size:
+                self.queue()
+                data.reset()
+
+    def queue(self):
+        """ Queue data collected for uplink task, together with counters of sensor, loop timing and tasks. """
+        outbox = self.outbox
+        outbox.append((self.batch(), None))
+        # Samples read and lost by sensor FIFO overflow since start, so stalls of tasks can be matched with bad
+        # readings.
+        outbox.append((ujson.dumps(self.sensor.counters()), 'sensor'))
+        # How long display page writes blocked other tasks, in us.
+        outbox.append((ujson.dumps(self.display.timing()), 'loop'))
+        # Runs, deadline misses, skipped periods and the longest response time in ms of every task.
+        outbox.append((ujson.dumps(self.runtime.counters()), 'tasks'))
+        self.queue_clock()
+        if self.profile:
+            outbox.append((ujson.dumps(self.algorithm.profiler.snapshot()), 'profile'))
+
+    def queue_clock(self):
+        """ Queue Unix epoch seconds (UTC) of clock origin samples are timed from, and offset of local time in s. """
+        clock = self.clock
+        self.outbox.append((ujson.dumps({'origin': clock.origin_epoch, 'offset': clock.offset}), 'clock'))
+
+    def move_origin(self):
+        """
+        Move clock origin on (see Clock.move_origin) before time since it wraps. Data collected is queued first, as it
+        is timed from the old origin, and the new one is queued after it. Sensor and algorithm move times they keep
+        back by the same amount, so measure goes on.
+        """
+        data = self.data
+        if data.check_amount():
+            self.queue()
+            data.reset()
+        shift = self.clock.move_origin()
+        self.origin = self.clock.origin
+        self.sensor.shift_time(shift)
+        self.algorithm.shift_time(shift)
+        self.queue_clock()
+
+    def batch(self):
+        """
+        Get batch of data collected to send: binary one of wire_version if it is set and all values fit in it, JSON
+        otherwise. JSON batch keeps seven lists of values, with alarm strings PC app reads in place of alarm codes.
+        """
+        data = self.data
+        if self.wire_version is not None:
+            clock = self.clock
+            encode = wire.encode if self.wire_version == wire.version else wire.encode_delta
+            batch = encode(self.device_id, clock.origin_epoch, clock.offset, data.realtime_buf, data.hr_buf,
+                           data.spo2_buf, data.temp_buf, data.alarm_buf)
+            if batch is not None:
+                return batch
+        buffor = data.get_buf()
+        return ujson.dumps(buffor[:6] + [[alarm_names[alarm] for alarm in data.alarm_buf]])
+
+    async def refresh(self):
+        """ Step of display task. Send changes of display (see Display.refresh), and count time of flush made. """
+        display = self.display
+        flushes = display.flushes
+        await display.refresh()
+        if display.flushes != flushes:
+            self.metrics.flush.add(display.flush_time)
+
+    async def update_clock(self):
+        """
+        Step of clock task. Show present time and date. Clock makes their strings again only when they change, and
+        show_time draws only fields which changed.
+        """
+        clock = self.clock
+        clock.update()
+        self.display.show_time(clock.time, clock.date, self.device_id)
+
+    async def uplink(self):
+        """
+        Step of uplink task. Publish all queued messages. Publish blocks until message is sent, so it is done by the
+        task of the lowest priority, and other tasks released meanwhile run after every message. Garbage is collected
+        once all of them are sent.
+        """
+        outbox = self.outbox
+        metrics = self.metrics
+        if metrics.due():
+            snapshot = metrics.snapshot()
+            snapshot['heap'] = self.memory.stats()
+            outbox.append((ujson.dumps(snapshot), 'metrics'))
+        if not outbox:
+            return
+        while outbox:
+            data, subtopic = outbox.pop(0)
+            # Message which failed to be sent is dropped, so the task keeps running. Failures are counted.
+            start = utime.ticks_us()
+            try:
+                self.wireless.publish(data, subtopic)
+            except:
+                metrics.publish_errors += 1
+            metrics.publish.add(utime.ticks_diff(utime.ticks_us(), start))
+            await uasyncio.sleep_ms(1)
+        # Messages were made and sent, and other tasks had their turn meanwhile. Collect garbage they left now.
+        self.memory.collect()
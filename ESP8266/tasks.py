@@ -0,0 +1,125 @@
+import utime
+import uasyncio
+
+
+class Signal:
+    def __init__(self):
+        """
+        Initiation of Signal class releasing tasks waiting for it. Unlike uasyncio.Event it is cleared when waiting
+        task is released, so every set() releases tasks waiting at the time once. It is not meant to be set by
+        interrupt handler.
+        """
+        self.event = uasyncio.Event()
+
+    def set(self):
+        self.event.set()
+
+    async def wait(self):
+        await self.event.wait()
+        self.event.clear()
+
+
+class Task:
+    def __init__(self, name, step, period, priority, deadline=None, wait=None, step_time=None, overshoot=None):
+        """
+        Initiation of Task class running coroutine function 'step' once on every release. Task is released every
+        'period' ms, or, if coroutine function 'wait' is given, whenever it returns (e.g. on sensor interrupt). Of tasks
+        released at once, the one of the highest 'priority' runs first. Step has to end within 'deadline' ms since
+        release, period by default, otherwise deadline miss is counted. If histograms (see metrics.py) are given, time
+        of every step in us is added to 'step_time', and how late periodic task woke up in us to 'overshoot'.
+        """
+        self.name = name
+        self.step = step
+        self.period = period
+        self.priority = priority
+        self.deadline = period if deadline is None else deadline
+        self.wait = wait
+        self.step_time = step_time
+        self.overshoot = overshoot
+
+        # Time of the last release in ticks_ms, and if task was released and its step has not ended yet.
+        self.release = 0
+        self.released = False
+
+        # Amount of steps run, deadline misses, periods skipped as step ended after the next release, and the longest
+        # time from release to end of step in ms.
+        self.runs = 0
+        self.misses = 0
+        self.skipped = 0
+        self.response_max = 0
+
+
+class Runtime:
+    def __init__(self):
+        """
+        Initiation of Runtime class running all the work of device as uasyncio tasks, each with its own period,
+        priority and deadline. Scheduling is cooperative: task of higher priority does not interrupt a step already
+        running, but it runs first whenever both are released. Every task counts its deadline misses.
+        """
+        self.tasks = []
+
+        # Set whenever a task ends its step, so tasks it preempted check again if they can run, instead of polling.
+        self.ended = Signal()
+
+    def add(self, name, step, period=0, priority=0, deadline=None, wait=None, step_time=None, overshoot=None):
+        """ Add task running 'step' (see Task). Return the task. """
+        task = Task(name, step, period, priority, deadline, wait, step_time, overshoot)
+        self.tasks.append(task)
+        return task
+
+    def preempted(self, task):
+        """ Check if any task of higher priority than 'task' is released and has not ended its step yet. """
+        for other in self.tasks:
+            if other.released and other.priority > task.priority:
+                return True
+        return False
+
+    async def run_task(self, task):
+        """ Release 'task' and run its step, forever. """
+        task.release = utime.ticks_ms()
+        while True:
+            if task.wait is not None:
+                await task.wait()
+                task.release = utime.ticks_ms()
+            task.released = True
+            # Let tasks of higher priority released meanwhile run first.
+            while self.preempted(task):
+                await self.ended.wait()
+            start = utime.ticks_us()
+            await task.step()
+            task.released = False
+            self.ended.set()
+            if task.step_time is not None:
+                task.step_time.add(utime.ticks_diff(utime.ticks_us(), start))
+
+            now = utime.ticks_ms()
+            response = utime.ticks_diff(now, task.release)
+            task.runs += 1
+            if response > task.response_max:
+                task.response_max = response
+            if response > task.deadline:
+                task.misses += 1
+            if task.wait is None:
+                # The next release is one period after this one. If it already passed, task is released at once, and
+                # whole periods passed since then are skipped.
+                release = utime.ticks_add(task.release, task.period)
+                late = utime.ticks_diff(now, release)
+                if late > 0:
+                    task.skipped += late // task.period
+                    release = now
+                task.release = release
+                delay = utime.ticks_diff(release, now)
+                wake = utime.ticks_add(utime.ticks_us(), delay * 1000)
+                await uasyncio.sleep_ms(delay)
+                if task.overshoot is not None:
+                    task.overshoot.add(max(0, utime.ticks_diff(utime.ticks_us(), wake)))
+
+    async def run(self):
+        """ Run all tasks added, forever. """
+        await uasyncio.gather(*[self.run_task(task) for task in self.tasks])
+
+    def counters(self):
+        """
+        Get runs, deadline misses, skipped periods and the longest response time in ms of every task, by its name.
+        """
+        return {task.name: (task.runs, task.misses, task.skipped, task.response_max) for task in self.tasks}
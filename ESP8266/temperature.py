@@ -0,0 +1,54 @@
+import utime
+
+# Time of temperature conversion in ms. Sensor takes about 29 ms, so result is not checked before.
+conversion_time = 30
+
+# Time in ms after which conversion is given up if sensor has not ended it.
+conversion_timeout = 200
+
+
+class Temperature:
+    def __init__(self, sensor, period=10000):
+        """
+        Initiation of Temperature class responsible for reading temperature from sensor every 'period' ms without
+        waiting for it. Body temperature changes over minutes, so latest value read is kept and used meanwhile.
+        update() starts conversion, and reads its result on one of next calls, so it never makes more than one I2C
+        transaction at once.
+        """
+        self.sensor = sensor
+        self.period = period
+
+        # Latest temperature read. It is 0 until the first conversion ends.
+        self.value = 0
+
+        # Conversion state, time it was started and time of the last one ended, in ticks_ms.
+        self.converting = False
+        self.started = 0
+        self.last = None
+
+        # Amount of conversions ended and given up.
+        self.conversions = 0
+        self.failures = 0
+
+    def update(self, now=None):
+        """ Advance temperature reading. 'now' is present ticks_ms. Return the latest temperature. """
+        if now is None:
+            now = utime.ticks_ms()
+        if self.converting:
+            elapsed = utime.ticks_diff(now, self.started)
+            if elapsed < conversion_time:
+                return self.value
+            if self.sensor.temperature_ready():
+                self.value = self.sensor.read_temperature_value()
+                self.conversions += 1
+            elif elapsed < conversion_timeout:
+                return self.value
+            else:
+                self.failures += 1
+            self.converting = False
+            self.last = now
+        elif self.last is None or utime.ticks_diff(now, self.last) >= self.period:
+            self.sensor.start_temperature()
+            self.converting = True
+            self.started = now
+        return self.value
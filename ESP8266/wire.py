@@ -0,0 +1,111 @@
+import ustruct
+
+# Version of binary batch format, sent as the first byte of every batch. JSON batch starts with '[' instead, so PC app
+# tells them apart by the first byte.
+version = 1
+
+# Header: version, device id, Unix epoch seconds (UTC) of clock origin, time of the first beat in ms since clock origin,
+# offset of local time from UTC in minutes, amount of records.
+header_format = '<BHIIhH'
+header_size = ustruct.calcsize(header_format)
+
+# Record: time in ms since the previous beat (0 for the first one), hr, spo2 x100, temperature x100, alarm code (see
+# monitor.py). Little endian, no padding.
+record_format = '<HBHhB'
+record_size = ustruct.calcsize(record_format)
+
+
+def encode(device_id, epoch, offset, times, hr, spo2, temperature, alarms):
+    """
+    Encode batch of measures as binary records. 'epoch' is Unix epoch seconds (UTC) of clock origin 'times' of beats are
+    counted from in ms, and 'offset' is offset of local time from UTC in s. Other arguments are lists of values, one for
+    every beat. Return bytearray, or None if any value does not fit in its field, e.g. clock is not set, the first beat
+    is timed before clock origin or beats are more than 65 s apart, so the batch has to be sent as JSON.
+    """
+    count = len(times)
+    if epoch is None or count == 0 or not 0 <= times[0] <= 0xFFFFFFFF:
+        return None
+    batch = bytearray(header_size + count * record_size)
+    ustruct.pack_into(header_format, batch, 0, version, int(device_id), epoch, times[0], offset // 60, count)
+    position = header_size
+    previous = times[0]
+    for i in range(count):
+        delta = times[i] - previous
+        previous = times[i]
+        if not (0 <= delta <= 0xFFFF and 0 <= hr[i] <= 0xFF):
+            return None
+        ustruct.pack_into(record_format, batch, position, delta, hr[i], int(spo2[i] * 100 + 0.5),
+                          int(temperature[i] * 100 + 0.5), alarms[i])
+        position += record_size
+    return batch
+
+
+# Version of delta batch format. Every column of batch is sent as differences between consecutive values, zigzag
+# mapped and written as LEB128 varints, so values which barely change take a byte or two.
+delta_version = 2
+
+# Header of delta batch: header of version 1 followed by flags.
+delta_header_format = header_format + 'B'
+delta_header_size = ustruct.calcsize(delta_header_format)
+
+# Flag of delta batch: alarm column is sent as (run length, alarm code) pairs.
+rle_alarms = 1
+
+
+def put_varint(batch, position, value):
+    """
+    Put 'value' zigzag mapped (0, -1, 1, -2... to 0, 1, 2, 3...) as LEB128 varint at 'position' of 'batch'. Return
+    position right after it.
+    """
+    value = value << 1 if value >= 0 else (-value << 1) - 1
+    while value > 0x7F:
+        batch[position] = (value & 0x7F) | 0x80
+        value >>= 7
+        position += 1
+    batch[position] = value
+    return position + 1
+
+
+def put_column(batch, position, values, scale=1, previous=0):
+    """
+    Put differences between consecutive 'values' as varints at 'position' of 'batch', the first one counted from
+    'previous'. Values are multiplied by 'scale' and rounded first, unless it is 1. Return position right after them.
+    """
+    for value in values:
+        if scale != 1:
+            value = int(value * scale + 0.5)
+        position = put_varint(batch, position, value - previous)
+        previous = value
+    return position
+
+
+def encode_delta(device_id, epoch, offset, times, hr, spo2, temperature, alarms, rle=True):
+    """
+    Encode batch of measures column by column: beat times, hr, spo2 x100 and temperature x100 as varint differences
+    (see put_varint), alarm codes as varints, or as (run length, alarm code) pairs if 'rle' is set. Arguments are the
+    same as encode() takes. Return bytearray, or None if clock is not set or the first beat is timed before clock
+    origin, so the batch has to be sent as JSON.
+    """
+    count = len(times)
+    if epoch is None or count == 0 or not 0 <= times[0] <= 0xFFFFFFFF:
+        return None
+    # Varint of 32 bit value takes 5 bytes at most. Alarm column takes two varints per measure at most.
+    batch = bytearray(delta_header_size + 6 * 5 * count)
+    ustruct.pack_into(delta_header_format, batch, 0, delta_version, int(device_id), epoch, times[0], offset // 60,
+                      count, rle_alarms if rle else 0)
+    position = put_column(batch, delta_header_size, times, previous=times[0])
+    position = put_column(batch, position, hr)
+    position = put_column(batch, position, spo2, 100)
+    position = put_column(batch, position, temperature, 100)
+    if rle:
+        run = 0
+        for i in range(count):
+            run += 1
+            if i == count - 1 or alarms[i + 1] != alarms[i]:
+                position = put_varint(batch, position, run)
+                position = put_varint(batch, position, alarms[i])
+                run = 0
+    else:
+        for alarm in alarms:
+            position = put_varint(batch, position, alarm)
+    return batch[:position]
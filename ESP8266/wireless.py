@@ -56,6 +56,7 @@ class Wireless:
         """ Get the MQQT connection status. """
         return self.mqtt_is_connected
 
-    def publish(self, data):
-        """ Publish 'data' on set topic. """
-        self.client.publish(self.topic, data)
\ No newline at end of file
+    def publish(self, data, subtopic=None):
+        """ Publish 'data' on set topic, or on its 'subtopic' if given. """
+        topic = self.topic if subtopic is None else self.topic + '/' + subtopic
+        self.client.publish(topic, data)
\ No newline at end of file
@@ -0,0 +1,267 @@
+import numpy as np
+import firmware
+
+# Extremum codes used in arrays. Streaming algorithm keeps True, False or None in 'extremum' flags.
+MAXIMUM = 1
+MINIMUM = 0
+NONE = -1
+
+
+class BatchHrSpOalgorithm:
+    def __init__(self, port='ESP32', block=4096, **options):
+        """
+        Initiation of BatchHrSpOalgorithm responsible for calculation of hr and spo2 for whole recorded streams at once.
+        It gives the same results as HrSpOalgorithm fed with the same samples one by one.
+
+        Edges and extremums are detected in vectorized form, for whole block of samples at once. Beat and spo2
+        detection depends on bpm and spo2 values counted before, so it is made only for samples where any extremum
+        occured. These are counted by wrapped HrSpOalgorithm instance, so both of engines share the same state and
+        exactly the same beat and spo2 logic. Samples are processed in blocks of 'block' length. Any other keyword
+        arguments are passed to HrSpOalgorithm.
+        """
+        self.algorithm_module = firmware.load('algorithm', port)
+        self.algorithm = self.algorithm_module.HrSpOalgorithm(**options)
+        self.block = block
+
+        # ESP32 algorithm skips spo2 part of IR signal after every heartbeat detection attempt, ESP8266 one goes on
+        # with it.
+        self.ir_spo2 = port == 'ESP8266'
+
+    def setup(self):
+        """
+        Clear variables which have to be cleared before every measure try. Same as HrSpOalgorithm.setup().
+        """
+        self.algorithm.setup()
+
+    def scan(self, values, signal):
+        """
+        Detect edges and extremums of given signal in vectorized form. Flags from the end of previous block are taken
+        from wrapped algorithm. Return dictionary of arrays describing algorithm state after each sample.
+        """
+        algorithm = self.algorithm
+        count = len(values)
+        index = np.arange(count)
+
+        # Signal with previous sample added at the beginning. Difference between every sample and its predecessor.
+        signal_values = np.concatenate(([algorithm.sample[signal]], values))
+        delta = np.diff(signal_values)
+        previous_values = signal_values[:-1]
+
+        rising = delta > 0
+        falling = delta < 0
+        drop = -delta >= algorithm.after_max_min_diff[signal]
+
+        # Virtual indexes placed before the block. They keep flags state from the previous block.
+        if algorithm.rising_edge[signal]:
+            init_rising, init_clear = -1, -2
+        else:
+            init_rising, init_clear = -2, -1
+
+        # Rising edge flag is cleared only by local maximum, which is detected only on drop. If rising edge occured
+        # after last drop, then rising edge flag is still set when the next drop comes.
+        last_rising = np.maximum.accumulate(np.where(rising, index, init_rising))
+        last_drop = np.maximum.accumulate(np.where(drop, index, init_clear))
+        last_drop_before = np.concatenate(([init_clear], last_drop[:-1]))
+        maximum = drop & (last_rising > last_drop_before)
+
+        last_max = np.maximum.accumulate(np.where(maximum, index, init_clear))
+        last_max_before = np.concatenate(([init_clear], last_max[:-1]))
+        rising_flag = last_rising > last_max_before
+
+        # Values saved as max and min. These are the last samples on rising and falling edge.
+        rising_index = np.maximum.accumulate(np.where(rising, index, -1))
+        falling_index = np.maximum.accumulate(np.where(falling, index, -1))
+        max_values = np.where(rising_index >= 0, values[rising_index], algorithm.max[signal])
+        min_values = np.where(falling_index >= 0, values[falling_index], algorithm.min[signal])
+
+        # True local minimum is the first candidate after every local maximum. Candidates placed before first local
+        # maximum of block count only if local maximum was detected in previous block.
+        candidates = ~maximum & rising_flag & (previous_values == min_values)
+        group = np.maximum.accumulate(np.where(maximum, index, -1))
+        group = np.concatenate(([-1], group[:-1]))
+        if not algorithm.local_max_detected[signal]:
+            candidates &= group >= 0
+        candidates = np.flatnonzero(candidates)
+        first = np.ones(len(candidates), dtype=bool)
+        first[1:] = group[candidates][1:] != group[candidates][:-1]
+        minimum = np.zeros(count, dtype=bool)
+        minimum[candidates[first]] = True
+
+        # Falling edge flag is never used by algorithm. It is tracked only to keep state the same as streaming one.
+        if algorithm.falling_edge[signal]:
+            init_falling, init_min = -1, -2
+        else:
+            init_falling, init_min = -2, -1
+        last_falling = np.maximum.accumulate(np.where(falling, index, init_falling))
+        last_min = np.maximum.accumulate(np.where(minimum, index, init_min))
+
+        extremum = np.full(count, NONE, dtype=np.int8)
+        extremum[maximum] = MAXIMUM
+        extremum[minimum] = MINIMUM
+
+        return {
+            'maximum': maximum,
+            'minimum': minimum,
+            'extremum': extremum,
+            'max': max_values,
+            'min': min_values,
+            'rising_edge': ~maximum & rising_flag,
+            'falling_edge': last_falling > last_min,
+        }
+
+    def apply_extremum(self, signal, extremum, value, time):
+        """
+        Save detected extremum of given signal in wrapped algorithm, the same way HrSpOalgorithm.detect_extremum does.
+        """
+        algorithm = self.algorithm
+        previous = signal - 2
+        if extremum == MAXIMUM:
+            algorithm.local_max_detected[previous] = algorithm.local_max_detected[signal]
+            algorithm.local_max_detected[signal] = True
+            algorithm.local_max[previous] = algorithm.local_max[signal]
+            algorithm.local_max[signal] = value
+            algorithm.local_max_time[previous] = algorithm.local_max_time[signal]
+            algorithm.local_max_time[signal] = time
+            algorithm.rising_edge[signal] = False
+            algorithm.extremum[signal] = True
+        else:
+            algorithm.local_max_detected[signal] = False
+            algorithm.local_min[previous] = algorithm.local_min[signal]
+            algorithm.local_min[signal] = value
+            algorithm.local_min_time[previous] = algorithm.local_min_time[signal]
+            algorithm.local_min_time[signal] = time
+            algorithm.falling_edge[signal] = False
+            algorithm.extremum[signal] = False
+
+    def store_flags(self, signal, scan, i):
+        """
+        Save edge flags, max, min and extremum of given signal after sample 'i' of scanned block in wrapped algorithm.
+        """
+        if i < 0:
+            return
+        algorithm = self.algorithm
+        algorithm.rising_edge[signal] = bool(scan['rising_edge'][i])
+        algorithm.falling_edge[signal] = bool(scan['falling_edge'][i])
+        algorithm.max[signal] = scan['max'][i].item()
+        algorithm.min[signal] = scan['min'][i].item()
+        extremum = scan['extremum'][i]
+        algorithm.extremum[signal] = None if extremum == NONE else bool(extremum)
+
+    def store_samples(self, ir, red, time, i):
+        """
+        Save sample 'i' of block and its predecessor in wrapped algorithm samples buffor.
+        """
+        mod = self.algorithm_module
+        sample = self.algorithm.sample
+        if i > 0:
+            sample[mod.IR_PREVIOUS] = ir[i - 1].item()
+            sample[mod.RED_PREVIOUS] = red[i - 1].item()
+            sample[mod.TIME_PREVIOUS] = time[i - 1].item()
+        else:
+            sample[mod.IR_PREVIOUS] = sample[mod.IR]
+            sample[mod.RED_PREVIOUS] = sample[mod.RED]
+            sample[mod.TIME_PREVIOUS] = sample[mod.TIME]
+        sample[mod.IR] = ir[i].item()
+        sample[mod.RED] = red[i].item()
+        sample[mod.TIME] = time[i].item()
+
+    def process_block(self, ir, red, time, offset, output):
+        """
+        Process samples of block until its end or until the algorithm has to be restarted. Append outputs to 'output'
+        buffors. Return amount of processed samples.
+        """
+        algorithm = self.algorithm
+        mod = self.algorithm_module
+        IR, RED, TIME_PREVIOUS = mod.IR, mod.RED, mod.TIME_PREVIOUS
+
+        count = len(ir)
+        previous_time = np.concatenate(([algorithm.sample[mod.TIME]], time[:-1]))
+        ir_scan = self.scan(ir, IR)
+        red_scan = self.scan(red, RED)
+
+        # Samples where anything more than edge detection happens. Values needed at these samples are taken out of
+        # arrays at once, as indexing arrays one by one is much slower than indexing lists.
+        events = np.flatnonzero((ir_scan['extremum'] != NONE) | (red_scan['extremum'] != NONE))
+        ir_extremums = ir_scan['extremum'][events].tolist()
+        red_extremums = red_scan['extremum'][events].tolist()
+        ir_values = np.where(ir_scan['maximum'], ir_scan['max'], ir_scan['min'])[events].tolist()
+        red_values = np.where(red_scan['maximum'], red_scan['max'], red_scan['min'])[events].tolist()
+        times = previous_time[events].tolist()
+
+        # Last samples processed for each signal. Any other value than block end means restart of processing.
+        ir_last = red_last = count - 1
+        restart = False
+        for i, ir_extremum, ir_value, red_extremum, red_value, now in zip(events.tolist(), ir_extremums, ir_values,
+                                                                          red_extremums, red_values, times):
+            algorithm.new_values = False
+            algorithm.sample[TIME_PREVIOUS] = now
+
+            # Heartbeat is detected based on value from IR led.
+            if ir_extremum != NONE:
+                self.apply_extremum(IR, ir_extremum, ir_value, now)
+            if ir_extremum == MAXIMUM:
+                try:
+                    beat_valid = algorithm.detect_heartbeat(IR)
+                except Exception:
+                    # Streaming algorithm raises here, so RED signal is not processed at this sample.
+                    ir_last, red_last = i, i - 1
+                    break
+                if not beat_valid:
+                    # Algorithm was set up again. Samples buffor is cleared, so processing has to start once again.
+                    ir_last, red_last = i, i - 1
+                    restart = True
+                    break
+            elif ir_extremum == MINIMUM and self.ir_spo2:
+                try:
+                    algorithm.try_to_count_spo2(IR)
+                except Exception:
+                    ir_last, red_last = i, i - 1
+                    break
+
+            if red_extremum != NONE:
+                self.apply_extremum(RED, red_extremum, red_value, now)
+                try:
+                    algorithm.try_to_count_spo2(RED)
+                except Exception:
+                    # Streaming algorithm raises here, so no values are returned for this sample.
+                    continue
+
+            if algorithm.new_values:
+                output[0].append(offset + i)
+                output[1].append(algorithm.beat_time[-1])
+                output[2].append(algorithm.bpm)
+                output[3].append(algorithm.spo)
+
+        self.store_flags(IR, ir_scan, ir_last)
+        self.store_flags(RED, red_scan, red_last)
+        if not restart:
+            self.store_samples(ir, red, time, ir_last)
+        algorithm.new_values = False
+        return ir_last + 1
+
+    def count_hr_spo(self, ir, red, time):
+        """
+        Main function responsible for all calculations. Arguments are arrays of IR, RED and time values. Return arrays
+        of sample indexes where new values were obtained, beat times, bpm and spo2 values. These are the same values
+        HrSpOalgorithm.count_hr_spo returns as new ones for the same samples.
+        """
+        ir = np.asarray(ir)
+        red = np.asarray(red)
+        time = np.asarray(time)
+        output = ([], [], [], [])
+
+        # Every restart of processing means scanning rest of block once again. Block is shortened after each restart
+        # and extended back after each block processed entirely, so frequent restarts do not cost much.
+        position = 0
+        block = self.block
+        while position < len(ir):
+            end = position + block
+            processed = self.process_block(ir[position:end], red[position:end], time[position:end], position, output)
+            if position + processed < min(end, len(ir)):
+                block = max(block // 4, 64)
+            else:
+                block = min(block * 2, self.block)
+            position += processed
+
+        return (np.array(output[0], dtype=np.int64), np.array(output[1]),
+                np.array(output[2], dtype=np.int64), np.array(output[3], dtype=float))
@@ -0,0 +1,66 @@
+import argparse
+import time as timer
+import numpy as np
+import firmware
+import ppg
+from batch import BatchHrSpOalgorithm
+
+
+def make_stream(samples, noise=20, seed=0):
+    """
+    Make stream of 'samples' values the way main loop feeds algorithm with them, based on synthetic photoplethysmogram.
+    """
+    stream = ppg.generate(duration=samples * 0.05 + 1, noise=noise, seed=seed)
+    ir, red, time = ppg.main_loop_inputs(stream)
+    return ir[:samples], red[:samples], time[:samples]
+
+
+def run_streaming(algorithm, ir, red, time):
+    """
+    Feed streaming algorithm with samples one by one, the same way main loop does. Return its new values.
+    """
+    output = ([], [], [], [])
+    for i in range(len(ir)):
+        try:
+            new, hr, spo2 = algorithm.count_hr_spo(int(ir[i]), int(red[i]), time[i].item())
+        except:
+            continue
+        if new:
+            output[0].append(i)
+            output[1].append(algorithm.beat_time[-1])
+            output[2].append(hr)
+            output[3].append(spo2)
+    return output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare batch and streaming HrSpOalgorithm throughput.')
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--noise', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    ir, red, time = make_stream(args.samples, noise=args.noise, seed=args.seed)
+
+    streaming = firmware.load('algorithm', args.port).HrSpOalgorithm()
+    start = timer.perf_counter()
+    expected = run_streaming(streaming, ir, red, time)
+    streaming_time = timer.perf_counter() - start
+
+    batch = BatchHrSpOalgorithm(port=args.port)
+    start = timer.perf_counter()
+    result = batch.count_hr_spo(ir, red, time)
+    batch_time = timer.perf_counter() - start
+
+    for name, a, b in zip(('index', 'beat time', 'bpm', 'spo2'), expected, result):
+        if not np.array_equal(np.asarray(a), b):
+            raise SystemExit('Batch engine does not match streaming algorithm: ' + name + ' differs.')
+
+    print('samples:   %d, beats: %d' % (args.samples, len(result[0])))
+    print('streaming: %12.0f samples/s' % (args.samples / streaming_time))
+    print('batch:     %12.0f samples/s (x%.1f)' % (args.samples / batch_time, streaming_time / batch_time))
+
+
+if __name__ == '__main__':
+    main()
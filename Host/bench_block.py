@@ -0,0 +1,124 @@
+import argparse
+import time as timer
+from array import array
+import numpy as np
+import firmware
+import ppg
+from replay import Replay
+
+# Main loop reads sensor FIFO every 50 ms. FIFO keeps up to 32 samples.
+LOOP_PERIOD = 50
+FIFO_DEPTH = 32
+
+# Highest mean bpm error of new values against ground truth, in bpm, block ingestion may give at any rate.
+MAX_BPM_ERROR = 5
+
+
+def split_blocks(stream, period=LOOP_PERIOD):
+    """
+    Split stream into blocks of samples main loop reads from FIFO at once, every 'period' ms. Return list of (start,
+    end) indexes of samples of each block.
+    """
+    window = (stream.time // period).astype(np.int64)
+    edges = np.flatnonzero(np.diff(window)) + 1
+    starts = np.concatenate(([0], edges))
+    ends = np.concatenate((edges, [len(window)]))
+    return list(zip(starts.tolist(), ends.tolist()))
+
+
+def run_blocks(algorithm, stream, blocks):
+    """
+    Feed algorithm with blocks of samples, the way main loop does. Return time of every count_hr_spo_block call in ns
+    and new values as (beat times, bpm, spo2) lists.
+    """
+    red_buf = array('i', FIFO_DEPTH * [0])
+    ir_buf = array('i', FIFO_DEPTH * [0])
+    time_buf = array('i', FIFO_DEPTH * [0])
+    ir, red, time = stream.ir.tolist(), stream.red.tolist(), stream.time.astype(np.int64).tolist()
+    clock = timer.perf_counter_ns
+    elapsed = []
+    output = ([], [], [])
+    for start, end in blocks:
+        count = min(end - start, FIFO_DEPTH)
+        for i in range(count):
+            ir_buf[i] = ir[start + i]
+            red_buf[i] = red[start + i]
+            time_buf[i] = time[start + i]
+        before = clock()
+        try:
+            new, hr, spo2 = algorithm.count_hr_spo_block(ir_buf, red_buf, time_buf, count)
+        except Exception:
+            elapsed.append(clock() - before)
+            continue
+        elapsed.append(clock() - before)
+        if new:
+            output[0].append(algorithm.beat_time[-1])
+            output[1].append(hr)
+            output[2].append(spo2)
+    return np.array(elapsed), output
+
+
+def errors(stream, beat_time, bpm, spo):
+    """
+    Get mean bpm and spo2 error of new values against ground truth of stream.
+    """
+    if not bpm:
+        return float('nan'), float('nan')
+    bpm_error = np.abs(np.array(bpm) - stream.true_bpm(np.array(beat_time))).mean()
+    spo = np.array(spo)
+    spo = spo[spo != 0]
+    spo_error = np.abs(spo - stream.spo).mean() if len(spo) else float('nan')
+    return bpm_error, spo_error
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark block ingestion of HrSpOalgorithm at full sensor rate.')
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--rates', type=int, nargs='+', default=[25, 100, 400], help='Sensor sample rates, in sps.')
+    parser.add_argument('--duration', type=float, default=300)
+    parser.add_argument('--noise', type=float, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fixed-point', action='store_true', help='Use fixed point mode of ESP8266 algorithm.')
+    args = parser.parse_args()
+
+    module = firmware.load('algorithm', args.port)
+    options = {'fixed_point': True} if args.fixed_point else {}
+
+    print('rate [sps]  blocks  samples/s  block p50 [us]  p99 [us]  max [us]  budget p99  values  bpm err  spo2 err')
+    failed = False
+    inaccurate = False
+    for rate in args.rates:
+        stream = ppg.generate(duration=args.duration, rate=rate, noise=args.noise, seed=args.seed)
+        blocks = split_blocks(stream)
+
+        algorithm = module.HrSpOalgorithm(**options)
+        algorithm.set_sample_period(1000000 // rate)
+        elapsed, output = run_blocks(algorithm, stream, blocks)
+        bpm_error, spo_error = errors(stream, *output)
+
+        p50, p99, worst = np.percentile(elapsed / 1000, [50, 99, 100])
+        budget = p99 / (LOOP_PERIOD * 1000)
+        failed |= budget >= 1
+        # Error is NaN if no values were given at all.
+        inaccurate |= not bpm_error <= MAX_BPM_ERROR
+        print('%10d  %6d  %9.0f  %14.1f  %8.1f  %8.1f  %9.1f%%  %6d  %7.2f  %8.2f' % (
+            rate, len(blocks), len(stream) / (elapsed.sum() / 1e9), p50, p99, worst, budget * 100, len(output[0]),
+            bpm_error, spo_error))
+
+    # Previous path: mean of every burst, smoothed by main loop, one sample per 50 ms.
+    stream = ppg.generate(duration=args.duration, rate=args.rates[0], noise=args.noise, seed=args.seed)
+    ir, red, time = ppg.main_loop_inputs(stream)
+    replay = Replay(module.HrSpOalgorithm(**options))
+    replay.run(ir, red, time)
+    bpm_error, spo_error = errors(stream, replay.beat_time, replay.bpm, replay.spo)
+    print('burst mean path at %d sps: %d values, bpm err %.2f, spo2 err %.2f' % (args.rates[0], len(replay.bpm),
+                                                                               bpm_error, spo_error))
+
+    if failed:
+        raise SystemExit('Block processing does not keep up with loop period.')
+    if inaccurate:
+        raise SystemExit('Block processing bpm error is higher than %d bpm.' % MAX_BPM_ERROR)
+
+
+if __name__ == '__main__':
+    main()
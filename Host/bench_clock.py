@@ -0,0 +1,119 @@
+import argparse
+import ast
+import time as timer
+import firmware
+from heapmodel import HeapModel
+
+# utime stand-in firmware modules use. Its localtime keeps UTC, as RTC of device does.
+utime = firmware.stand_in('utime')
+
+# Clock task shows time every 250 ms. update_datetime task made time and date strings every 100 ms before.
+CLOCK_PERIOD = 250
+PREVIOUS_PERIOD = 100
+
+# Epoch seconds (UTC) clock is anchored at: 22:59:00 of 31st of December 2023, so local day changes a minute later.
+EPOCH = 1704063540
+
+# Time and date strings made the way update_datetime task made them, from RTC, with an hour added to hour only.
+PREVIOUS_STRINGS = '''
+def previous_strings(seconds):
+    [y, m, d, h, min, s] = utime.localtime(seconds)[0:6]
+    h = 0 if h == 23 else h + 1
+    realtime = str("%02d" % h) + ':' + str("%02d" % min) + ':' + str("%02d" % s)
+    date = str("%02d" % d) + '.' + str("%02d" % m) + '.' + str(y)
+    return realtime, date
+'''
+
+
+def previous_strings(heap):
+    """ Get previous formatting of time and date, instrumented by 'heap' the same way as firmware module. """
+    tree = ast.fix_missing_locations(heap.transform(ast.parse(PREVIOUS_STRINGS)))
+    namespace = dict(heap.namespace, utime=utime)
+    exec(compile(tree, 'previous main.py', 'exec'), namespace)
+    return namespace['previous_strings']
+
+
+def expected_strings(seconds, offset):
+    """ Get local time and date strings at epoch 'seconds' (UTC), for local time 'offset' s from UTC. """
+    y, m, d, h, min, s = utime.localtime(seconds + offset)[0:6]
+    return '%02d:%02d:%02d' % (h, min, s), '%02d.%02d.%d' % (d, m, y)
+
+
+def run(port, duration, previous):
+    """
+    Get time and date strings for 'duration' s of simulated ticks, by Clock of given port updated every CLOCK_PERIOD
+    ms, or by previous formatting every PREVIOUS_PERIOD ms if 'previous' is set. Return host time in ns and heap
+    objects per second of simulated time, and amount of updates which gave other strings than expected ones.
+    """
+    heap = HeapModel()
+    clock = firmware.load('clock', port, instrumentation=heap).Clock()
+    # Clock is anchored at EPOCH at ticks 0, as set() would do it.
+    clock.epoch = EPOCH
+    clock.anchor = 0
+    strings = previous_strings(heap)
+
+    perf_counter = timer.perf_counter_ns
+    elapsed = 0
+    objects = heap.count
+    wrong = 0
+    for now in range(0, int(duration * 1000), PREVIOUS_PERIOD if previous else CLOCK_PERIOD):
+        seconds = EPOCH + now // 1000
+        before = perf_counter()
+        if previous:
+            shown = strings(seconds)
+        else:
+            clock.update(now)
+            shown = clock.time, clock.date
+        elapsed += perf_counter() - before
+        wrong += shown != expected_strings(seconds, clock.offset)
+    return elapsed / duration, (heap.count - objects) / duration, wrong
+
+
+def check_origin(port, days, step=60000):
+    """
+    Move ticks on by 'step' ms for 'days' of simulated time, moving origin of Clock of given port on whenever it is
+    due, the way acquisition task does. Return amount of steps at which origin epoch and time since origin gave other
+    time than expected one, or time since origin was out of the range ticks_diff counts without wrapping.
+    """
+    clock = firmware.load('clock', port).Clock()
+    clock.origin = 0
+    clock.origin_epoch = EPOCH
+    wrong = 0
+    for now in range(0, int(days * 86400000), step):
+        ticks = now % utime.TICKS_PERIOD
+        if clock.origin_due(ticks):
+            clock.move_origin()
+        elapsed = utime.ticks_diff(ticks, clock.origin)
+        wrong += not 0 <= elapsed < utime.TICKS_PERIOD // 2 or clock.origin_epoch * 1000 + elapsed != EPOCH * 1000 + now
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Host time and heap objects per second of time and date strings '
+                                                 'shown, previous formatting against Clock, and check of local time '
+                                                 'and of time since clock origin over ticks_ms wraps.')
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--duration', type=float, default=600, help='Simulated time in s.')
+    parser.add_argument('--days', type=float, default=30, help='Simulated time origin of samples is checked for.')
+    args = parser.parse_args()
+
+    print('strings   updates/s  host time [us/s]  objects/s  wrong updates')
+    failed = False
+    for previous in (True, False):
+        elapsed, objects, wrong = run(args.port, args.duration, previous)
+        print('%-8s  %9.1f  %16.1f  %9.1f  %13d' % (
+            'previous' if previous else 'clock', 1000 / (PREVIOUS_PERIOD if previous else CLOCK_PERIOD),
+            elapsed / 1000, objects, wrong))
+        failed |= not previous and wrong > 0
+
+    wrong = check_origin(args.port, args.days)
+    print('origin moved on over %g days of ticks_ms: %d wrong times' % (args.days, wrong))
+
+    if failed:
+        raise SystemExit('Clock shows other local time or date than expected.')
+    if wrong:
+        raise SystemExit('Time since clock origin wraps or gives other time than expected.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import argparse
+import random
+import time as timer
+import numpy as np
+import firmware
+from sh1106_model import Sh1106Model
+
+# Time is shown every 100 ms. New values come with every beat. Sensor is read every 50 ms, and every read with no body
+# detected sets idle state of display.
+TIME_PERIOD = 100
+BEAT_PERIOD = 833
+READ_PERIOD = 50
+
+
+def clock_strings(seconds):
+    """ Get time and date strings main loop shows, 'seconds' after midnight of the first day of 2024. """
+    h, m, s = seconds // 3600 % 24, seconds // 60 % 60, seconds % 60
+    d = 1 + seconds // 86400
+    return '%02d:%02d:%02d' % (h, m, s), '%02d.%02d.%d' % (d, 1, 2024)
+
+
+class CountingFrameBuffer:
+    def __init__(self, fb):
+        """
+        Initiation of CountingFrameBuffer, wrapper of FrameBuffer counting calls of its drawing methods. On device
+        every call costs the same time of Python call, whatever it draws.
+        """
+        self.fb = fb
+        self.calls = 0
+
+    def __getattr__(self, name):
+        method = getattr(self.fb, name)
+
+        def counted(*args):
+            self.calls += 1
+            return method(*args)
+        return counted
+
+
+def previous_show_values(display, bpm, spo, temperature, symbols):
+    """
+    Display.show_values as it was before values were cached: all strings are made and drawn again, and degree symbol
+    is drawn pixel by pixel.
+    """
+    display.display.fill_rect(0, 36, 128, 28, 0)
+    display.display.text('Pulse: ' + str(int(bpm)) + ' bpm', 0, 36, 1)
+    display.display.text('SpO2 : ' + str("%.2f" % spo) + " %", 0, 46, 1)
+    display.display.text('Temp.: ' + str("%.2f" % temperature) + "  C", 0, 56, 1)
+    for y, row in enumerate(symbols.circle):
+        for x, c in enumerate(row):
+            display.display.pixel(x + 104, y + 56, c)
+
+
+def bench_values(port, calls, seed=0):
+    """
+    Time show_values calls of previous and present Display, with values changing with every call and with
+    unchanged ones. Return dictionary of (median time in ns, framebuf calls per call) by case, and check if both
+    of them draw the same pixels.
+    """
+    symbols = firmware.load('symbols', port)
+    rng = random.Random(seed)
+    values = [(rng.randint(60, 90), rng.choice((96.5, 97.0, 97.25, 98.0)), rng.choice((36.5, 36.6, 36.75)))
+              for i in range(calls)]
+    cases = {
+        'previous': (True, values),
+        'changed': (False, values),
+        'unchanged': (False, [values[0]] * calls),
+    }
+    results = {}
+    buffers = {}
+    clock = timer.perf_counter_ns
+    for case, (previous, case_values) in cases.items():
+        display = firmware.load('display', port).Display()
+        display.work_state()
+        counter = CountingFrameBuffer(display.display.framebuf)
+        display.display.framebuf = counter
+        elapsed = []
+        for bpm, spo, temperature in case_values:
+            before = clock()
+            if previous:
+                previous_show_values(display, bpm, spo, temperature, symbols)
+            else:
+                display.show_values(bpm, spo, temperature)
+            elapsed.append(clock() - before)
+        results[case] = (np.median(elapsed), counter.calls / calls)
+        buffers[case] = bytes(display.display.buffer)
+    return results, buffers['previous'] == buffers['changed']
+
+
+def run(port, screen, duration, all_pages, seed=0):
+    """
+    Draw 'screen' ('idle', 'time' or 'values') for 'duration' ms of simulated time, the way acquisition, algorithm
+    and clock tasks do. If 'all_pages' is set, all pages are sent by every show(), as display driver did before it
+    tracked changed areas. Return SPI bus stand-in with its counters, panel model, time of drawing calls in ns and
+    check if panel shows the same pixels as the framebuffer.
+    """
+    display = firmware.load('display', port).Display()
+    driver = display.display
+    spi = driver.spi
+    panel = Sh1106Model(driver.dc, driver.cs)
+    spi.device = panel
+    if all_pages:
+        show = driver.show
+
+        def show_all_pages():
+            driver.mark_all()
+            show()
+        driver.show = show_all_pages
+
+    display.setup()
+    if screen == 'idle':
+        display.idle_state()
+    else:
+        display.work_state()
+    spi.reset_counters()
+    rng = random.Random(seed)
+    clock = timer.perf_counter_ns
+    elapsed = 0
+    next_beat = BEAT_PERIOD
+    for now in range(0, int(duration), READ_PERIOD):
+        before = clock()
+        if screen == 'idle':
+            display.idle_state()
+        if screen == 'values' and now >= next_beat:
+            next_beat += BEAT_PERIOD
+            display.show_values(rng.randint(60, 90), rng.choice((96.5, 97.0, 97.25, 98.0)), 36.6)
+            display.show_alarm(0)
+        if now % TIME_PERIOD == 0:
+            time, date = clock_strings(12 * 3600 + now // 1000)
+            display.show_time(time, date, '1')
+        elapsed += clock() - before
+
+    spi.device = None
+    return spi, panel, elapsed, panel.screen() == bytes(driver.buffer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='SPI bytes per second sent to SH1106 display for idle, time and '
+                                                 'values screens, on SPI stand-in and display RAM model, and time of '
+                                                 'show_values calls.')
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--duration', type=float, default=60, help='Time of simulation in s.')
+    parser.add_argument('--calls', type=int, default=200, help='Amount of show_values calls timed.')
+    args = parser.parse_args()
+
+    print('screen   driver     bytes/s  transactions/s  bus time [ms/s]  host draw [ms/s]  panel matches')
+    failed = False
+    seconds = args.duration
+    for screen in ('idle', 'time', 'values'):
+        for all_pages in (True, False):
+            spi, panel, elapsed, matches = run(args.port, screen, args.duration * 1000, all_pages)
+            print('%-7s  %-9s  %7.0f  %14.1f  %15.2f  %16.2f  %s' % (
+                screen, 'all pages' if all_pages else 'dirty', spi.bytes / seconds, spi.transactions / seconds,
+                spi.bus_time * 1000 / seconds, elapsed / 1e6 / seconds, matches))
+            failed |= not matches
+
+    results, same = bench_values(args.port, args.calls)
+    print()
+    print('show_values  host p50 [us]  framebuf calls')
+    for case, (elapsed, calls) in results.items():
+        print('%-11s  %13.1f  %14.1f' % (case, elapsed / 1000, calls))
+    print('previous and cached show_values draw the same pixels: %s' % same)
+    failed |= not same
+
+    if failed:
+        raise SystemExit('Display shows other pixels than framebuffer keeps.')
+
+
+if __name__ == '__main__':
+    main()
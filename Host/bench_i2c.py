@@ -0,0 +1,168 @@
+import argparse
+from array import array
+import firmware
+import ppg
+from max30102_model import Max30102Model, ADDRESS
+
+# machine stand-in firmware driver makes its I2C bus and pins from.
+machine = firmware.stand_in('machine')
+
+# Main loop reads sensor FIFO every 50 ms. FIFO keeps up to 32 samples.
+LOOP_PERIOD = 50
+FIFO_DEPTH = 32
+
+# Step of simulated time in ms while waiting for interrupt.
+STEP = 1
+
+
+class Stalls:
+    def __init__(self, every, length):
+        """
+        Initiation of Stalls, blocking driver loop for 'length' ms every 'every' ms of simulated time, as display
+        flush, MQTT publish or NTP request block loop on device. No stalls if 'every' is 0.
+        """
+        self.every = every
+        self.length = length
+        self.next = every
+
+    def __call__(self, model):
+        """ Move simulated time on over the stall if it is time for it. """
+        if self.every and model.now >= self.next:
+            model.advance(self.length)
+            self.next += self.every
+
+
+def per_sample(sensor, model, duration, period, stall):
+    """
+    Previous driver path: every 'period' ms pointers are read, then every sample in its own transaction, and
+    temperature is read waiting for conversion. Return values of samples read.
+    """
+    values = []
+    while model.now < duration:
+        model.advance(period)
+        stall(model)
+        samples = sensor.get_data_samples()
+        while samples > 0:
+            red, ir = sensor.read_fifo()
+            values.append((ir, red))
+            samples -= 1
+        sensor.read_temperature()
+    return values
+
+
+def polled(sensor, model, duration, period, temperature, stall):
+    """
+    Present polled driver path: every 'period' ms all samples are read in one burst, and temperature is read by
+    Temperature without waiting. Return values of samples read.
+    """
+    red_buf, ir_buf, time_buf = (array('i', FIFO_DEPTH * [0]) for i in range(3))
+    values = []
+    while model.now < duration:
+        model.advance(period)
+        stall(model)
+        now = int(model.now)
+        count = sensor.read_samples(red_buf, ir_buf, time_buf, now)
+        values.extend(zip(ir_buf[:count], red_buf[:count]))
+        temperature.update(now)
+    return values
+
+
+def interrupt(sensor, model, duration, temperature, stall):
+    """
+    Interrupt driven driver path: FIFO is read only after almost full interrupt falls INT output, the way ESP32
+    Acquisition does. Return values of samples read.
+    """
+    red_buf, ir_buf, time_buf = (array('i', FIFO_DEPTH * [0]) for i in range(3))
+    flag = []
+    model.pin.irq(handler=flag.append, trigger=machine.Pin.IRQ_FALLING)
+    sensor.enable_fifo_interrupt()
+    values = []
+    while model.now < duration:
+        model.advance(STEP)
+        stall(model)
+        if not flag:
+            continue
+        flag.clear()
+        now = int(model.now)
+        sensor.read_interrupt_status()
+        count = sensor.read_samples(red_buf, ir_buf, time_buf, now)
+        values.extend(zip(ir_buf[:count], red_buf[:count]))
+        temperature.update(now)
+    return values
+
+
+def run(port, path, stream, duration, period, stall):
+    """
+    Run driver of given port along 'path' against the sensor model for 'duration' ms of signal. Return bus, model and
+    driver with their counters, and amount of samples read with wrong values.
+    """
+    max30102 = firmware.load('max30102', port)
+    pin = machine.Pin(23)
+    model = Max30102Model(stream, pin=pin, record=True)
+    machine.I2C.devices[ADDRESS] = model
+    sensor = max30102.Max30102()
+    sensor.set_work_current()
+    temperature = firmware.load('temperature', port).Temperature(sensor)
+
+    bus = sensor.i2c
+    bus.reset_counters()
+    start = model.produced
+    if path == 'per sample':
+        values = per_sample(sensor, model, duration, period, stall)
+    elif path == 'polled':
+        values = polled(sensor, model, duration, period, temperature, stall)
+    else:
+        values = interrupt(sensor, model, duration, temperature, stall)
+    del machine.I2C.devices[ADDRESS]
+
+    # Samples are read in order they were produced. Values are checked only if none were lost, as the oldest ones are
+    # overwritten then.
+    wrong = 0
+    if not model.lost:
+        expected = model.log[start:start + len(values)]
+        wrong = sum(1 for read, produced in zip(values, expected) if read != produced)
+    return bus, model, sensor, len(values), wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description='I2C traffic of MAX30102 driver per second of signal, on simulated '
+                                                 'bus and sensor.')
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--duration', type=float, default=60, help='Time of signal in s.')
+    parser.add_argument('--period', type=int, default=LOOP_PERIOD, help='Time between polled FIFO reads in ms.')
+    parser.add_argument('--stall-every', type=float, default=0, help='Time between loop stalls in s. No stalls if 0.')
+    parser.add_argument('--stall', type=int, default=500, help='Time of every loop stall in ms.')
+    parser.add_argument('--csv', help='Recorded stream (see replay.py) sensor measures. Synthetic one if not given.')
+    args = parser.parse_args()
+
+    if args.csv:
+        from replay import load_stream
+        stream = load_stream(args.csv)
+    else:
+        stream = ppg.generate(duration=60, rate=100)
+
+    print('path        transactions/s  bytes/s  bus load  samples/s  samples  lost  counted: read  lost  overflows  '
+          'wrong  underflows')
+    failed = False
+    seconds = args.duration
+    for path in ('per sample', 'polled', 'interrupt'):
+        stall = Stalls(args.stall_every * 1000, args.stall)
+        bus, model, sensor, read, wrong = run(args.port, path, stream, args.duration * 1000, args.period, stall)
+        print('%-10s  %14.1f  %7.0f  %7.2f%%  %9.1f  %7d  %4d  %13d  %4d  %9d  %5d  %10d' % (
+            path, bus.transactions / seconds, bus.bytes / seconds, bus.bus_time / seconds * 100, read / seconds, read,
+            model.lost, sensor.samples_read, sensor.samples_lost, sensor.overflows, wrong, model.underflows))
+        # Samples lost beyond saturated overflow counter are counted from time by read_samples, so they are off by
+        # a sample or two. Per sample path reads FIFO by its own, counting only the ones seen by overflow counter.
+        if path == 'per sample':
+            counted = sensor.samples_lost <= model.lost
+        else:
+            counted = abs(sensor.samples_lost - model.lost) <= 2 * sensor.overflows
+        failed |= bool(wrong or model.underflows or not counted)
+        failed |= path != 'per sample' and sensor.samples_read != read
+
+    if failed:
+        raise SystemExit('Driver read wrong values, read empty FIFO or did not count samples read and lost.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+import argparse
+import time as timer
+import numpy as np
+import firmware
+import ppg
+from multistream import MultiStreamHrSpOalgorithm, PORT
+
+
+def make_streams(streams, samples, seed=0):
+    """
+    Make values main loop feeds algorithm with, for many devices. Every stream has its own heart rate, spo2, noise
+    and motion artifacts. Return arrays of shape (streams, samples).
+    """
+    rng = np.random.default_rng(seed)
+    ir = np.zeros((streams, samples), dtype=np.int64)
+    red = np.zeros((streams, samples), dtype=np.int64)
+    time = np.zeros((streams, samples), dtype=np.int64)
+    for i in range(streams):
+        stream = ppg.generate(duration=samples * 0.05 + 1, bpm=rng.uniform(50, 110), spo=rng.uniform(90, 99),
+                              noise=rng.uniform(5, 60), motion_rate=rng.uniform(0, 3), seed=seed + i)
+        values = ppg.main_loop_inputs(stream)
+        ir[i], red[i], time[i] = (value[:samples] for value in values)
+    return ir, red, time
+
+
+def check(engine, ir, red, time):
+    """
+    Check if every stream gives the same values as separate HrSpOalgorithm instance of the port engine follows, fed
+    with its samples.
+    """
+    new, bpm, spo, beat_time = engine
+    module = firmware.load('algorithm', PORT)
+    for i in range(ir.shape[0]):
+        algorithm = module.HrSpOalgorithm()
+        for j in range(ir.shape[1]):
+            try:
+                expected = algorithm.count_hr_spo(int(ir[i, j]), int(red[i, j]), int(time[i, j]))
+            except Exception:
+                expected = (False, None, None)
+            if expected[0] != new[i, j] or (expected[0] and (expected[1] != bpm[i, j] or expected[2] != spo[i, j]
+                                                             or algorithm.beat_time[-1] != beat_time[i, j])):
+                raise SystemExit('Stream %d differs from HrSpOalgorithm at sample %d.' % (i, j))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Scaling of multi-stream engine with amount of streams.')
+    parser.add_argument('--streams', type=int, nargs='+', default=[1, 10, 100, 1000])
+    parser.add_argument('--samples', type=int, default=2000)
+    parser.add_argument('--check', type=int, default=10, help='Amount of streams checked against HrSpOalgorithm.')
+    args = parser.parse_args()
+
+    print('streams  engine [samples/s]  instances [samples/s]  step [us]')
+    for streams in args.streams:
+        ir, red, time = make_streams(streams, args.samples)
+
+        engine = MultiStreamHrSpOalgorithm(streams)
+        start = timer.perf_counter()
+        result = engine.count_hr_spo_block(ir, red, time)
+        engine_time = timer.perf_counter() - start
+
+        # The same streams processed by separate instances, one sample at a time.
+        module = firmware.load('algorithm', PORT)
+        instances = [module.HrSpOalgorithm() for i in range(streams)]
+        values = [(ir[i].tolist(), red[i].tolist(), time[i].tolist()) for i in range(streams)]
+        start = timer.perf_counter()
+        for j in range(args.samples):
+            for algorithm, (ir_values, red_values, time_values) in zip(instances, values):
+                try:
+                    algorithm.count_hr_spo(ir_values[j], red_values[j], time_values[j])
+                except Exception:
+                    pass
+        instances_time = timer.perf_counter() - start
+
+        checked = min(streams, args.check)
+        check(tuple(array[:checked] for array in result), ir[:checked], red[:checked], time[:checked])
+
+        total = streams * args.samples
+        print('%7d  %18.0f  %21.0f  %9.1f' % (streams, total / engine_time, total / instances_time,
+                                            engine_time / args.samples * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import argparse
+import time as timer
+from array import array
+import numpy as np
+import firmware
+import ppg
+from bench_block import errors, MAX_BPM_ERROR
+from max30102_model import Max30102Model, ADDRESS
+
+# machine stand-in firmware driver makes its I2C bus and pins from.
+machine = firmware.stand_in('machine')
+
+# Polled loop reads sensor FIFO every 50 ms. Interrupt driven one waits for INT output in steps of 1 ms of simulated
+# time. FIFO keeps up to 32 samples.
+LOOP_PERIOD = 50
+STEP = 1
+FIFO_DEPTH = 32
+
+
+def run(port, profile, stream, duration, interrupt, options):
+    """
+    Run driver of given port with acquisition 'profile' against the sensor model for 'duration' ms of signal, with
+    algorithm processing every block of samples read, as main loop does while a body is detected. FIFO is read every
+    LOOP_PERIOD ms, or after every almost full interrupt if 'interrupt' is set. Return bus, model, amount of loop
+    wake ups, CPU time of loop in ns, and new values as (beat times, bpm, spo2) lists.
+    """
+    max30102 = firmware.load('max30102', port)
+    algorithm = firmware.load('algorithm', port).HrSpOalgorithm(**options)
+    model = Max30102Model(stream, pin=machine.Pin(23))
+    machine.I2C.devices[ADDRESS] = model
+    sensor = max30102.Max30102()
+    sensor.set_profile(profile)
+    algorithm.set_sample_period(sensor.sample_period)
+
+    flag = []
+    if interrupt:
+        model.pin.irq(handler=flag.append, trigger=machine.Pin.IRQ_FALLING)
+        sensor.enable_fifo_interrupt()
+
+    red_buf, ir_buf, time_buf = (array('i', FIFO_DEPTH * [0]) for i in range(3))
+    bus = sensor.i2c
+    bus.reset_counters()
+    clock = timer.perf_counter_ns
+    wakeups = 0
+    cpu = 0
+    output = ([], [], [])
+    while model.now < duration:
+        model.advance(STEP if interrupt else LOOP_PERIOD)
+        if interrupt:
+            if not flag:
+                continue
+            flag.clear()
+        wakeups += 1
+        before = clock()
+        if interrupt:
+            sensor.read_interrupt_status()
+        count = sensor.read_samples(red_buf, ir_buf, time_buf, int(model.now))
+        new = False
+        if count:
+            try:
+                new, hr, spo2 = algorithm.count_hr_spo_block(ir_buf, red_buf, time_buf, count)
+            except Exception:
+                pass
+        cpu += clock() - before
+        if new:
+            output[0].append(algorithm.beat_time[-1])
+            output[1].append(hr)
+            output[2].append(spo2)
+    del machine.I2C.devices[ADDRESS]
+    return bus, model, wakeups, cpu, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loop CPU time, I2C bus load and detection error of every MAX30102 '
+                                                 'acquisition profile, on simulated bus and sensor.')
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--duration', type=float, default=60, help='Time of signal in s.')
+    parser.add_argument('--noise', type=float, default=100, help='Noise of every ADC sample, in sensor counts.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--interrupt', action='store_true', help='Read FIFO after almost full interrupt, not polled.')
+    parser.add_argument('--fixed-point', action='store_true', help='Use fixed point mode of ESP8266 algorithm.')
+    parser.add_argument('--streams', type=int, default=4, help='Amount of streams work profile is checked on.')
+    args = parser.parse_args()
+
+    max30102 = firmware.load('max30102', args.port)
+    profiles = max30102.profiles
+    options = {'fixed_point': True} if args.fixed_point else {}
+
+    # Stream is generated at the highest ADC rate of all profiles, so every sample averaged by sensor has its own noise.
+    rate = max(profile[0] for profile in profiles.values())
+    stream = ppg.generate(duration=args.duration + 1, rate=rate, noise=args.noise, seed=args.seed)
+
+    print('profile   samples/s  wake ups/s  loop CPU [ms/s]  transactions/s  bytes/s  bus load  values  bpm err  '
+          'spo2 err')
+    seconds = args.duration
+    inaccurate = []
+    bpm_errors = {}
+    for name in profiles:
+        bus, model, wakeups, cpu, output = run(args.port, name, stream, args.duration * 1000, args.interrupt, options)
+        bpm_error, spo_error = errors(stream, *output)
+        print('%-8s  %9.1f  %10.1f  %15.2f  %14.1f  %7.0f  %7.2f%%  %6d  %7.2f  %8.2f' % (
+            name, model.consumed / seconds, wakeups / seconds, cpu / 1e6 / seconds, bus.transactions / seconds,
+            bus.bytes / seconds, bus.bus_time / seconds * 100, len(output[0]), bpm_error, spo_error))
+        bpm_errors[name] = bpm_error
+        # Error is NaN if no values were given at all.
+        if not bpm_error <= MAX_BPM_ERROR:
+            inaccurate.append(name)
+
+    # Work profile device uses by default has to keep the bound on other streams too, not only on the one shown above.
+    work = max30102.work_profile
+    work_errors = [bpm_errors[work]]
+    for seed in range(args.seed + 1, args.seed + args.streams):
+        stream = ppg.generate(duration=args.duration + 1, rate=rate, noise=args.noise, seed=seed)
+        output = run(args.port, work, stream, args.duration * 1000, args.interrupt, options)[-1]
+        work_errors.append(errors(stream, *output)[0])
+    # NaN of any stream is kept by np.max.
+    work_error = np.max(work_errors)
+    print('work profile %s: the highest bpm err of %d streams %.2f' % (work, args.streams, work_error))
+    if not work_error <= MAX_BPM_ERROR and work not in inaccurate:
+        inaccurate.append(work)
+
+    if inaccurate:
+        raise SystemExit('Bpm error is higher than %d bpm for profiles: %s.' % (MAX_BPM_ERROR, ', '.join(inaccurate)))
+
+
+if __name__ == '__main__':
+    main()
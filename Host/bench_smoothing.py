@@ -0,0 +1,108 @@
+import argparse
+import ast
+import time as timer
+import firmware
+from heapmodel import HeapModel
+
+# Smoothing made the way main loop did it before: slicing buffors and counting moving average of whole of them. It is
+# kept as source, so it is instrumented by HeapModel the same way as firmware modules.
+LIST_SMOOTHING = '''
+class ListSmoothing:
+    def __init__(self, algorithm, n):
+        self.algorithm = algorithm
+        self.n = n
+        self.red_buf = []
+        self.ir_buf = []
+        self.time_buf = []
+
+    def update(self, red, ir, time):
+        self.red_buf.append(int(red))
+        self.ir_buf.append(int(ir))
+        self.time_buf.append(time)
+        if len(self.red_buf) > self.n:
+            self.red_buf = self.red_buf[1::]
+            self.ir_buf = self.ir_buf[1::]
+            self.time_buf = self.time_buf[1::]
+        elif len(self.red_buf) < self.n:
+            return None
+        red_averaged = self.algorithm.moving_average(self.red_buf, self.n)
+        ir_averaged = self.algorithm.moving_average(self.ir_buf, self.n)
+        time_averaged = self.algorithm.moving_average(self.time_buf, self.n)
+        return int(red_averaged[-1]), int(ir_averaged[-1]), time_averaged[-1]
+'''
+
+
+class StreamingSmoothing:
+    def __init__(self, buffers, n):
+        """
+        Smoothing made by MovingAverage instances, the way main loop does it now.
+        """
+        self.red_average = buffers.MovingAverage(n)
+        self.ir_average = buffers.MovingAverage(n)
+        self.time_average = buffers.MovingAverage(n)
+
+    def update(self, red, ir, time):
+        return self.red_average.update(red), self.ir_average.update(ir), self.time_average.update(time)
+
+
+def smoothings(port, n, heap=None):
+    """
+    Get list and streaming smoothing of given port, with window of 'n' samples. Both are instrumented by 'heap', if
+    given.
+    """
+    algorithm = firmware.load('algorithm', port, instrumentation=heap).HrSpOalgorithm
+    buffers = firmware.load('buffers', port, instrumentation=heap)
+    tree = ast.parse(LIST_SMOOTHING)
+    namespace = {}
+    if heap is not None:
+        tree = ast.fix_missing_locations(heap.transform(tree))
+        namespace.update(heap.namespace)
+    exec(compile(tree, 'previous main.py', 'exec'), namespace)
+    return {'lists': namespace['ListSmoothing'](algorithm, n), 'streaming': StreamingSmoothing(buffers, n)}
+
+
+def stepper(smoothing):
+    """
+    Get function putting the next sample into 'smoothing' on every call. Samples are similar to ones read from sensor.
+    Windows are filled first, so steady state is measured.
+    """
+    state = [0]
+
+    def step():
+        i = state[0]
+        state[0] = i + 1
+        smoothing.update(90000 + (i * 37) % 700, 100000 + (i * 53) % 900, 50 * i)
+
+    for i in range(10):
+        step()
+    return step
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare heap objects and host time per sample of old and new '
+                                                 'smoothing of main loop. Fails if streaming smoothing allocates any '
+                                                 'heap object.')
+    parser.add_argument('--port', default='ESP8266', choices=firmware.PORTS)
+    parser.add_argument('--iterations', type=int, default=10000)
+    parser.add_argument('-n', type=int, default=5)
+    args = parser.parse_args()
+
+    # Objects are counted on instrumented code, time is taken on plain one.
+    heap = HeapModel()
+    instrumented = smoothings(args.port, args.n, heap)
+    objects = {}
+    for name, smoothing in smoothings(args.port, args.n).items():
+        objects[name] = heap.measure(stepper(instrumented[name]), args.iterations)
+        step = stepper(smoothing)
+        start = timer.perf_counter()
+        for i in range(args.iterations):
+            step()
+        elapsed = timer.perf_counter() - start
+        print('%-10s %8.2f objects/sample %8.2f us/sample' % (name, objects[name], elapsed / args.iterations * 1e6))
+
+    if objects['streaming'] > 0:
+        raise SystemExit('Streaming smoothing allocates %.2f heap objects per sample.' % objects['streaming'])
+
+
+if __name__ == '__main__':
+    main()
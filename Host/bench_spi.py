@@ -0,0 +1,122 @@
+import argparse
+import ast
+import time as timer
+import types
+import numpy as np
+import firmware
+from heapmodel import HeapModel
+from sh1106_model import Sh1106Model
+
+# Write path of Spi driver before commands were batched. Bus was set up before every write, and every command was
+# written in its own transaction from new bytearray. All pages were sent by every show().
+PREVIOUS_DRIVER = '''
+def write_cmd(self, cmd):
+    self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+    if self.cs is not None:
+        self.cs(1)
+        self.dc(0)
+        self.cs(0)
+        self.spi.write(bytearray([cmd]))
+        self.cs(1)
+    else:
+        self.dc(0)
+        self.spi.write(bytearray([cmd]))
+
+def write_data(self, buf):
+    self.spi.init(baudrate=self.rate, polarity=0, phase=0)
+    if self.cs is not None:
+        self.cs(1)
+        self.dc(1)
+        self.cs(0)
+        self.spi.write(buf)
+        self.cs(1)
+    else:
+        self.dc(1)
+        self.spi.write(buf)
+
+def show(self):
+    for page in range(self.height // 8):
+        self.write_cmd(set_page_address | page)
+        self.write_cmd(low_column_address | 2)
+        self.write_cmd(high_column_address | 0)
+        self.write_data(self.buffer[ self.width * page:self.width * page + self.width])
+'''
+
+
+def previous_driver(driver, module, heap):
+    """
+    Replace write path of Spi 'driver' with the previous one, instrumented by 'heap' the same way as firmware module.
+    """
+    tree = ast.fix_missing_locations(heap.transform(ast.parse(PREVIOUS_DRIVER)))
+    namespace = dict(vars(module))
+    namespace.update(heap.namespace)
+    exec(compile(tree, 'previous sh1106.py', 'exec'), namespace)
+    for name in ('write_cmd', 'write_data', 'show'):
+        setattr(driver, name, types.MethodType(namespace[name], driver))
+
+
+def draw_time(driver, frame):
+    """ Draw changing seconds of time, as show_time does once a second. """
+    driver.fill_rect(32, 0, 64, 8, 0)
+    driver.text('12:00:%02d' % (frame % 60), 32, 0, 1)
+
+
+def run(port, previous, full, frames):
+    """
+    Send 'frames' frames to display model through Spi driver of given port, the previous or the present one. Every
+    frame is whole display if 'full' is set, or changed seconds of time otherwise. Return time of show() calls in ns,
+    SPI bus stand-in with its counters, heap objects per frame, and check if display shows the framebuffer.
+    """
+    heap = HeapModel()
+    module = firmware.load('sh1106', port, instrumentation=heap)
+    driver = module.Spi()
+    if previous:
+        previous_driver(driver, module, heap)
+    spi = driver.spi
+    panel = Sh1106Model(driver.dc, driver.cs)
+    spi.device = panel
+    spi.reset_counters()
+
+    clock = timer.perf_counter_ns
+    elapsed = []
+    objects = 0
+    for frame in range(frames):
+        if full:
+            driver.fill(frame & 1)
+            driver.text('frame %d' % frame, 0, 0, 1 - (frame & 1))
+        else:
+            draw_time(driver, frame)
+        before_objects = heap.count
+        before = clock()
+        driver.show()
+        elapsed.append(clock() - before)
+        objects += heap.count - before_objects
+    spi.device = None
+    return np.array(elapsed), spi, objects / frames, panel.screen() == bytes(driver.buffer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per frame time, SPI transactions and heap objects of SH1106 Spi '
+                                                 'driver, previous against batched command writes.')
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    print('frame    driver    show p50 [us]  bus time [us]  transactions  spi.init  bytes  objects  display matches')
+    failed = False
+    frames = args.frames
+    for full in (True, False):
+        for previous in (True, False):
+            elapsed, spi, objects, matches = run(args.port, previous, full, frames)
+            print('%-7s  %-8s  %13.1f  %13.1f  %12.1f  %8.1f  %5.0f  %7.1f  %s' % (
+                'full' if full else 'time', 'previous' if previous else 'batched', np.median(elapsed) / 1000,
+                spi.bus_time * 1e6 / frames, spi.transactions / frames, spi.inits / frames, spi.bytes / frames,
+                objects, matches))
+            failed |= not matches
+
+    if failed:
+        raise SystemExit('Display shows other pixels than framebuffer keeps.')
+
+
+if __name__ == '__main__':
+    main()
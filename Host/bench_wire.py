@@ -0,0 +1,122 @@
+import argparse
+import importlib.util
+import os
+import random
+import time as timer
+import firmware
+from heapmodel import HeapModel
+
+# utime and ujson stand-ins firmware modules use.
+utime = firmware.stand_in('utime')
+ujson = firmware.stand_in('ujson')
+
+# Decoder of PC app. Its directory name has a space, so it is loaded from its path.
+spec = importlib.util.spec_from_file_location('pc_wire', os.path.join(firmware.ROOT, 'PC app', 'wire.py'))
+pc_wire = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pc_wire)
+
+# Epoch seconds (UTC) of clock origin, and offset of local time, as Clock keeps them.
+EPOCH = 1704063540
+OFFSET = 3600
+
+
+def make_batch(size, seed):
+    """
+    Get batch of 'size' measures as Data keeps them: dates, times, beat times in ms since clock origin, hr, spo2,
+    temperature and alarm codes. Beats come about every 900 ms, and values drift slowly.
+    """
+    rng = random.Random(seed)
+    columns = [[] for i in range(7)]
+    time = 60000
+    hr = 70
+    spo2 = 97.0
+    temperature = 36.6
+    for i in range(size):
+        time += rng.randint(700, 1100)
+        hr = min(120, max(40, hr + rng.randint(-2, 2)))
+        spo2 = round(min(100.0, max(90.0, spo2 + rng.uniform(-0.3, 0.3))), 2)
+        temperature = round(min(38.0, max(36.0, temperature + rng.uniform(-0.02, 0.02))), 2)
+        y, m, d, h, minute, s = utime.localtime(EPOCH + time // 1000 + OFFSET)[0:6]
+        alarm = 1 if hr < 50 else 2 if hr > 90 else 0
+        for column, value in zip(columns, ('%02d.%02d.%d' % (d, m, y), '%02d:%02d:%02d' % (h, minute, s), time, hr,
+                                           spo2, temperature, alarm)):
+            column.append(value)
+    return columns
+
+
+def encoders(port, heap=None):
+    """
+    Get encoders of batch as Monitor.batch of given port makes them: fixed width records, varint differences of columns
+    with and without run length encoded alarms, and JSON. Binary encoders are instrumented by 'heap', if given.
+    """
+    wire = firmware.load('wire', port, instrumentation=heap)
+    alarm_names = firmware.load('monitor', port).alarm_names
+
+    def records(columns):
+        return wire.encode('1', EPOCH, OFFSET, *columns[2:])
+
+    def delta(columns):
+        return wire.encode_delta('1', EPOCH, OFFSET, *columns[2:])
+
+    def delta_no_rle(columns):
+        return wire.encode_delta('1', EPOCH, OFFSET, *columns[2:], rle=False)
+
+    def json(columns):
+        return ujson.dumps(columns[:6] + [[alarm_names[alarm] for alarm in columns[6]]])
+
+    return {'records': records, 'delta': delta, 'delta-no-rle': delta_no_rle, 'json': json}
+
+
+def measure(function, argument, repeat):
+    """ Get mean host time in us of 'function' called with 'argument', and its last result. """
+    start = timer.perf_counter_ns()
+    for i in range(repeat):
+        result = function(argument)
+    return (timer.perf_counter_ns() - start) / repeat / 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Payload size, host encode/decode time and heap objects of encode '
+                                                 'of measure batches sent as binary records, varint differences of '
+                                                 'columns (see wire.py) or JSON, checked against each other.')
+    parser.add_argument('--port', default='ESP8266', choices=firmware.PORTS)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100], help='Measures per batch.')
+    parser.add_argument('--repeat', type=int, default=1000, help='Encodes and decodes timed per batch.')
+    args = parser.parse_args()
+
+    # Heap objects ujson.dumps makes inside are not seen by HeapModel, so they are not shown for JSON.
+    heap = HeapModel()
+    instrumented = encoders(args.port, heap)
+
+    print('format        measures  payload [B]  B/measure  encode [us]  decode [us]  encode objects')
+    failed = False
+    for size in args.sizes:
+        columns = make_batch(size, seed=size)
+        decoded = {}
+        for name, encode in encoders(args.port).items():
+            encode_time, payload = measure(encode, columns, args.repeat)
+            decode_time, decoded[name] = measure(pc_wire.decode, bytes(payload.encode() if name == 'json'
+                                                                       else payload), args.repeat)
+            objects = '-' if name == 'json' else '%d' % heap.measure(lambda: instrumented[name](columns), 10)
+            print('%-12s  %8d  %11d  %9.1f  %11.1f  %11.1f  %14s' % (
+                name, size, len(payload), len(payload) / size, encode_time, decode_time, objects))
+        failed |= any(values != decoded['json'] for values in decoded.values())
+
+    # Beat times which do not fit in header have to make binary encoders give up, so the batch is sent as JSON.
+    columns = make_batch(10, seed=0)
+    unfit = []
+    for first in (-1, 1 << 32):
+        times = [time - columns[2][0] + first for time in columns[2]]
+        shifted = columns[:2] + [times] + columns[3:]
+        unfit += [name for name, encode in encoders(args.port).items()
+                  if name != 'json' and encode(shifted) is not None]
+    print('binary encoders encoding beat times out of header range: %s' % (', '.join(unfit) or 'none'))
+
+    if failed:
+        raise SystemExit('Binary batch decodes to other values than JSON one.')
+    if unfit:
+        raise SystemExit('Binary batch is made for beat times out of header range: %s.' % ', '.join(unfit))
+
+
+if __name__ == '__main__':
+    main()
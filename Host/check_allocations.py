@@ -0,0 +1,150 @@
+import argparse
+import asyncio
+import firmware
+import ppg
+from heapmodel import HeapModel
+from max30102_model import Max30102Model, ADDRESS
+from sh1106_model import Sh1106Model
+from sim_runtime import Broker
+
+# machine stand-in firmware drivers make their buses and pins from, and utime stand-in firmware modules take ticks from.
+machine = firmware.stand_in('machine')
+utime = firmware.stand_in('utime')
+
+# Acquisition task of ESP8266 polls sensor FIFO every 50 ms. The same period is used for ESP32, whose task is released
+# by FIFO almost full interrupt, as the check counts objects per iteration, not per time.
+PERIOD = 50
+
+# Iterations taken before steady state: sensor profile switched, display in work state, buffors of algorithm filled.
+WARM_UP = 200
+
+# Kinds of iterations, see run().
+KINDS = ('steady', 'temperature', 'restart', 'extremum', 'values')
+
+# The most heap objects an iteration of every kind may allocate in acquisition and in algorithm step, by port, as
+# measured. Steady iterations allocate nothing. What the other kinds allocate:
+#   temperature - conversion result read is a float made of two, 2 objects.
+#   restart     - acquisition makes new data buffors, 9 objects. Algorithm step allocates nothing, but temperature
+#                 may be read in the same iteration, 2 objects.
+#   extremum    - ESP32 counts dc of local minimum (slope and 4 float results), ac and ac/dc ratio, 7 floats. ESP8266
+#                 counts them on integers, and only turns spo2 back into float, 1 object. Beat found more than 3 s after
+#                 the previous one makes algorithm setup() make its 7 buffors again, after ESP32 counted beat period and
+#                 bpm, 2 floats. Temperature may be read in the same iteration, 2 objects more.
+#   values      - ESP32 counts beat period and bpm, 2 floats, difference from the previous bpm and its absolute value,
+#                 2 floats, and mean of bpm buffor, 10 float additions and division, 11 floats. ESP8266 rounds
+#                 temperature, 1 float, formats values shown, up to 4 strings, and every 10 values encodes batch sent
+#                 with runtime counters and makes new data buffors, 26 objects. Temperature may be read in the same
+#                 iteration, 2 objects more.
+BOUNDS = {
+    'ESP32': {'steady': (0, 0), 'temperature': (0, 2), 'restart': (9, 2), 'extremum': (0, 11), 'values': (0, 17)},
+    'ESP8266': {'steady': (0, 0), 'temperature': (0, 2), 'restart': (9, 2), 'extremum': (0, 9), 'values': (0, 33)},
+}
+
+
+def run(port, stream, iterations):
+    """
+    Run acquisition and algorithm steps of Monitor of given port one after another on MAX30102 model measuring 'stream',
+    every PERIOD ms of simulated time. Firmware modules are instrumented by HeapModel. Return heap objects allocated by
+    acquisition and by algorithm step for every iteration after WARM_UP, as dictionary of lists of (acquisition,
+    algorithm) pairs, split by kind of iteration:
+        steady      - no extremum of any signal was found, nor temperature read,
+        temperature - temperature conversion result was read,
+        restart     - measure was started again after beats were lost, so data collected was dropped,
+        extremum    - extremum was found, so dc, ac and beat period were counted, but no new values were given,
+        values      - new hr or spo2 values were given, shown and collected to send.
+    """
+    heap = HeapModel()
+    pin = machine.Pin(23)
+    model = Max30102Model(stream, pin=pin)
+    # Ticks follow simulated time of the model, so samples and beats are timed by it, not by host clock, as the model
+    # is moved on much faster than in real time.
+    ticks_ns = utime.ticks_ns
+    utime.ticks_ns = lambda: int(model.now * 1000000)
+
+    def load(name):
+        return firmware.load(name, port, instrumentation=heap)
+
+    machine.I2C.devices[ADDRESS] = model
+    sensor = load('max30102').Max30102()
+    # ESP8266 algorithm counts on integers, as main.py of this port sets it.
+    algorithm = load('algorithm').HrSpOalgorithm(**({'fixed_point': True} if port == 'ESP8266' else {}))
+    display = load('display').Display()
+    driver = display.display
+    driver.spi.device = Sh1106Model(driver.dc, driver.cs)
+    arguments = ('1', Broker(0), sensor)
+    if port == 'ESP32':
+        arguments += (load('acquisition').Acquisition(sensor, pin),)
+    temperature = load('temperature').Temperature(sensor, period=10000)
+    data = load('data').Data()
+    monitor = load('monitor').Monitor(*arguments, algorithm, temperature, display, load('led').Led(), data,
+                                      load('clock').Clock())
+
+    loop = asyncio.new_event_loop()
+    objects = {kind: [] for kind in KINDS}
+    try:
+        for iteration in range(WARM_UP + iterations):
+            model.advance(PERIOD)
+            collected = data.check_amount()
+            before = heap.count
+            loop.run_until_complete(monitor.acquire())
+            acquired = heap.count
+            extremums = tuple(algorithm.local_max_time + algorithm.local_min_time)
+            conversions = temperature.conversions
+            loop.run_until_complete(monitor.process())
+            if iteration >= WARM_UP:
+                if algorithm.new_values:
+                    kind = 'values'
+                elif extremums != tuple(algorithm.local_max_time + algorithm.local_min_time):
+                    kind = 'extremum'
+                elif data.check_amount() < collected:
+                    kind = 'restart'
+                elif conversions != temperature.conversions:
+                    kind = 'temperature'
+                else:
+                    kind = 'steady'
+                objects[kind].append((acquired - before, heap.count - acquired))
+    finally:
+        loop.close()
+        del machine.I2C.devices[ADDRESS]
+        utime.ticks_ns = ticks_ns
+    return objects
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Heap objects allocated per iteration of acquisition and algorithm '
+                                                 'steps of main loop, on both ports. Fails if any iteration allocates '
+                                                 'more than BOUNDS of its kind allow, e.g. if any steady one (no '
+                                                 'extremum found) allocates anything.')
+    parser.add_argument('--duration', type=float, default=60, help='Simulated time checked in s, after warm up.')
+    parser.add_argument('--noise', type=float, default=100, help='Noise of every ADC sample, in sensor counts.')
+    parser.add_argument('--dropout-rate', type=float, default=2,
+                        help='Dropouts per minute, so restarts of measure and lost beats are checked too.')
+    args = parser.parse_args()
+
+    iterations = int(args.duration * 1000 / PERIOD)
+    stream = ppg.generate(duration=args.duration + WARM_UP * PERIOD / 1000 + 5, rate=400, noise=args.noise,
+                          dropout_rate=args.dropout_rate)
+
+    print('port     kind         iterations  acquisition mean/max  algorithm mean/max  bounds')
+    failed = []
+    for port in firmware.PORTS:
+        objects = run(port, stream, iterations)
+        for kind in KINDS:
+            pairs = objects[kind]
+            if not pairs:
+                continue
+            acquisition = [pair[0] for pair in pairs]
+            algorithm = [pair[1] for pair in pairs]
+            bounds = BOUNDS[port][kind]
+            print('%-7s  %-11s  %10d  %15.2f/%-4d  %13.2f/%-4d  %d/%d' % (
+                port, kind, len(pairs), sum(acquisition) / len(pairs), max(acquisition),
+                sum(algorithm) / len(pairs), max(algorithm), *bounds))
+            if max(acquisition) > bounds[0] or max(algorithm) > bounds[1]:
+                failed.append('%s %s' % (port, kind))
+
+    if failed:
+        raise SystemExit('Iterations allocate more heap objects than bounds allow: %s.' % ', '.join(failed))
+
+
+if __name__ == '__main__':
+    main()
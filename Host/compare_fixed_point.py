@@ -0,0 +1,91 @@
+import argparse
+import numpy as np
+import firmware
+import ppg
+from heapmodel import HeapModel
+from replay import load_stream
+
+# Documented tolerance of fixed point mode against float one. Spo2 values close to 60 or 100 may be kept in buffor by
+# one of variants only, which moves the mean by more than rounding does until the value leaves buffor. So spo2
+# difference is checked for 90th percentile, and its maximum is checked against wider tolerance.
+BPM_TOLERANCE = 1
+SPO_TOLERANCE = 0.05
+SPO_MAX_TOLERANCE = 1
+
+
+def run(algorithm, ir, red, time):
+    """
+    Feed algorithm with samples one by one. Return dictionary of new values, with sample indexes as keys.
+    """
+    values = {}
+    for i in range(len(ir)):
+        try:
+            new, hr, spo2 = algorithm.count_hr_spo(ir[i], red[i], time[i])
+        except Exception:
+            continue
+        if new:
+            values[i] = (hr, spo2)
+    return values
+
+
+def allocations(fixed_point, ir, red, time):
+    """
+    Get mean amount of heap objects MicroPython allocates per count_hr_spo call over whole stream.
+    """
+    heap = HeapModel()
+    algorithm = firmware.load('algorithm', 'ESP8266', heap).HrSpOalgorithm(fixed_point=fixed_point)
+    state = [0]
+
+    def step():
+        i = state[0]
+        state[0] = i + 1
+        try:
+            algorithm.count_hr_spo(ir[i], red[i], time[i])
+        except Exception:
+            pass
+
+    return heap.measure(step, len(ir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare fixed point and float HrSpOalgorithm of ESP8266.')
+    parser.add_argument('--input', help='CSV file saved by replay.save_stream. Synthetic streams used if not given.')
+    parser.add_argument('--streams', type=int, default=10, help='Amount of synthetic streams.')
+    parser.add_argument('--duration', type=float, default=600)
+    args = parser.parse_args()
+
+    module = firmware.load('algorithm', 'ESP8266')
+    if args.input:
+        streams = [load_stream(args.input)]
+    else:
+        rng = np.random.default_rng(0)
+        streams = [ppg.generate(duration=args.duration, bpm=rng.uniform(45, 120), spo=rng.uniform(88, 99),
+                                noise=rng.uniform(5, 100), motion_rate=rng.uniform(0, 3), seed=i)
+                   for i in range(args.streams)]
+
+    failed = False
+    print('stream  values  common  bpm diff  spo2 p90  spo2 max  float [obj/call]  fixed [obj/call]')
+    for n, stream in enumerate(streams):
+        ir, red, time = (values.tolist() for values in ppg.main_loop_inputs(stream))
+        float_values = run(module.HrSpOalgorithm(), ir, red, time)
+        fixed_values = run(module.HrSpOalgorithm(fixed_point=True), ir, red, time)
+
+        # Values are compared for samples where both of variants gave new values.
+        common = sorted(set(float_values) & set(fixed_values))
+        bpm_diff = max([abs(float_values[i][0] - fixed_values[i][0]) for i in common] or [0])
+        spo_diff = np.abs([float_values[i][1] - fixed_values[i][1] for i in common] or [0])
+        spo_p90, spo_max = np.percentile(spo_diff, 90), spo_diff.max()
+        if bpm_diff > BPM_TOLERANCE or spo_p90 > SPO_TOLERANCE or spo_max > SPO_MAX_TOLERANCE:
+            failed = True
+
+        float_objects = allocations(False, ir, red, time)
+        fixed_objects = allocations(True, ir, red, time)
+        print('%6d  %6d  %6d  %8d  %8.2f  %8.2f  %16.2f  %16.2f' % (n, len(float_values), len(common), bpm_diff,
+                                                                     spo_p90, spo_max, float_objects, fixed_objects))
+
+    if failed:
+        raise SystemExit('Fixed point values differ from float ones more than tolerance allows.')
+
+
+if __name__ == '__main__':
+    main()
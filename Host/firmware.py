@@ -0,0 +1,133 @@
+import ast
+import gc
+import importlib
+import importlib.abc
+import importlib.util
+import os
+import sys
+import time
+
+# Root directory of repository. Firmware of each port is placed in its own directory there.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Ports available in repository.
+PORTS = ('ESP32', 'ESP8266')
+
+# Stand-ins of MicroPython modules firmware uses, as machine, utime and uasyncio. They are used only if there is no
+# module of the same name.
+HARDWARE = os.path.join(ROOT, 'Host', 'hardware')
+
+# Modules already loaded for each port and instrumentation. Modules loaded without instrumentation are kept under None.
+_modules = {}
+
+
+def port_modules(port):
+    """
+    Get names of all firmware modules of given port. These are all the .py files placed in port directory.
+    """
+    directory = os.path.join(ROOT, port)
+    return [name[:-3] for name in os.listdir(directory) if name.endswith('.py')]
+
+
+class InstrumentedLoader(importlib.abc.Loader):
+    def __init__(self, path, instrumentation):
+        """
+        Initiation of InstrumentedLoader executing firmware module with its syntax tree changed by 'instrumentation'.
+        Instrumentation is an object with 'transform(tree)' method returning changed tree and 'namespace' dictionary
+        of names changed code uses. Changed code is never cached, so plain imports of the same file are not affected.
+        """
+        self.path = path
+        self.instrumentation = instrumentation
+
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        with open(self.path) as f:
+            tree = ast.parse(f.read(), self.path)
+        tree = ast.fix_missing_locations(self.instrumentation.transform(tree))
+        module.__dict__.update(self.instrumentation.namespace)
+        exec(compile(tree, self.path, 'exec'), module.__dict__)
+
+
+class InstrumentedFinder(importlib.abc.MetaPathFinder):
+    def __init__(self, directory, names, instrumentation):
+        """
+        Initiation of InstrumentedFinder finding firmware modules of one port and loading them by InstrumentedLoader.
+        """
+        self.directory = directory
+        self.names = names
+        self.instrumentation = instrumentation
+
+    def find_spec(self, fullname, path=None, target=None):
+        if fullname not in self.names:
+            return None
+        path = os.path.join(self.directory, fullname + '.py')
+        return importlib.util.spec_from_file_location(fullname, path,
+                                                      loader=InstrumentedLoader(path, self.instrumentation))
+
+
+def load(name, port='ESP32', instrumentation=None):
+    """
+    Load firmware module named 'name' of given port on the host. Firmware modules import each other by plain names
+    (e.g. 'import mathfunctions as math'), so both ports can not be simply put on sys.path at once. Port directory is
+    put on sys.path only for the time of import, and every firmware module imported meanwhile is kept aside, so the
+    same module of the other port can be loaded later on as well. Stand-ins of MicroPython modules are put on sys.path
+    for the same time.
+
+    If 'instrumentation' is given, module and every firmware module it imports are loaded with code changed by it (see
+    InstrumentedLoader). These are kept apart from plain ones.
+    """
+    if port not in PORTS:
+        raise ValueError('Unknown port: ' + str(port))
+    modules = _modules.setdefault((port, instrumentation), {})
+    if name in modules:
+        return modules[name]
+
+    names = port_modules(port)
+    directory = os.path.join(ROOT, port)
+    finder = None if instrumentation is None else InstrumentedFinder(directory, names, instrumentation)
+
+    # Put aside modules of any other port and put modules of this port loaded before in their place.
+    stashed = {key: sys.modules.pop(key) for key in names if key in sys.modules}
+    sys.modules.update(modules)
+    sys.path.insert(0, directory)
+    sys.path.append(HARDWARE)
+    if finder is not None:
+        sys.meta_path.insert(0, finder)
+    try:
+        module = importlib.import_module(name)
+    finally:
+        if finder is not None:
+            sys.meta_path.remove(finder)
+        sys.path.remove(directory)
+        sys.path.remove(HARDWARE)
+        # MicroPython 'time' module has all functions of 'utime' (e.g. sleep_ms), so firmware modules importing
+        # 'time' get utime stand-in in place of CPython module. CPython 'gc' module is always imported, so firmware
+        # modules get stand-in of MicroPython one the same way.
+        utime = stand_in('utime')
+        micropython_gc = stand_in('micropython_gc')
+        for key in names:
+            if key in sys.modules:
+                modules[key] = sys.modules.pop(key)
+                if getattr(modules[key], 'time', None) is time:
+                    modules[key].time = utime
+                if getattr(modules[key], 'gc', None) is gc:
+                    modules[key].gc = micropython_gc
+        sys.modules.update(stashed)
+
+    return module
+
+
+def stand_in(name):
+    """
+    Import stand-in of MicroPython module named 'name' (e.g. 'machine') under its plain name. Firmware modules loaded
+    by load() get the same module, so host code can attach device models to it or drive its pins.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    sys.path.append(HARDWARE)
+    try:
+        return importlib.import_module(name)
+    finally:
+        sys.path.remove(HARDWARE)
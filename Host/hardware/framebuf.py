@@ -0,0 +1,92 @@
+# Stand-in of MicroPython 'framebuf' module, so firmware modules drawing on display can run on the host. Only formats
+# used by firmware are supported. Text is drawn with 8x8 pixel characters, but their shapes are made up from character
+# codes, not taken from MicroPython font, so pixels of text differ from the ones on device.
+
+MVLSB = 0
+MONO_VLSB = 0
+MONO_HLSB = 3
+
+
+class FrameBuffer:
+    def __init__(self, buffer, width, height, format, stride=None):
+        """
+        Initiation of FrameBuffer stand-in drawing on monochrome 'buffer'. In MONO_VLSB format each byte keeps 8
+        vertical pixels, with rows of bytes placed one after another. In MONO_HLSB format each byte keeps 8 horizontal
+        pixels, the leftmost one in the highest bit.
+        """
+        if format not in (MVLSB, MONO_HLSB):
+            raise ValueError('Format not supported: ' + str(format))
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+        self.format = format
+        self.stride = width if stride is None else stride
+
+    def index(self, x, y):
+        """ Get index of byte keeping pixel x, y and mask of its bit. """
+        if self.format == MVLSB:
+            return (y >> 3) * self.stride + x, 1 << (y & 7)
+        return (y * ((self.stride + 7) & ~7) + x) >> 3, 0x80 >> (x & 7)
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        i, mask = self.index(x, y)
+        if c is None:
+            return 1 if self.buffer[i] & mask else 0
+        if c:
+            self.buffer[i] |= mask
+        else:
+            self.buffer[i] &= ~mask
+
+    def fill(self, c):
+        value = 0xff if c else 0
+        for i in range(len(self.buffer)):
+            self.buffer[i] = value
+
+    def fill_rect(self, x, y, w, h, c):
+        for j in range(max(y, 0), min(y + h, self.height)):
+            for i in range(max(x, 0), min(x + w, self.width)):
+                self.pixel(i, j, c)
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c):
+        self.hline(x, y, w, c)
+        self.hline(x, y + h - 1, w, c)
+        self.vline(x, y, h, c)
+        self.vline(x + w - 1, y, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        steps = max(abs(x2 - x1), abs(y2 - y1))
+        for k in range(steps + 1):
+            t = k / steps if steps else 0
+            self.pixel(round(x1 + (x2 - x1) * t), round(y1 + (y2 - y1) * t), c)
+
+    def scroll(self, xstep, ystep):
+        pixels = [[self.pixel(x, y) for x in range(self.width)] for y in range(self.height)]
+        for y in range(self.height):
+            for x in range(self.width):
+                if 0 <= x - xstep < self.width and 0 <= y - ystep < self.height:
+                    self.pixel(x, y, pixels[y - ystep][x - xstep])
+
+    def text(self, string, x, y, c=1):
+        # Columns of every character are made up from its code. Space and the last column of each character are empty.
+        for k, char in enumerate(string):
+            code = ord(char)
+            for column in range(8):
+                bits = 0 if code == 32 or column == 7 else (code * 37 + column * 11) & 0x7e | 0x01
+                for row in range(8):
+                    if bits >> row & 1:
+                        self.pixel(x + 8 * k + column, y + row, c)
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        for j in range(fbuf.height):
+            for i in range(fbuf.width):
+                c = fbuf.pixel(i, j)
+                if c != key:
+                    self.pixel(x + i, y + j, c)
@@ -0,0 +1,158 @@
+# Stand-in of MicroPython 'machine' module, so firmware modules using it can run on the host.
+import time
+
+
+class Pin:
+    IN = 0
+    OUT = 1
+    OPEN_DRAIN = 2
+    PULL_UP = 1
+    PULL_DOWN = 2
+    IRQ_FALLING = 1
+    IRQ_RISING = 2
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        """
+        Initiation of Pin stand-in. Level of input pin is set by the host with value(), the same way a device connected
+        to it would drive it. Interrupt handler is called at once by the thread changing the level, as hard interrupt
+        on device interrupts code running.
+        """
+        self.id = id
+        self.level = 0
+        self.handler = None
+        self.trigger = 0
+        self.init(mode, pull, value)
+
+    def init(self, mode=-1, pull=-1, value=None):
+        """ Set pin mode. Pull up resistor sets level high. """
+        if mode != -1:
+            self.mode = mode
+        if pull == Pin.PULL_UP:
+            self.level = 1
+        if value is not None:
+            self.level = 1 if value else 0
+
+    def value(self, value=None):
+        """ Get level of pin, or set it if 'value' given. Edges call interrupt handler if it is set for them. """
+        if value is None:
+            return self.level
+        level = 1 if value else 0
+        previous, self.level = self.level, level
+        if self.handler is None or previous == level:
+            return
+        if (level == 0 and self.trigger & Pin.IRQ_FALLING) or (level == 1 and self.trigger & Pin.IRQ_RISING):
+            self.handler(self)
+
+    __call__ = value
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        """ Set interrupt handler called on given edges. """
+        self.handler = handler
+        self.trigger = trigger
+
+
+class I2C:
+    # Devices connected to every I2C bus stand-in, by address. Host puts device models here before firmware makes
+    # its bus.
+    devices = {}
+
+    def __init__(self, id=-1, scl=None, sda=None, freq=400000, timeout=50000):
+        """
+        Initiation of I2C stand-in passing transactions to device models. Every transaction is counted together with
+        amount of bytes it takes on the bus: address, register and data bytes. Time it takes on the bus is counted from
+        9 clock cycles per byte, plus start and stop conditions.
+        """
+        self.id = id
+        self.freq = freq
+        self.reset_counters()
+
+    def reset_counters(self):
+        """ Clear transaction counters. """
+        self.transactions = 0
+        self.bytes = 0
+        self.read_bytes = 0
+        self.written_bytes = 0
+
+    @property
+    def bus_time(self):
+        """ Time all of transactions counted took on the bus, in s. """
+        return (9 * self.bytes + 2 * self.transactions) / self.freq
+
+    def device(self, addr):
+        """ Get device model acknowledging given address. """
+        if addr not in I2C.devices:
+            self.transactions += 1
+            self.bytes += 1
+            # MicroPython raises OSError with ENODEV code if device does not acknowledge its address.
+            raise OSError(19)
+        return I2C.devices[addr]
+
+    def scan(self):
+        return sorted(I2C.devices)
+
+    def writeto_mem(self, addr, memaddr, buf):
+        device = self.device(addr)
+        self.transactions += 1
+        self.bytes += 2 + len(buf)
+        self.written_bytes += len(buf)
+        device.write(memaddr, bytes(buf))
+
+    def readfrom_mem(self, addr, memaddr, nbytes):
+        device = self.device(addr)
+        self.transactions += 1
+        self.bytes += 3 + nbytes
+        self.read_bytes += nbytes
+        return bytes(device.read(memaddr, nbytes))
+
+    def readfrom_mem_into(self, addr, memaddr, buf):
+        data = self.readfrom_mem(addr, memaddr, len(buf))
+        buf[:] = data
+
+
+class SPI:
+    MSB = 0
+    LSB = 1
+
+    def __init__(self, id, baudrate=1000000, polarity=0, phase=0, bits=8, firstbit=MSB, sck=None, mosi=None,
+                 miso=None):
+        """
+        Initiation of SPI stand-in passing written bytes to 'device' model, if host sets any. Every write, bytes
+        written and init call are counted. Time writes take on the bus is counted from baudrate. If host sets
+        'blocking', every write also blocks the calling thread for its bus time, as writes do on device.
+        """
+        self.id = id
+        self.device = None
+        self.blocking = False
+        self.reset_counters()
+        self.init(baudrate, polarity, phase)
+
+    def reset_counters(self):
+        """ Clear write and init counters. """
+        self.transactions = 0
+        self.bytes = 0
+        self.inits = 0
+        self.bus_time = 0
+
+    def init(self, baudrate=1000000, polarity=0, phase=0, bits=8, firstbit=MSB, sck=None, mosi=None, miso=None):
+        self.baudrate = baudrate
+        self.polarity = polarity
+        self.phase = phase
+        self.inits += 1
+
+    def deinit(self):
+        pass
+
+    def write(self, buf):
+        self.transactions += 1
+        self.bytes += len(buf)
+        self.bus_time += 8 * len(buf) / self.baudrate
+        if self.blocking:
+            time.sleep(8 * len(buf) / self.baudrate)
+        if self.device is not None:
+            self.device.write(bytes(buf))
@@ -0,0 +1,41 @@
+# Stand-in of MicroPython 'gc' module, so firmware modules using it can run on the host. CPython 'gc' module is always
+# imported, so firmware.load puts this one in its place. Memory allocated is what tracemalloc traces, if it is started,
+# in heap of HEAP_SIZE bytes.
+import gc as _gc
+import tracemalloc as _tracemalloc
+
+# Heap size of ESP8266 MicroPython port, in bytes.
+HEAP_SIZE = 38 * 1024
+
+_threshold = -1
+
+
+def collect():
+    _gc.collect()
+
+
+def enable():
+    _gc.enable()
+
+
+def disable():
+    _gc.disable()
+
+
+def isenabled():
+    return _gc.isenabled()
+
+
+def mem_alloc():
+    return _tracemalloc.get_traced_memory()[0] if _tracemalloc.is_tracing() else 0
+
+
+def mem_free():
+    return max(0, HEAP_SIZE - mem_alloc())
+
+
+def threshold(amount=None):
+    global _threshold
+    if amount is None:
+        return _threshold
+    _threshold = amount
@@ -0,0 +1,44 @@
+# Stand-in of MicroPython 'uasyncio' module, so firmware modules using it can run on the host. It is asyncio with
+# MicroPython extensions added.
+import asyncio
+from asyncio import *
+
+
+async def sleep_ms(ms):
+    await asyncio.sleep(ms / 1000)
+
+
+async def wait_for_ms(awaitable, timeout):
+    return await asyncio.wait_for(awaitable, timeout / 1000)
+
+
+class ThreadSafeFlag:
+    def __init__(self):
+        """
+        Initiation of ThreadSafeFlag stand-in. set() may be called by any thread, e.g. by stand-in Pin interrupt
+        handler called from thread simulating device, and wakes up task waiting in loop thread.
+        """
+        self.event = asyncio.Event()
+        self.loop = None
+
+    def set(self):
+        loop = self.loop
+        if loop is None:
+            self.event.set()
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self.event.set()
+        else:
+            loop.call_soon_threadsafe(self.event.set)
+
+    def clear(self):
+        self.event.clear()
+
+    async def wait(self):
+        self.loop = asyncio.get_running_loop()
+        await self.event.wait()
+        self.event.clear()
@@ -0,0 +1,2 @@
+# Stand-in of MicroPython 'ujson' module, so firmware modules using it can run on the host.
+from json import *
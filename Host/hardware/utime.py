@@ -0,0 +1,47 @@
+# Stand-in of MicroPython 'utime' module, so firmware modules using it can run on the host. Ticks wrap the same way
+# they do on device.
+import time as _time
+
+TICKS_PERIOD = 1 << 30
+_start = _time.monotonic_ns()
+
+
+def ticks_ns():
+    return _time.monotonic_ns() - _start
+
+
+def ticks_ms():
+    return (ticks_ns() // 1000000) % TICKS_PERIOD
+
+
+def ticks_us():
+    return (ticks_ns() // 1000) % TICKS_PERIOD
+
+
+def ticks_diff(end, start):
+    return ((end - start + TICKS_PERIOD // 2) % TICKS_PERIOD) - TICKS_PERIOD // 2
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) % TICKS_PERIOD
+
+
+def sleep(seconds):
+    _time.sleep(seconds)
+
+
+def sleep_ms(ms):
+    _time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    _time.sleep(us / 1000000)
+
+
+def time():
+    return int(_time.time())
+
+
+def localtime(seconds=None):
+    # RTC of device keeps UTC, as ntptime sets it.
+    return tuple(_time.gmtime(seconds))[:8]
@@ -0,0 +1,120 @@
+import ast
+import copy
+from array import array
+
+# Range of integers MicroPython keeps in object pointer itself on 32 bit ports. Any integer outside it is allocated on
+# heap, as every float is.
+SMALL_INT_MIN = -(1 << 30)
+SMALL_INT_MAX = (1 << 30) - 1
+
+# Builtins returning new number object, and builtins making new object of other type.
+NUMBER_BUILTINS = ('abs', 'float', 'int', 'max', 'min', 'round', 'sum')
+OBJECT_BUILTINS = ('bytearray', 'bytes', 'memoryview', 'str', 'list', 'tuple', 'dict', 'array')
+
+
+class HeapModel(ast.NodeTransformer):
+    def __init__(self):
+        """
+        Initiation of HeapModel counting objects the same code would allocate on MicroPython heap. CPython keeps every
+        integer greater than 256 on heap and takes floats from free list, so tracemalloc figures say little about
+        device. HeapModel is firmware.load instrumentation: it wraps expressions of loaded modules, so every result
+        MicroPython has to allocate is counted while the code runs on the host:
+            - float and big integer results of arithmetic and of number builtins, strings built at runtime,
+            - objects made by builtins as bytearray, memoryview or str,
+            - floats read from arrays,
+            - lists, dictionaries, sets, slices and tuples of non constant items.
+        Small integers, booleans, None, constant tuples and objects already existing are not counted.
+        """
+        self.count = 0
+        self.namespace = {'__heap__': self}
+
+    def box(self, value):
+        """ Count value if MicroPython keeps it on heap. Return the value. """
+        kind = type(value)
+        if kind is float or kind is str or (kind is int and not SMALL_INT_MIN <= value <= SMALL_INT_MAX):
+            self.count += 1
+        return value
+
+    def item(self, container, key):
+        """ Get item of container. Numbers read from arrays are made at the time they are read. """
+        value = container[key]
+        if isinstance(container, array):
+            self.box(value)
+        return value
+
+    def new(self, value):
+        """ Count new container. Return it. """
+        self.count += 1
+        return value
+
+    def measure(self, function, iterations=1000):
+        """ Get mean amount of objects allocated per single call of 'function'. """
+        before = self.count
+        for i in range(iterations):
+            function()
+        return (self.count - before) / iterations
+
+    def transform(self, tree):
+        """ Change syntax tree of firmware module, so heap objects made by its code are counted. """
+        return self.visit(tree)
+
+    @staticmethod
+    def call(method, *args):
+        return ast.Call(func=ast.Attribute(value=ast.Name(id='__heap__', ctx=ast.Load()), attr=method, ctx=ast.Load()),
+                        args=list(args), keywords=[])
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        return self.call('box', node)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        return self.call('box', node)
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        value = copy.deepcopy(node.target)
+        value.ctx = ast.Load()
+        value = self.call('box', ast.BinOp(left=value, op=node.op, right=node.value))
+        return ast.copy_location(ast.Assign(targets=[node.target], value=value), node)
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and node.func.id in NUMBER_BUILTINS:
+            return self.call('box', node)
+        if isinstance(node.func, ast.Name) and node.func.id in OBJECT_BUILTINS:
+            return self.call('new', node)
+        return node
+
+    def visit_JoinedStr(self, node):
+        self.generic_visit(node)
+        return self.call('new', node)
+
+    def visit_Subscript(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load):
+            return node
+        if isinstance(node.slice, ast.Slice):
+            return self.call('new', node)
+        return self.call('item', node.value, node.slice)
+
+    def visit_container(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.ctx, ast.Load):
+            return node
+        if isinstance(node, ast.Tuple) and all(isinstance(item, ast.Constant) for item in node.elts):
+            # Constant tuples are made once by compiler.
+            return node
+        return self.call('new', node)
+
+    visit_List = visit_container
+    visit_Tuple = visit_container
+
+    def visit_Dict(self, node):
+        self.generic_visit(node)
+        return self.call('new', node)
+
+    visit_Set = visit_Dict
+    visit_ListComp = visit_Dict
+    visit_DictComp = visit_Dict
+    visit_SetComp = visit_Dict
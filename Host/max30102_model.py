@@ -0,0 +1,310 @@
+import numpy as np
+import ppg
+
+# Register addresses, the same as in max30102.py of firmware.
+INTERRUPT_STATUS_1 = 0x00
+INTERRUPT_STATUS_2 = 0x01
+INTERRUPT_ENABLE_1 = 0x02
+INTERRUPT_ENABLE_2 = 0x03
+FIFO_WRITE_POINTER = 0x04
+OVERFLOW_COUNTER = 0x05
+FIFO_READ_POINTER = 0x06
+FIFO_DATA = 0x07
+FIFO_CONFIG = 0x08
+MODE_CONFIG = 0x09
+SPO_CONFIG = 0x0a
+LED_PA_1 = 0x0c
+LED_PA_2 = 0x0d
+TEMP_INTEGER = 0x1f
+TEMP_FRACTION = 0x20
+TEMP_CONFIG = 0x21
+REVISION_ID = 0xfe
+PART_ID = 0xff
+
+# Default I2C address of MAX30102.
+ADDRESS = 0x57
+
+# Interrupt status bits. Power ready interrupt can not be disabled.
+A_FULL = 0x80
+PPG_RDY = 0x40
+PWR_RDY = 0x01
+DIE_TEMP_RDY = 0x02
+
+# FIFO keeps up to 32 samples. Overflow counter saturates at 31.
+FIFO_DEPTH = 32
+OVERFLOW_MAX = 0x1f
+
+# Sample rates and averages selected by SpO2 and FIFO configuration registers.
+SAMPLE_RATES = (50, 100, 200, 400, 800, 1000, 1600, 3200)
+SAMPLE_AVERAGES = (1, 2, 4, 8, 16, 32, 32, 32)
+
+# Temperature conversion time in ms.
+CONVERSION_TIME = 29
+
+# LED current register value the waveform is given for. Read values are proportional to LED current. Waveform is given
+# for ADC range 4096 nA as well (range bits 01).
+REFERENCE_CURRENT = 0x2f
+REFERENCE_RANGE = 1
+
+
+class Max30102Model:
+    def __init__(self, stream=None, pin=None, temperature=30.0, record=False):
+        """
+        Initiation of Max30102Model, register level model of MAX30102 sensor for I2C stand-in of machine module. Put it
+        in machine.I2C.devices under ADDRESS before firmware makes its bus.
+
+        Sensor measures 'stream' (ppg.Stream, recorded or synthetic, 60 s at 100 sps made by ppg.generate by default).
+        It is played in loop and sampled at rate and average set in registers by the driver, so any sample rate can be
+        simulated from any stream. Read values follow LED currents, ADC range and ADC resolution set by pulse width.
+        Channel of LED 1 is the one driver takes as IR, as channels are swapped in used model of sensor.
+
+        Time is simulated: it moves on only by advance(), so every simulation is repeatable and does not depend on how
+        fast the host is. FIFO keeps 32 samples, write and read pointers wrap around, overflow counter counts samples
+        lost when FIFO is full, with or without rollover. Interrupt status registers are cleared when read, and INT
+        output connected to 'pin' (machine.Pin stand-in) is low while any enabled interrupt is pending.
+        Temperature conversion ends CONVERSION_TIME ms after it is started, giving 'temperature' value. If 'record' is
+        set, values of every sample produced are kept in 'log', so values read by driver can be checked against them.
+        """
+        if stream is None:
+            stream = ppg.generate(duration=60, rate=100)
+        self.stream = stream
+        self.period = stream.time[-1] - stream.time[0] + (stream.time[1] - stream.time[0])
+        self.pin = pin
+        self.temperature = temperature
+
+        # Simulated time in ms.
+        self.now = 0.0
+
+        # Amount of samples produced, lost by overflow and read, FIFO data reads from empty FIFO, and temperature
+        # conversions ended.
+        self.produced = 0
+        self.lost = 0
+        self.consumed = 0
+        self.underflows = 0
+        self.conversions = 0
+
+        # Values of every sample produced, as (LED 1, LED 2) tuples.
+        self.record = record
+        self.log = []
+
+        self.reset()
+
+    def reset(self):
+        """
+        Set power-on state of all registers and clear FIFO.
+        """
+        self.registers = bytearray(256)
+        self.registers[PART_ID] = 0x15
+        self.registers[REVISION_ID] = 0x03
+        self.registers[INTERRUPT_STATUS_1] = PWR_RDY
+        self.fifo = bytearray(FIFO_DEPTH * 6)
+        # Amount of samples in FIFO. It tells full FIFO from empty one, as pointers are equal for both.
+        self.count = 0
+        # Byte of sample at read pointer, which the next FIFO data read gives.
+        self.byte = 0
+        self.conversion_end = None
+        self.restart()
+        self.update_pin()
+
+    def restart(self):
+        """
+        Start timing samples from present time. Called after every change of sample rate, average or mode.
+        """
+        self.origin = self.now
+        self.samples = 0
+
+    @property
+    def active(self):
+        mode = self.registers[MODE_CONFIG]
+        return not mode & 0x80 and mode & 0x07 in (0x02, 0x03, 0x07)
+
+    @property
+    def channels(self):
+        return 1 if self.registers[MODE_CONFIG] & 0x07 == 0x02 else 2
+
+    @property
+    def sample_size(self):
+        return 3 * self.channels
+
+    @property
+    def rate(self):
+        return SAMPLE_RATES[(self.registers[SPO_CONFIG] >> 2) & 0x07]
+
+    @property
+    def average(self):
+        return SAMPLE_AVERAGES[self.registers[FIFO_CONFIG] >> 5]
+
+    @property
+    def sample_period(self):
+        """ Time between samples put in FIFO, in ms. """
+        return 1000 * self.average / self.rate
+
+    @property
+    def almost_full(self):
+        """ Amount of samples in FIFO which raises almost full interrupt. """
+        return FIFO_DEPTH - (self.registers[FIFO_CONFIG] & 0x0f)
+
+    def advance(self, ms):
+        """
+        Move simulated time on by 'ms' ms. Samples measured meanwhile are put in FIFO.
+        """
+        self.now += ms
+        self.update()
+
+    def update(self):
+        """
+        Bring state up to present time: end temperature conversion and put in FIFO all samples due.
+        """
+        if self.conversion_end is not None and self.now >= self.conversion_end:
+            self.end_conversion()
+        if not self.active:
+            self.restart()
+            return
+        due = int((self.now - self.origin) / self.sample_period)
+        if due > self.samples:
+            self.produce(self.origin + np.arange(self.samples + 1, due + 1) * self.sample_period)
+            self.samples = due
+
+    def measure(self, times):
+        """
+        Get values of both channels measured at given times in ms. Each one is mean of 'average' ADC samples taken
+        at sample rate, ending at that time.
+        """
+        spo = self.registers[SPO_CONFIG]
+        times = times[:, None] - np.arange(self.average)[None, :] * (1000 / self.rate)
+        times = times % self.period + self.stream.time[0]
+        scale = 2.0 ** (REFERENCE_RANGE - ((spo >> 5) & 0x03)) / REFERENCE_CURRENT
+        # Pulse width sets ADC resolution from 15 to 18 bits. FIFO data is left justified, so lower bits are zeros.
+        unused = 3 - (spo & 0x03)
+        values = []
+        sources = ((self.stream.ir, self.registers[LED_PA_1]), (self.stream.red, self.registers[LED_PA_2]))
+        for source, current in sources:
+            value = np.interp(times, self.stream.time, source).mean(axis=1) * current * scale
+            value = np.clip(value, 0, 0x3ffff).astype(np.int64)
+            values.append((value >> unused << unused).tolist())
+        return values
+
+    def produce(self, times):
+        """
+        Put samples measured at given times in FIFO. Raise FIFO interrupts.
+        """
+        registers = self.registers
+        size = self.sample_size
+        rollover = registers[FIFO_CONFIG] & 0x10
+        for values in zip(*self.measure(times)):
+            self.produced += 1
+            if self.record:
+                self.log.append(values)
+            if self.count == FIFO_DEPTH:
+                self.lost += 1
+                registers[OVERFLOW_COUNTER] = min(registers[OVERFLOW_COUNTER] + 1, OVERFLOW_MAX)
+                if not rollover:
+                    continue
+                # The oldest sample is overwritten, so read pointer moves on with write pointer.
+                self.count -= 1
+                registers[FIFO_READ_POINTER] = (registers[FIFO_READ_POINTER] + 1) % FIFO_DEPTH
+                self.byte = 0
+            j = registers[FIFO_WRITE_POINTER] * size
+            for value in values[:self.channels]:
+                self.fifo[j:j + 3] = value.to_bytes(3, 'big')
+                j += 3
+            registers[FIFO_WRITE_POINTER] = (registers[FIFO_WRITE_POINTER] + 1) % FIFO_DEPTH
+            self.count += 1
+
+            status = PPG_RDY
+            if self.count == self.almost_full:
+                status |= A_FULL
+            registers[INTERRUPT_STATUS_1] |= status & registers[INTERRUPT_ENABLE_1]
+        self.update_pin()
+
+    def end_conversion(self):
+        """
+        End temperature conversion. Save temperature in registers, clear conversion enable bit and raise interrupt.
+        """
+        self.conversion_end = None
+        self.conversions += 1
+        sixteenths = int(round(self.temperature * 16))
+        self.registers[TEMP_INTEGER] = (sixteenths >> 4) & 0xff
+        self.registers[TEMP_FRACTION] = sixteenths & 0x0f
+        self.registers[TEMP_CONFIG] &= ~0x01
+        self.registers[INTERRUPT_STATUS_2] |= DIE_TEMP_RDY & self.registers[INTERRUPT_ENABLE_2]
+        self.update_pin()
+
+    def update_pin(self):
+        """
+        Set level of INT output. It is open drain and active low.
+        """
+        if self.pin is None:
+            return
+        registers = self.registers
+        pending = (registers[INTERRUPT_STATUS_1] & (registers[INTERRUPT_ENABLE_1] | PWR_RDY)
+                   or registers[INTERRUPT_STATUS_2] & registers[INTERRUPT_ENABLE_2])
+        self.pin.value(0 if pending else 1)
+
+    def read_fifo_byte(self):
+        """
+        Get next byte of FIFO data. Read pointer moves on when the whole sample is read, and overflow counter is
+        cleared then. Empty FIFO gives sample at read pointer once again.
+        """
+        registers = self.registers
+        if self.count == 0:
+            self.underflows += 1
+        value = self.fifo[registers[FIFO_READ_POINTER] * self.sample_size + self.byte]
+        self.byte += 1
+        if self.byte == self.sample_size:
+            self.byte = 0
+            if self.count:
+                self.count -= 1
+                self.consumed += 1
+                registers[FIFO_READ_POINTER] = (registers[FIFO_READ_POINTER] + 1) % FIFO_DEPTH
+                registers[OVERFLOW_COUNTER] = 0
+        return value
+
+    def read(self, register, nbytes):
+        """
+        I2C read of 'nbytes' bytes starting at 'register'. Register address is incremented after every byte, except
+        for FIFO data register. Interrupt status registers are cleared when read.
+        """
+        self.update()
+        data = bytearray(nbytes)
+        for i in range(nbytes):
+            if register == FIFO_DATA:
+                data[i] = self.read_fifo_byte()
+                continue
+            data[i] = self.registers[register]
+            if register in (INTERRUPT_STATUS_1, INTERRUPT_STATUS_2):
+                self.registers[register] = 0
+                self.update_pin()
+            register = (register + 1) & 0xff
+        return data
+
+    def write(self, register, data):
+        """
+        I2C write of 'data' bytes starting at 'register'. Register address is incremented after every byte, except
+        for FIFO data register.
+        """
+        self.update()
+        for value in data:
+            if register != FIFO_DATA:
+                self.write_register(register, value)
+                register = (register + 1) & 0xff
+
+    def write_register(self, register, value):
+        registers = self.registers
+        if register in (INTERRUPT_STATUS_1, INTERRUPT_STATUS_2, TEMP_INTEGER, TEMP_FRACTION, REVISION_ID, PART_ID):
+            return
+        if register == MODE_CONFIG and value & 0x40:
+            # Reset bit clears itself when all registers are set to power-on state.
+            self.reset()
+            return
+        registers[register] = value
+        if register in (FIFO_WRITE_POINTER, FIFO_READ_POINTER):
+            registers[register] = value % FIFO_DEPTH
+            self.count = (registers[FIFO_WRITE_POINTER] - registers[FIFO_READ_POINTER]) % FIFO_DEPTH
+            self.byte = 0
+        elif register in (FIFO_CONFIG, MODE_CONFIG, SPO_CONFIG):
+            self.restart()
+        elif register == TEMP_CONFIG and value & 0x01 and self.conversion_end is None:
+            self.conversion_end = self.now + CONVERSION_TIME
+        elif register in (INTERRUPT_ENABLE_1, INTERRUPT_ENABLE_2):
+            self.update_pin()
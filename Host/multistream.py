@@ -0,0 +1,274 @@
+import numpy as np
+import firmware
+
+# Indexes of specified samples types. The same as in algorithm.py, every state array of the engine is indexed the same
+# way as list of HrSpOalgorithm, with streams placed in second dimension.
+IR = -1
+RED = -2
+IR_PREVIOUS = -3
+RED_PREVIOUS = -4
+TIME = -5
+TIME_PREVIOUS = -6
+
+# Length of bpm and spo2 buffors.
+BUFFOR_SIZE = 10
+
+# Port whose HrSpOalgorithm the engine follows. ESP8266 one counts IR spo2 at IR minimum, gates beats by min_diff and
+# max_diff and counts on integers, none of which the engine does.
+PORT = 'ESP32'
+
+
+class MultiStreamHrSpOalgorithm:
+    def __init__(self, streams):
+        """
+        Initiation of MultiStreamHrSpOalgorithm responsible for calculation hr and spo2 for many streams of samples at
+        once, for example for many devices streaming raw samples to PC. State of each stream is kept in NumPy arrays,
+        one column per stream, so one call advances all the streams together. Every stream gives the same results as
+        separate HrSpOalgorithm instance of ESP32 port fed with its samples.
+        """
+        self.streams = streams
+        algorithm = firmware.load('algorithm', PORT).HrSpOalgorithm()
+        shape = (2, streams)
+
+        # Rising and falling edge flags, maxes, mins and extremum type detection flag. Extremum is 1 for local maximum,
+        # 0 for local minimum and -1 if none occured.
+        self.rising_edge = np.zeros(shape, dtype=bool)
+        self.falling_edge = np.zeros(shape, dtype=bool)
+        self.max = np.zeros(shape)
+        self.min = np.zeros(shape)
+        self.extremum = np.zeros(shape, dtype=np.int8)
+        self.after_max_min_diff = np.array(algorithm.after_max_min_diff, dtype=float)[:, None]
+
+        # Alternating part, direct part of each signal and their ratio.
+        self.ac = np.zeros(shape)
+        self.dc = np.zeros(shape)
+        self.acdc_ratio = np.zeros(shape)
+
+        self.beat = np.zeros(streams, dtype=bool)
+        self.r = np.zeros(streams)
+        self.new_values = np.zeros(streams, dtype=bool)
+
+        self.sample = np.zeros((6, streams))
+        self.beats = np.zeros(streams, dtype=np.int64)
+        self.bpm = np.zeros(streams, dtype=np.int64)
+        self.beat_time = np.zeros((2, streams))
+        self.spo = np.zeros(streams)
+        self.local_max = np.zeros((4, streams))
+        self.local_min = np.zeros((4, streams))
+        self.local_max_time = np.zeros((4, streams))
+        self.local_min_time = np.zeros((4, streams))
+        self.local_max_detected = np.zeros((4, streams), dtype=bool)
+
+        # Ring buffors of bpm and spo2 values. Values are kept in double precision, as RingBuffer keeps them.
+        self.bpm_buf = np.zeros((streams, BUFFOR_SIZE))
+        self.bpm_count = np.zeros(streams, dtype=np.int64)
+        self.bpm_index = np.zeros(streams, dtype=np.int64)
+        self.spo_buf = np.zeros((streams, BUFFOR_SIZE))
+        self.spo_count = np.zeros(streams, dtype=np.int64)
+        self.spo_index = np.zeros(streams, dtype=np.int64)
+
+    def setup(self, streams=None):
+        """
+        Clear variables which have to be cleared before every measure try, for streams selected by boolean mask or
+        indexes. All the streams are set up if none given.
+        """
+        if streams is None:
+            streams = slice(None)
+        self.sample[:, streams] = 0
+        self.beats[streams] = 0
+        self.bpm[streams] = 0
+        self.beat_time[:, streams] = 0
+        self.spo[streams] = 0
+        self.local_max[:, streams] = 0
+        self.local_min[:, streams] = 0
+        self.local_max_time[:, streams] = 0
+        self.local_min_time[:, streams] = 0
+        self.local_max_detected[:, streams] = False
+        self.bpm_buf[streams] = 0
+        self.bpm_count[streams] = 0
+        self.bpm_index[streams] = 0
+        self.spo_buf[streams] = 0
+        self.spo_count[streams] = 0
+        self.spo_index[streams] = 0
+
+    @staticmethod
+    def ring_append(buffor, count, index, streams, values):
+        """
+        Append values to ring buffors of given streams, the same way RingBuffer.append does.
+        """
+        rows = np.flatnonzero(streams)
+        columns = index[rows]
+        buffor[rows, columns] = values[rows]
+        index[rows] = (columns + 1) % BUFFOR_SIZE
+        count[rows] = np.minimum(count[rows] + 1, BUFFOR_SIZE)
+
+    @staticmethod
+    def ring_mean(buffor, count, index, streams):
+        """
+        Get mean of ring buffors of given streams, the same way RingBuffer.mean does for floats: values are summed from
+        the oldest one, so every sum is rounded the same way.
+        """
+        rows = np.flatnonzero(streams)
+        count = count[rows]
+        oldest = index[rows] - count
+        total = np.zeros(len(rows))
+        for k in range(BUFFOR_SIZE):
+            total += np.where(k < count, buffor[rows, (oldest + k) % BUFFOR_SIZE], 0)
+        mean = np.zeros(len(streams))
+        mean[rows] = total / count
+        return mean
+
+    def detect_edge(self, i, active):
+        """
+        Detect if any edge occured in active streams. Save present sample as max or min of each stream.
+        """
+        present = self.sample[i]
+        previous = self.sample[i - 2]
+        rising = active & (present > previous)
+        falling = active & (present < previous)
+        self.rising_edge[i] |= rising
+        self.max[i] = np.where(rising, present, self.max[i])
+        self.falling_edge[i] |= falling
+        self.min[i] = np.where(falling, present, self.min[i])
+
+    def detect_extremum(self, i, active):
+        """
+        Detect if any true extremum occured in active streams. Return masks of streams where local maximum and local
+        minimum were detected.
+        """
+        present = self.sample[i]
+        previous = self.sample[i - 2]
+        now = self.sample[TIME_PREVIOUS]
+        maximum = active & self.rising_edge[i] & ((previous - present) >= self.after_max_min_diff[i])
+        minimum = active & ~maximum & self.rising_edge[i] & (previous == self.min[i]) & self.local_max_detected[i]
+
+        self.local_max_detected[i - 2] = np.where(maximum, self.local_max_detected[i], self.local_max_detected[i - 2])
+        self.local_max_detected[i] = np.where(maximum, True, np.where(minimum, False, self.local_max_detected[i]))
+        self.local_max[i - 2] = np.where(maximum, self.local_max[i], self.local_max[i - 2])
+        self.local_max[i] = np.where(maximum, self.max[i], self.local_max[i])
+        self.local_max_time[i - 2] = np.where(maximum, self.local_max_time[i], self.local_max_time[i - 2])
+        self.local_max_time[i] = np.where(maximum, now, self.local_max_time[i])
+        self.rising_edge[i] &= ~maximum
+
+        self.local_min[i - 2] = np.where(minimum, self.local_min[i], self.local_min[i - 2])
+        self.local_min[i] = np.where(minimum, self.min[i], self.local_min[i])
+        self.local_min_time[i - 2] = np.where(minimum, self.local_min_time[i], self.local_min_time[i - 2])
+        self.local_min_time[i] = np.where(minimum, now, self.local_min_time[i])
+        self.falling_edge[i] &= ~minimum
+
+        self.extremum[i] = np.where(active, np.where(maximum, 1, np.where(minimum, 0, -1)), self.extremum[i])
+        return maximum, minimum
+
+    def detect_heartbeat(self, maximum):
+        """
+        Detect heartbeat in streams where true local maximum of IR signal occured. Return masks of streams where
+        streaming algorithm raises ZeroDivisionError and where it is set up again.
+        """
+        self.beat_time[-1] = np.where(maximum, self.sample[TIME_PREVIOUS], self.beat_time[-1])
+        delta = self.beat_time[-1] - self.beat_time[-2]
+        error = maximum & (delta == 0)
+        beat = maximum & ~error
+        with np.errstate(divide='ignore', invalid='ignore'):
+            bpm = 60 / (delta / 1000)
+
+        restart = beat & (delta >= 3000) & (self.beats > 2)
+        self.setup(restart)
+        beat &= ~restart
+
+        # Anti shake condition.
+        valid = beat & ((self.bpm < 50) | (np.abs(bpm - self.bpm) < 20) | (self.beats < 10))
+        self.beat_time[-2] = np.where(valid, self.beat_time[-1], self.beat_time[-2])
+        self.beats += valid
+        valid &= self.beats > 1
+        self.ring_append(self.bpm_buf, self.bpm_count, self.bpm_index, valid, bpm)
+        mean = self.ring_mean(self.bpm_buf, self.bpm_count, self.bpm_index, valid)
+        self.bpm = np.where(valid, np.trunc(mean), self.bpm).astype(np.int64)
+        self.new_values |= valid
+        self.beat |= valid
+        return error, restart
+
+    def try_to_count_spo2(self, signal, minimum):
+        """
+        Count spo2 in streams where true local minimum of given signal occured after beat. Return mask of streams where
+        streaming algorithm raises ZeroDivisionError.
+        """
+        previous = signal - 2
+        ready = minimum & self.beat & (self.local_min[previous] != 0)
+
+        nom = self.local_min[previous] - self.local_min[signal]
+        denom = self.local_min_time[previous] - self.local_min_time[signal]
+        error = ready & (denom == 0)
+        ready &= ~error
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = nom / denom
+            dc = slope * self.local_max_time[signal] + (self.local_min[previous] - slope * self.local_min_time[previous])
+            self.dc[signal] = np.where(ready, dc, self.dc[signal])
+            self.ac[signal] = np.where(ready, self.local_max[signal] - self.dc[signal], self.ac[signal])
+            zero = ready & (self.dc[signal] == 0)
+            error |= zero
+            ready &= ~zero
+            self.acdc_ratio[signal] = np.where(ready, self.ac[signal] / self.dc[signal], self.acdc_ratio[signal])
+
+        if signal == RED:
+            # R factor is not counted if IR ratio is zero.
+            ready &= self.acdc_ratio[IR] != 0
+            with np.errstate(divide='ignore', invalid='ignore'):
+                self.r = np.where(ready, self.acdc_ratio[RED] / self.acdc_ratio[IR], self.r)
+            self.count_spo2(ready)
+        return error
+
+    def count_spo2(self, ready):
+        """
+        Count SpO2 level based on equation from AN6409 maxim integrated PDF, for streams where R factor was counted.
+        """
+        spo = 104 - 17 * self.r
+        ready = ready & (spo < 100) & (spo > 60)
+        self.ring_append(self.spo_buf, self.spo_count, self.spo_index, ready, spo)
+        mean = self.ring_mean(self.spo_buf, self.spo_count, self.spo_index, ready)
+        # Values are rounded the same way Python round() does. Only few streams count spo2 at once.
+        for i in np.flatnonzero(ready).tolist():
+            self.spo[i] = round(float(mean[i]), 2)
+        self.beat &= ~ready
+
+    def count_hr_spo(self, ir_value, red_value, time_value):
+        """
+        Advance all the streams by one sample. Arguments are arrays with one value per stream. Return arrays of new
+        values flags, bpm and spo2 values. Streams where HrSpOalgorithm would raise an error have new values flag
+        cleared, the same way main loop skips such samples.
+        """
+        self.new_values[:] = False
+        self.sample[TIME_PREVIOUS] = self.sample[TIME]
+        self.sample[RED_PREVIOUS] = self.sample[RED]
+        self.sample[IR_PREVIOUS] = self.sample[IR]
+        self.sample[IR] = ir_value
+        self.sample[RED] = red_value
+        self.sample[TIME] = time_value
+
+        active = np.ones(self.streams, dtype=bool)
+        self.detect_edge(IR, active)
+        maximum, minimum = self.detect_extremum(IR, active)
+        error, restart = self.detect_heartbeat(maximum)
+
+        # Streams where algorithm raised an error or was set up again do not process RED signal in this cycle.
+        active = ~error & ~restart
+        self.detect_edge(RED, active)
+        maximum, minimum = self.detect_extremum(RED, active)
+        error |= self.try_to_count_spo2(RED, minimum)
+
+        return self.new_values & ~error, self.bpm.copy(), self.spo.copy()
+
+    def count_hr_spo_block(self, ir, red, time):
+        """
+        Advance all the streams by block of samples. Arguments are arrays of shape (streams, samples). Return arrays
+        of the same shape with new values flags, bpm, spo2 and beat times after each sample.
+        """
+        ir = np.asarray(ir)
+        shape = ir.shape
+        new = np.zeros(shape, dtype=bool)
+        bpm = np.zeros(shape, dtype=np.int64)
+        spo = np.zeros(shape)
+        beat_time = np.zeros(shape)
+        for j in range(shape[1]):
+            new[:, j], bpm[:, j], spo[:, j] = self.count_hr_spo(ir[:, j], red[:, j], time[:, j])
+            beat_time[:, j] = self.beat_time[-1]
+        return new, bpm, spo, beat_time
@@ -0,0 +1,127 @@
+import numpy as np
+
+# Default direct parts of signals, in sensor counts. Main loop treats IR value higher than 70000 as a body detected.
+IR_DC = 100000
+RED_DC = 90000
+
+
+class Stream:
+    def __init__(self, time, ir, red, beat_times=None, spo=None):
+        """
+        Initiation of Stream class keeping IR and RED samples together with their times in ms. Streams made by
+        generator keep ground truth as well: times of every heartbeat and spo2 value.
+        """
+        self.time = np.asarray(time)
+        self.ir = np.asarray(ir)
+        self.red = np.asarray(red)
+        self.beat_times = None if beat_times is None else np.asarray(beat_times)
+        self.spo = spo
+
+    def __len__(self):
+        return len(self.time)
+
+    def true_bpm(self, time):
+        """
+        Get true heart rate at given times. It is counted from time between two beats surrounding each time.
+        """
+        intervals = np.diff(self.beat_times)
+        i = np.clip(np.searchsorted(self.beat_times, time) - 1, 0, len(intervals) - 1)
+        return 60000 / intervals[i]
+
+
+def pulse(phase):
+    """
+    Get shape of single pulse of blood volume for phase of heartbeat in range 0-1. It is made of systolic peak and
+    smaller, wider dicrotic wave. Result is normalised, so its highest value is around 1.
+    """
+    systolic = np.exp(-0.5 * ((phase - 0.15) / 0.07) ** 2)
+    dicrotic = 0.35 * np.exp(-0.5 * ((phase - 0.45) / 0.1) ** 2)
+    return systolic + dicrotic
+
+
+def generate(duration=60, rate=100, bpm=72, spo=97, hrv=0.03, perfusion=0.01, noise=20, drift=300, motion_rate=0,
+             motion=3000, dropout_rate=0, dropout=4, ir_dc=IR_DC, red_dc=RED_DC, seed=0):
+    """
+    Generate IR and RED photoplethysmogram stream similar to the one read from MAX30102 FIFO.
+        - duration - length of stream in seconds, rate - samples per second,
+        - bpm - mean heart rate, hrv - relative standard deviation of time between beats,
+        - spo - spo2 level. Ratio of RED and IR pulses is taken from the same equation algorithm uses,
+        - perfusion - IR pulse amplitude relative to its direct part,
+        - noise - standard deviation of white noise, in sensor counts,
+        - drift - amplitude of baseline drift made by breathing and slow changes of pressure on sensor,
+        - motion_rate - mean amount of motion artifact bursts per minute, motion - their amplitude,
+        - dropout_rate - mean amount of dropouts per minute, dropout - their length in seconds. No samples are read
+          during dropouts, so there is a gap in time of stream.
+    Return Stream instance with ground truth of beat times and spo2.
+    """
+    rng = np.random.default_rng(seed)
+    count = int(duration * rate)
+    time = np.arange(count) * (1000 / rate)
+
+    # Beat times. Time between beats varies around mean value.
+    mean_interval = 60000 / bpm
+    intervals = mean_interval * (1 + hrv * rng.standard_normal(int(duration * 1000 / mean_interval) + 3))
+    beat_times = np.cumsum(np.maximum(intervals, mean_interval / 2)) - mean_interval
+
+    # Phase of heartbeat of each sample.
+    i = np.clip(np.searchsorted(beat_times, time, side='right') - 1, 0, len(beat_times) - 2)
+    phase = (time - beat_times[i]) / (beat_times[i + 1] - beat_times[i])
+    volume = pulse(phase)
+
+    # More blood absorbs more light, so read values fall with every pulse. Ratio of relative pulse amplitudes of both
+    # signals is R factor algorithm counts spo2 from, spo = 104 - 17 * R.
+    r = (104 - spo) / 17
+    ir = ir_dc * (1 - perfusion * volume)
+    red = red_dc * (1 - r * perfusion * volume)
+
+    # Baseline drift made by breathing and by slow random changes.
+    breath = np.sin(2 * np.pi * 0.25 * time / 1000 + rng.uniform(0, 2 * np.pi))
+    wander = np.cumsum(rng.standard_normal(count))
+    wander = wander - np.linspace(0, wander[-1], count)
+    wander = wander / max(np.abs(wander).max(), 1)
+    baseline = drift * (0.7 * breath + 0.3 * wander)
+    ir += baseline
+    red += baseline * red_dc / ir_dc
+
+    # Motion artifact bursts. Slow, random waveform of given amplitude lasting 1-3 seconds.
+    for start in rng.uniform(0, duration, rng.poisson(motion_rate * duration / 60)):
+        length = rng.uniform(1, 3)
+        burst = (time >= start * 1000) & (time < (start + length) * 1000)
+        n = int(burst.sum())
+        if n:
+            shape = np.cumsum(rng.standard_normal(n))
+            shape = shape / max(np.abs(shape).max(), 1) * np.hanning(n)
+            ir[burst] += motion * shape
+            red[burst] += motion * shape * red_dc / ir_dc
+
+    ir += rng.normal(0, noise, count)
+    red += rng.normal(0, noise, count)
+
+    # Dropouts. Samples are removed, so time of stream jumps over them.
+    keep = np.ones(count, dtype=bool)
+    for start in rng.uniform(0, duration, rng.poisson(dropout_rate * duration / 60)):
+        keep &= (time < start * 1000) | (time >= (start + dropout) * 1000)
+
+    # Sensor gives 18 bit values.
+    ir = np.clip(ir, 0, 0x3ffff).astype(np.int64)
+    red = np.clip(red, 0, 0x3ffff).astype(np.int64)
+    return Stream(time[keep], ir[keep], red[keep], beat_times=beat_times[beat_times < duration * 1000], spo=spo)
+
+
+def main_loop_inputs(stream, period=50, n=5):
+    """
+    Turn stream read from sensor into values main loop feeds algorithm with. Every 'period' ms main loop reads all
+    samples gathered in FIFO and takes mean of them. Then moving average of last 'n' of these values is counted.
+    Return arrays of IR, RED and time values the way they are passed to HrSpOalgorithm.count_hr_spo.
+    """
+    window = (stream.time // period).astype(np.int64)
+    windows, start, counts = np.unique(window, return_index=True, return_counts=True)
+    ir = (np.add.reduceat(stream.ir, start) / counts).astype(np.int64)
+    red = (np.add.reduceat(stream.red, start) / counts).astype(np.int64)
+    time = (windows + 1) * period
+
+    kernel = np.ones(n, dtype=np.int64)
+    ir = np.convolve(ir, kernel, 'valid') // n
+    red = np.convolve(red, kernel, 'valid') // n
+    time = np.convolve(time, kernel, 'valid') // n
+    return ir, red, time
@@ -0,0 +1,156 @@
+import argparse
+import csv
+import time as timer
+import numpy as np
+import firmware
+import ppg
+
+
+def save_stream(stream, path):
+    """
+    Save stream to CSV file. Columns are time in ms, IR and RED values, seperated with ';' like PC app logs are.
+    """
+    with open(path, mode='w', newline='') as f:
+        writer = csv.writer(f, delimiter=';')
+        writer.writerow(['Time[ms]', 'IR', 'RED'])
+        for row in zip(stream.time.tolist(), stream.ir.tolist(), stream.red.tolist()):
+            writer.writerow(row)
+
+
+def load_stream(path):
+    """
+    Load stream saved by save_stream. Recorded streams have no ground truth.
+    """
+    data = np.loadtxt(path, delimiter=';', skiprows=1, ndmin=2)
+    return ppg.Stream(data[:, 0], data[:, 1].astype(np.int64), data[:, 2].astype(np.int64))
+
+
+class Replay:
+    def __init__(self, algorithm):
+        """
+        Initiation of Replay class feeding algorithm with recorded or generated samples one by one. Outputs of
+        algorithm and time of every count_hr_spo call are collected.
+        """
+        self.algorithm = algorithm
+        self.latency = []
+        self.index = []
+        self.beat_time = []
+        self.bpm = []
+        self.spo = []
+        self.errors = 0
+        self.elapsed = 0
+
+    def run(self, ir, red, time, realtime=False):
+        """
+        Feed algorithm with given values. If 'realtime' is set, each sample is passed at the time it was read,
+        otherwise samples are passed as fast as possible. Errors are counted and skipped the way main loop does.
+        """
+        algorithm = self.algorithm
+        clock = timer.perf_counter_ns
+        latency = self.latency
+        ir, red, time = ir.tolist(), red.tolist(), time.tolist()
+
+        start = timer.perf_counter()
+        for i in range(len(ir)):
+            if realtime:
+                delay = start + (time[i] - time[0]) / 1000 - timer.perf_counter()
+                if delay > 0:
+                    timer.sleep(delay)
+            before = clock()
+            try:
+                new, hr, spo2 = algorithm.count_hr_spo(ir[i], red[i], time[i])
+            except Exception:
+                latency.append(clock() - before)
+                self.errors += 1
+                continue
+            latency.append(clock() - before)
+            if new:
+                self.index.append(i)
+                self.beat_time.append(algorithm.beat_time[-1])
+                self.bpm.append(hr)
+                self.spo.append(spo2)
+        self.elapsed += timer.perf_counter() - start
+
+    def report(self, stream=None, time=None):
+        """
+        Print throughput, count_hr_spo latency percentiles and, if stream has ground truth, detection error. 'time' is
+        array of times passed to algorithm.
+        """
+        latency = np.array(self.latency) / 1000
+        print('samples:        %d in %.2f s, %.0f samples/s, %d errors' % (len(latency), self.elapsed,
+                                                                          len(latency) / self.elapsed, self.errors))
+        print('latency [us]:   p50 %.1f  p90 %.1f  p99 %.1f  max %.1f' % tuple(np.percentile(latency, [50, 90, 99, 100])))
+
+        if stream is None or stream.beat_times is None:
+            print('values:         %d' % len(self.bpm))
+            return
+        true_beats = np.count_nonzero((stream.beat_times >= time[0]) & (stream.beat_times <= time[-1]))
+        print('values:         %d of %d beats' % (len(self.bpm), true_beats))
+        if not self.bpm:
+            return
+        bpm = np.array(self.bpm)
+        error = np.abs(bpm - stream.true_bpm(np.array(self.beat_time)))
+        print('bpm error:      mean %.2f  p90 %.2f  max %.2f' % (error.mean(), np.percentile(error, 90), error.max()))
+        spo = np.array(self.spo)
+        spo = spo[spo != 0]
+        if len(spo):
+            error = np.abs(spo - stream.spo)
+            print('spo2 error:     mean %.2f  p90 %.2f  max %.2f' % (error.mean(), np.percentile(error, 90),
+                                                                     error.max()))
+        else:
+            print('spo2 error:     no spo2 values')
+
+
+def print_profile(snapshot):
+    """
+    Print profiler snapshot of HrSpOalgorithm: calls, total and mean time of every stage.
+    """
+    unit = snapshot['unit']
+    print('%-18s %10s %14s %10s' % ('stage', 'calls', 'total [' + unit + ']', 'mean'))
+    for stage, value in snapshot.items():
+        if stage == 'unit':
+            continue
+        calls, total = value
+        print('%-18s %10d %14d %10.1f' % (stage, calls, total, total / calls if calls else 0))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay recorded or synthetic stream into HrSpOalgorithm.')
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--input', help='CSV file saved by save_stream. Synthetic stream is generated if not given.')
+    parser.add_argument('--save', help='Save generated stream to CSV file.')
+    parser.add_argument('--realtime', action='store_true', help='Pass samples at real sample cadence.')
+    parser.add_argument('--profile', action='store_true', help='Count calls and time of every algorithm stage.')
+    parser.add_argument('--duration', type=float, default=600)
+    parser.add_argument('--rate', type=float, default=100)
+    parser.add_argument('--bpm', type=float, default=72)
+    parser.add_argument('--spo', type=float, default=97)
+    parser.add_argument('--hrv', type=float, default=0.03)
+    parser.add_argument('--noise', type=float, default=20)
+    parser.add_argument('--drift', type=float, default=300)
+    parser.add_argument('--motion-rate', type=float, default=0)
+    parser.add_argument('--motion', type=float, default=3000)
+    parser.add_argument('--dropout-rate', type=float, default=0)
+    parser.add_argument('--dropout', type=float, default=4)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.input:
+        stream = load_stream(args.input)
+    else:
+        stream = ppg.generate(duration=args.duration, rate=args.rate, bpm=args.bpm, spo=args.spo, hrv=args.hrv,
+                              noise=args.noise, drift=args.drift, motion_rate=args.motion_rate, motion=args.motion,
+                              dropout_rate=args.dropout_rate, dropout=args.dropout, seed=args.seed)
+    if args.save:
+        save_stream(stream, args.save)
+
+    ir, red, time = ppg.main_loop_inputs(stream)
+    replay = Replay(firmware.load('algorithm', args.port).HrSpOalgorithm(profile=args.profile))
+    replay.run(ir, red, time, realtime=args.realtime)
+    replay.report(stream, time)
+    if args.profile:
+        print_profile(replay.algorithm.profiler.snapshot())
+
+
+if __name__ == '__main__':
+    main()
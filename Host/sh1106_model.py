@@ -0,0 +1,57 @@
+# Commands of SH1106 the model takes into account. Contrast command takes one more byte as its argument.
+SET_CONTRAST = 0x81
+LOW_COLUMN_ADDRESS = 0x00
+HIGH_COLUMN_ADDRESS = 0x10
+SET_PAGE_ADDRESS = 0xb0
+
+# Display RAM has 8 pages of 132 columns. Display shows 128 of them, from column 2.
+PAGES = 8
+COLUMNS = 132
+OFFSET = 2
+
+
+class Sh1106Model:
+    def __init__(self, dc, cs=None):
+        """
+        Initiation of Sh1106Model, model of SH1106 display RAM written through SPI stand-in of machine module. Set it as
+        'device' of SPI bus display driver writes on. Bytes written while 'dc' pin is low are commands, these written
+        while it is high are display data, put in RAM at present page and column. Column moves on with every byte.
+        Nothing is written if 'cs' pin is given and it is high.
+        """
+        self.dc = dc
+        self.cs = cs
+        self.ram = bytearray(PAGES * COLUMNS)
+        self.page = 0
+        self.column = 0
+        self.argument = False
+
+        # Amount of command and data bytes written.
+        self.commands = 0
+        self.data = 0
+
+    def write(self, data):
+        if self.cs is not None and self.cs.value():
+            return
+        if self.dc.value():
+            self.data += len(data)
+            for value in data:
+                if self.column < COLUMNS:
+                    self.ram[self.page * COLUMNS + self.column] = value
+                    self.column += 1
+            return
+        for command in data:
+            self.commands += 1
+            if self.argument:
+                self.argument = False
+            elif command == SET_CONTRAST:
+                self.argument = True
+            elif command & 0xf0 == SET_PAGE_ADDRESS:
+                self.page = command & 0x07
+            elif command & 0xf0 == LOW_COLUMN_ADDRESS:
+                self.column = (self.column & 0xf0) | (command & 0x0f)
+            elif command & 0xf0 == HIGH_COLUMN_ADDRESS:
+                self.column = (self.column & 0x0f) | (command & 0x0f) << 4
+
+    def screen(self):
+        """ Get pixels display shows, in the same layout as MVLSB framebuffer of 128x64 display. """
+        return b''.join(self.ram[page * COLUMNS + OFFSET:page * COLUMNS + OFFSET + 128] for page in range(PAGES))
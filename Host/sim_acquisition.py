@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import collections
+import threading
+import time as timer
+from array import array
+import numpy as np
+import firmware
+
+# Pin stand-in of the same machine module firmware imports.
+Pin = firmware.stand_in('machine').Pin
+
+# FIFO of MAX30102 keeps up to 32 samples.
+FIFO_DEPTH = 32
+
+
+class SimulatedSensor:
+    def __init__(self, pin, rate=100, almost_full=17):
+        """
+        Initiation of SimulatedSensor taking the place of Max30102 for Acquisition. Samples are put in FIFO by thread
+        running at sensor rate. FIFO overwrites the oldest sample when full, as sensor with FIFO rollover enabled does.
+        If almost full interrupt is enabled, INT output connected to 'pin' falls when FIFO keeps 'almost_full' samples
+        and goes high again when interrupt status is read. Every I2C transaction and FIFO read is counted.
+        """
+        self.pin = pin
+        self.sample_period = 1000000 // rate
+        self.almost_full = almost_full
+        self.fifo = collections.deque()
+        self.lock = threading.Lock()
+        self.interrupt_enabled = False
+        self.status = 0
+        self.status_time = 0
+
+        self.produced = 0
+        self.lost = 0
+        self.transactions = 0
+        self.reads = 0
+        self.empty_reads = 0
+        self.latency = []
+
+    def enable_fifo_interrupt(self):
+        self.interrupt_enabled = True
+        self.read_interrupt_status()
+
+    def read_interrupt_status(self):
+        with self.lock:
+            self.transactions += 1
+            status, self.status = self.status, 0
+            if status:
+                self.latency.append(timer.perf_counter() - self.status_time)
+        self.pin.value(1)
+        return status
+
+    def produce(self):
+        """ Put one sample in FIFO. Raise interrupt if FIFO got almost full. """
+        with self.lock:
+            if len(self.fifo) == FIFO_DEPTH:
+                self.fifo.popleft()
+                self.lost += 1
+            self.fifo.append(self.produced)
+            self.produced += 1
+            interrupt = self.interrupt_enabled and not self.status and len(self.fifo) >= self.almost_full
+            if interrupt:
+                self.status = 0x80
+                self.status_time = timer.perf_counter()
+        if interrupt:
+            self.pin.value(0)
+
+    def read_samples(self, red_buf, ir_buf, time_buf, now):
+        with self.lock:
+            # FIFO pointers are read in one transaction, and all samples in another one.
+            self.transactions += 1
+            self.reads += 1
+            samples = min(len(self.fifo), len(red_buf))
+            if not samples:
+                self.empty_reads += 1
+                return 0
+            self.transactions += 1
+            for i in range(samples):
+                red_buf[i] = ir_buf[i] = self.fifo.popleft()
+                time_buf[i] = now
+        return samples
+
+    def run(self, stop):
+        """ Produce samples at sensor rate until 'stop' event is set. """
+        period = self.sample_period / 1e6
+        next_time = timer.perf_counter()
+        while not stop.is_set():
+            next_time += period
+            delay = next_time - timer.perf_counter()
+            if delay > 0:
+                timer.sleep(delay)
+            self.produce()
+
+
+async def simulate(acquisition_module, rate, interrupt, duration, process_us, display_ms):
+    """
+    Run acquisition loop against simulated sensor for 'duration' s. Processing of every sample blocks the loop for
+    'process_us' us, and display task blocks it for 'display_ms' ms every 100 ms, as drawing on device does. Return the
+    sensor and Acquisition instance with their counters.
+    """
+    pin = Pin(23)
+    sensor = SimulatedSensor(pin, rate=rate)
+    acquisition = acquisition_module.Acquisition(sensor, pin if interrupt else None)
+    red_buf, ir_buf, time_buf = (array('i', FIFO_DEPTH * [0]) for i in range(3))
+
+    stop = threading.Event()
+    producer = threading.Thread(target=sensor.run, args=(stop,), daemon=True)
+    producer.start()
+
+    async def display():
+        while not stop.is_set():
+            await asyncio.sleep(0.1)
+            timer.sleep(display_ms / 1000)
+
+    display_task = asyncio.create_task(display())
+    end = timer.perf_counter() + duration
+    read = 0
+    while timer.perf_counter() < end:
+        count = await acquisition.read(red_buf, ir_buf, time_buf, 0)
+        read += count
+        timer.sleep(count * process_us / 1e6)
+    stop.set()
+    producer.join()
+    await display_task
+    sensor.read_count = read
+    return sensor, acquisition
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate interrupt driven and polled FIFO acquisition.')
+    parser.add_argument('--rates', type=int, nargs='+', default=[100, 400], help='Sensor sample rates, in sps.')
+    parser.add_argument('--duration', type=float, default=5, help='Time of every simulation in s.')
+    parser.add_argument('--process-us', type=float, default=300, help='Loop time taken by every sample processed.')
+    parser.add_argument('--display-ms', type=float, default=10, help='Loop time taken by display every 100 ms.')
+    args = parser.parse_args()
+
+    acquisition_module = firmware.load('acquisition', 'ESP32')
+    print('rate [sps]  mode       produced  read    lost  reads  empty  transactions  per read  interrupts  '
+          'timeouts  wake p50/max [ms]')
+    failed = False
+    for rate in args.rates:
+        for interrupt in (True, False):
+            sensor, acquisition = asyncio.run(simulate(acquisition_module, rate, interrupt, args.duration,
+                                                       args.process_us, args.display_ms))
+            latency = np.array(sensor.latency or [0]) * 1000
+            print('%10d  %-9s  %8d  %6d  %6d  %5d  %5d  %12d  %8.1f  %10d  %8d  %8.1f / %.1f' % (
+                rate, 'interrupt' if interrupt else 'polling', sensor.produced, sensor.read_count, sensor.lost,
+                sensor.reads, sensor.empty_reads, sensor.transactions, sensor.read_count / max(sensor.reads, 1),
+                acquisition.interrupts, acquisition.timeouts, np.median(latency), latency.max()))
+            if interrupt and (sensor.lost or sensor.empty_reads):
+                failed = True
+
+    if failed:
+        raise SystemExit('Interrupt driven acquisition lost samples or read empty FIFO.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import argparse
+import asyncio
+import random
+import threading
+import time as timer
+from array import array
+import numpy as np
+import firmware
+from bench_display import clock_strings, TIME_PERIOD, BEAT_PERIOD
+from sh1106_model import Sh1106Model
+from sim_acquisition import SimulatedSensor, FIFO_DEPTH, Pin
+
+
+async def simulate(port, refresh_task, duration, rate, baudrate, seed=0):
+    """
+    Run ESP32 acquisition loop against simulated sensor for 'duration' s, with clock task drawing time every
+    TIME_PERIOD ms and the loop drawing work state and values with every beat. SPI writes block the loop for their bus
+    time at 'baudrate'. If 'refresh_task' is set, display is flushed by display task running Display.refresh,
+    otherwise by every show_time call, as it was before. Return sensor, Acquisition, Display, SPI bus stand-in and
+    check if panel shows the same pixels as the framebuffer.
+    """
+    pin = Pin(23)
+    sensor = SimulatedSensor(pin, rate=rate)
+    acquisition = firmware.load('acquisition', port).Acquisition(sensor, pin)
+    display = firmware.load('display', port).Display()
+    driver = display.display
+    spi = driver.spi
+    panel = Sh1106Model(driver.dc, driver.cs)
+    spi.device = panel
+    display.setup()
+    spi.reset_counters()
+    spi.baudrate = baudrate
+    spi.blocking = True
+    if not refresh_task:
+        # Count flushes show_time makes the same way refresh task counts its own ones.
+        show = driver.show
+
+        def counted_show():
+            if driver.dirty():
+                display.flushes += 1
+            show()
+        driver.show = counted_show
+
+    stop = threading.Event()
+    producer = threading.Thread(target=sensor.run, args=(stop,), daemon=True)
+    producer.start()
+    start = timer.perf_counter()
+
+    async def clock():
+        while True:
+            seconds = int(timer.perf_counter() - start)
+            time, date = clock_strings(12 * 3600 + seconds)
+            display.show_time(time, date, '1')
+            await asyncio.sleep(TIME_PERIOD / 1000)
+
+    tasks = [asyncio.create_task(clock())]
+    if refresh_task:
+        # Display task the way Monitor runs it, flushing every 100 ms.
+        runtime = firmware.load('tasks', port).Runtime()
+        runtime.add('display', display.refresh, 100, priority=2)
+        tasks.append(asyncio.create_task(runtime.run()))
+
+    rng = random.Random(seed)
+    red_buf, ir_buf, time_buf = (array('i', FIFO_DEPTH * [0]) for i in range(3))
+    next_beat = start + BEAT_PERIOD / 1000
+    end = start + duration
+    while timer.perf_counter() < end:
+        await acquisition.read(red_buf, ir_buf, time_buf, 0)
+        if timer.perf_counter() >= next_beat:
+            # Work state clears lower part of display, so all values are drawn again and most of pages are sent.
+            next_beat += BEAT_PERIOD / 1000
+            display.work_state()
+            display.show_values(rng.randint(60, 90), rng.choice((96.5, 97.0, 97.25, 98.0)), 36.6)
+            display.show_alarm(rng.choice((0, 2)))
+
+    stop.set()
+    producer.join()
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Send what was drawn after the last flush, then check the panel.
+    spi.blocking = False
+    driver.show()
+    spi.device = None
+    return sensor, acquisition, display, spi, panel.screen() == bytes(driver.buffer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sensor read jitter of ESP32 acquisition loop while display is '
+                                                 'flushed by every show_time call or by display task, on simulated '
+                                                 'sensor and blocking SPI bus.')
+    parser.add_argument('--duration', type=float, default=10, help='Time of every simulation in s.')
+    parser.add_argument('--rate', type=int, default=400, help='Sensor sample rate, in sps.')
+    parser.add_argument('--baudrate', type=int, default=1000000, help='SPI clock in Hz. Slow bus makes flush longer.')
+    args = parser.parse_args()
+
+    print('flush        SPI bytes/s  transactions/s  flushes/s  page write max [ms]  wake p50/p99/max [ms]  '
+          'counted max [ms]  lost  panel matches')
+    failed = False
+    seconds = args.duration
+    for refresh_task in (False, True):
+        sensor, acquisition, display, spi, matches = asyncio.run(
+            simulate('ESP32', refresh_task, args.duration, args.rate, args.baudrate))
+        latency = np.array(sensor.latency or [0]) * 1000
+        timing = display.timing()
+        print('%-11s  %11.0f  %14.1f  %9.1f  %19.2f  %7.2f / %.2f / %.2f  %16.2f  %4d  %s' % (
+            'task' if refresh_task else 'show_time', spi.bytes / seconds, spi.transactions / seconds,
+            display.flushes / seconds, timing['block_max'] / 1000, np.median(latency), np.percentile(latency, 99),
+            latency.max(), acquisition.timing()['latency_max'] / 1000, sensor.lost, matches))
+        failed |= not matches or (refresh_task and sensor.lost > 0)
+
+    if failed:
+        raise SystemExit('Display shows other pixels than framebuffer keeps, or samples were lost.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+import argparse
+import asyncio
+import threading
+import time as timer
+import firmware
+import ppg
+from max30102_model import Max30102Model, ADDRESS
+from sh1106_model import Sh1106Model
+
+# machine stand-in firmware drivers make their buses and pins from.
+machine = firmware.stand_in('machine')
+
+
+class RealTimeSensor:
+    def __init__(self, model):
+        """
+        Initiation of RealTimeSensor, taking the place of MAX30102 model on I2C stand-in. Thread moves simulated time
+        of the model on in real time, so samples are measured while the loop runs or is blocked, as on device. Bus and
+        thread take turns at the model.
+        """
+        self.model = model
+        self.lock = threading.Lock()
+
+    def read(self, register, nbytes):
+        with self.lock:
+            return self.model.read(register, nbytes)
+
+    def write(self, register, data):
+        with self.lock:
+            self.model.write(register, data)
+
+    def run(self, stop):
+        """ Move model time on every 1 ms until 'stop' event is set. """
+        start = timer.perf_counter()
+        while not stop.is_set():
+            timer.sleep(0.001)
+            with self.lock:
+                self.model.advance((timer.perf_counter() - start) * 1000 - self.model.now)
+
+
+class Broker:
+    def __init__(self, publish_ms):
+        """
+        Initiation of Broker, taking the place of Wireless. Every publish blocks the loop for 'publish_ms' ms, as MQTT
+        publish over WiFi does on device. Messages published are kept as (subtopic, data) pairs.
+        """
+        self.publish_ms = publish_ms
+        self.messages = []
+
+    def wifi_status(self):
+        return True
+
+    def mqtt_status(self):
+        return True
+
+    def publish(self, data, subtopic=None):
+        timer.sleep(self.publish_ms / 1000)
+        self.messages.append((subtopic, data))
+
+
+async def simulate(port, stream, duration, publish_ms, baudrate, work_profile, options):
+    """
+    Run tasks of Monitor of given port for 'duration' s against MAX30102 model measuring 'stream' in real time, display
+    model on SPI bus blocking for its bus time at 'baudrate', and broker blocking for 'publish_ms' ms on every publish.
+    Return Monitor, sensor model, broker and check if display shows the same pixels as the framebuffer.
+    """
+    pin = machine.Pin(23)
+    model = Max30102Model(stream, pin=pin)
+    device = RealTimeSensor(model)
+    machine.I2C.devices[ADDRESS] = device
+
+    sensor = firmware.load('max30102', port).Max30102()
+    temperature_monitor = firmware.load('temperature', port).Temperature(sensor, period=10000)
+    algorithm = firmware.load('algorithm', port).HrSpOalgorithm(**options)
+    display = firmware.load('display', port).Display()
+    led = firmware.load('led', port).Led()
+    data = firmware.load('data', port).Data()
+    broker = Broker(publish_ms)
+    clock = firmware.load('clock', port).Clock()
+    clock.set()
+
+    driver = display.display
+    spi = driver.spi
+    panel = Sh1106Model(driver.dc, driver.cs)
+    spi.device = panel
+    display.setup()
+    spi.baudrate = baudrate
+    spi.blocking = True
+
+    monitor_module = firmware.load('monitor', port)
+    arguments = ('1', broker, sensor)
+    if port == 'ESP32':
+        arguments += (firmware.load('acquisition', port).Acquisition(sensor, pin),)
+    monitor = monitor_module.Monitor(*arguments, algorithm, temperature_monitor, display, led, data, clock,
+                                     work_profile=work_profile)
+
+    stop = threading.Event()
+    thread = threading.Thread(target=device.run, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        await asyncio.wait_for(monitor.run(), duration)
+    except asyncio.TimeoutError:
+        pass
+    stop.set()
+    thread.join()
+    del machine.I2C.devices[ADDRESS]
+
+    # Send what was drawn after the last flush, then check the panel.
+    spi.blocking = False
+    driver.show()
+    spi.device = None
+    return monitor, model, broker, panel.screen() == bytes(driver.buffer)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deadline misses of every task of firmware runtime (acquisition, '
+                                                 'algorithm, display, clock, uplink), run by CPython asyncio against '
+                                                 'sensor and display models and blocking MQTT broker.')
+    parser.add_argument('--port', default='ESP32', choices=firmware.PORTS)
+    parser.add_argument('--duration', type=float, default=20, help='Time of simulation in s.')
+    parser.add_argument('--publish-ms', type=float, default=50, help='Time every MQTT publish blocks the loop for.')
+    parser.add_argument('--baudrate', type=int, default=1000000, help='SPI clock of display in Hz.')
+    parser.add_argument('--profile', default='normal', help='Sensor profile used while a body is detected.')
+    parser.add_argument('--noise', type=float, default=100, help='Noise of every ADC sample, in sensor counts.')
+    args = parser.parse_args()
+
+    options = {'fixed_point': True} if args.port == 'ESP8266' else {}
+    stream = ppg.generate(duration=args.duration + 5, rate=400, noise=args.noise)
+    monitor, model, broker, matches = asyncio.run(simulate(args.port, stream, args.duration, args.publish_ms,
+                                                           args.baudrate, args.profile, options))
+
+    print('task         priority  period [ms]  deadline [ms]  runs/s  misses  skipped  response max [ms]')
+    for task in monitor.runtime.tasks:
+        print('%-11s  %8d  %11s  %13d  %6.1f  %6d  %7d  %17d' % (
+            task.name, task.priority, task.period or 'released', task.deadline, task.runs / args.duration,
+            task.misses, task.skipped, task.response_max))
+    print()
+    # Loop metrics device publishes every minute, collected over whole simulation.
+    metrics = monitor.metrics.snapshot()
+    print('metric      count  max [us]')
+    for name in firmware.load('metrics', args.port).names:
+        print('%-9s  %6d  %8d' % (name, sum(metrics[name][:-1]), metrics[name][-1]))
+    print('errors: %s' % ', '.join('%s %d' % error for error in metrics['errors'].items()))
+    print()
+    print('samples produced %d, lost %d, handed to algorithm late %d, messages published %d, panel matches %s' % (
+        model.produced, model.lost, monitor.overruns, len(broker.messages), matches))
+
+    if model.lost or not matches:
+        raise SystemExit('Sensor FIFO overflowed, or display shows other pixels than framebuffer keeps.')
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,10 @@ import os
 import pathlib
 from tkinter import ttk
 from graph import Plot
+import wire
+
+# Subtopics of device counters published with every batch: sensor reads, loop timing and runtime of tasks.
+COUNTER_SUBTOPICS = ('sensor', 'loop', 'tasks')
 
 class Page(tk.Frame):
     def __init__(self, client_id, update_time, *args, **kwargs):
@@ -28,6 +32,8 @@ class Page(tk.Frame):
         self.logs_init()
         self.buttons_init()
         self.connected_label_init()
+        self.metrics_init()
+        self.counters_init()
 
         # Graph is not visible by default.
         self.graph_visible = False
@@ -63,7 +69,7 @@ class Page(tk.Frame):
                 return
             if self.new_message:
                 self.new_message = False
-                self.data = json.loads(self.data)
+                self.data = wire.decode(self.data)
                 self.data_split()
                 self.data_buf_extend()
                 self.pack_size_check()
@@ -75,6 +81,12 @@ class Page(tk.Frame):
                 self.log_to_file()
             else:
                 pass
+            if self.new_metrics:
+                self.new_metrics = False
+                self.metrics_update(json.loads(self.metrics))
+            if self.new_counters:
+                self.new_counters = False
+                self.counters_update({name: json.loads(payload) for name, payload in list(self.counters.items())})
         else:
             pass
 
@@ -92,26 +104,44 @@ class Page(tk.Frame):
         self.client.connect(self.broker)
         self.topic = ''
         self.new_message = False
+        self.new_metrics = False
+        self.counters = {}
+        self.new_counters = False
         self.pack_size = 0
         self.connected = False
 
     def on_message(self, client, userdata, message):
         """
         This function is called automatically by MQTT Client everytime new message is received. It switches new message
-        flag to True and saves decoded data.
+        flag to True and saves data received. Data is decoded by wire.decode, as it is sent as binary or JSON batch.
+        Loop metrics of device come on 'metrics' subtopic, and have their own flag. Counters come on COUNTER_SUBTOPICS,
+        the latest one of each is kept, and they have their own flag too.
         """
+        if message.topic == self.topic + '/metrics':
+            self.new_metrics = True
+            self.metrics = message.payload.decode("utf-8")
+            return
+        for subtopic in COUNTER_SUBTOPICS:
+            if message.topic == self.topic + '/' + subtopic:
+                self.counters[subtopic] = message.payload.decode("utf-8")
+                self.new_counters = True
+                return
         self.new_message = True
-        self.data = message.payload.decode("utf-8")
+        self.data = message.payload
 
     def connect(self):
         """
         Connect function which actually works more like subscribe, because client is connected to broker all the
-        time. It starts from disconnect function, then set the topic, susbcribes it and changes connected flag. At the
-        end it shows calls function responsible for showing 'Connected' label.
+        time. It starts from disconnect function, then set the topic, susbcribes it, together with metrics and counters
+        subtopics, and changes connected flag. At the end it shows calls function responsible for showing 'Connected'
+        label.
         """
         self.disconnect()
         self.set_topic()
         self.client.subscribe(self.topic)
+        self.client.subscribe(self.topic + '/metrics')
+        for subtopic in COUNTER_SUBTOPICS:
+            self.client.subscribe(self.topic + '/' + subtopic)
         self.connected = True
         self.connected_label_show()
 
@@ -123,6 +153,9 @@ class Page(tk.Frame):
         """
         try:
             self.client.unsubscribe(self.topic)
+            self.client.unsubscribe(self.topic + '/metrics')
+            for subtopic in COUNTER_SUBTOPICS:
+                self.client.unsubscribe(self.topic + '/' + subtopic)
         except ValueError:
             pass
         self.connected = False
@@ -234,6 +267,104 @@ class Page(tk.Frame):
     def connected_label_hide(self):
         self.connected_label.place_forget()
 
+    def metrics_init(self):
+        """
+        Setup table of loop metrics device publishes every minute: amount of times measured, median, 95th percentile
+        and the longest of them, for every kind of time, errors counted by device since its start and heap statistics.
+        It is placed where graph is, so it is covered while graph is shown.
+        """
+        self.metrics_table = ttk.Treeview(self, selectmode='none', style='Treeview', height=6)
+        self.metrics_table["columns"] = ("1", "2", "3", "4", "5")
+        self.metrics_table['show'] = 'headings'
+        headings = ["Loop metrics", "Count", "Median [ms]", "95% [ms]", "Max [ms]"]
+        for id in self.metrics_table["columns"]:
+            self.metrics_table.column(id, width=120, anchor='c')
+            self.metrics_table.heading(id, text=headings[int(id) - 1])
+        self.metrics_table.place(x=775, y=55, width=600, height=150)
+
+        self.metrics_errors = ttk.Label(self, text='', font=(self.font, 12, 'normal'))
+        self.metrics_errors.place(x=775, y=210, height=25, width=600)
+        self.metrics_heap = ttk.Label(self, text='', font=(self.font, 12, 'normal'))
+        self.metrics_heap.place(x=775, y=235, height=25, width=600)
+
+    @staticmethod
+    def bucket_percentile(bounds, counts, fraction):
+        """
+        Get upper bound in ms of histogram bucket 'fraction' of all counts fall into. Times above the last bound are
+        shown as longer than it.
+        """
+        total = sum(counts)
+        amount = 0
+        for bound, count in zip(bounds, counts):
+            amount += count
+            if amount >= fraction * total:
+                return "%.2f" % (bound / 1000)
+        return "> %.2f" % (bounds[-1] / 1000)
+
+    def metrics_update(self, metrics):
+        """
+        Update metrics table with snapshot received. Every histogram is sent as counts of its buckets, whose upper
+        bounds in us are sent too, followed by the longest time in us.
+        """
+        self.metrics_table.delete(*self.metrics_table.get_children())
+        bounds = metrics['bounds']
+        for name in ('iteration', 'overshoot', 'i2c', 'flush', 'publish', 'gc'):
+            counts = metrics[name][:-1]
+            if sum(counts) == 0:
+                values = (name, 0, '-', '-', '-')
+            else:
+                values = (name,
+                          sum(counts),
+                          self.bucket_percentile(bounds, counts, 0.5),
+                          self.bucket_percentile(bounds, counts, 0.95),
+                          "%.2f" % (metrics[name][-1] / 1000))
+            self.metrics_table.insert("", 'end', values=values)
+
+        errors = ', '.join(f'{name}: {count}' for name, count in metrics['errors'].items())
+        self.metrics_errors.configure(text=f'Errors since start - {errors}, window {metrics["window"] // 1000} s')
+
+        heap = metrics['heap']
+        self.metrics_heap.configure(text=f'Heap [B] - free {heap["free"]} (min {heap["free_min"]}), '
+                                         f'allocated {heap["alloc"]} (max {heap["alloc_max"]}), '
+                                         f'collections {heap["collections"]}')
+
+    def counters_init(self):
+        """
+        Setup labels of sensor and loop counters and table of tasks counters device publishes with every batch. They
+        are placed below metrics, so they are covered while graph is shown as well.
+        """
+        self.counters_sensor = ttk.Label(self, text='', font=(self.font, 12, 'normal'))
+        self.counters_sensor.place(x=775, y=260, height=25, width=600)
+        self.counters_loop = ttk.Label(self, text='', font=(self.font, 12, 'normal'))
+        self.counters_loop.place(x=775, y=285, height=25, width=600)
+
+        self.tasks_table = ttk.Treeview(self, selectmode='none', style='Treeview', height=5)
+        self.tasks_table["columns"] = ("1", "2", "3", "4", "5")
+        self.tasks_table['show'] = 'headings'
+        headings = ["Task", "Runs", "Misses", "Skipped", "Max [ms]"]
+        for id in self.tasks_table["columns"]:
+            self.tasks_table.column(id, width=120, anchor='c')
+            self.tasks_table.heading(id, text=headings[int(id) - 1])
+        self.tasks_table.place(x=775, y=315, width=600, height=130)
+
+    def counters_update(self, counters):
+        """
+        Update counters with the latest ones received, by subtopic: samples read and lost by sensor FIFO overflow,
+        loop timing (times in us), and runs, deadline misses, skipped periods and the longest response time in ms of
+        every task.
+        """
+        if 'sensor' in counters:
+            sensor = counters['sensor']
+            self.counters_sensor.configure(text=f'Sensor - samples read {sensor["read"]}, lost {sensor["lost"]}, '
+                                                f'overflows {sensor["overflows"]}')
+        if 'loop' in counters:
+            loop = ', '.join(f'{name}: {value}' for name, value in counters['loop'].items())
+            self.counters_loop.configure(text=f'Loop - {loop}')
+        if 'tasks' in counters:
+            self.tasks_table.delete(*self.tasks_table.get_children())
+            for name, values in counters['tasks'].items():
+                self.tasks_table.insert("", 'end', values=(name, *values))
+
     def logs_init(self):
         """
         Setup logs. Actually logs are treeview with scrollbar added on the left side, responsible for changing treeview
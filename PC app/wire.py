@@ -0,0 +1,84 @@
+import json
+import numpy as np
+
+# Versions of binary batch format this decoder reads: fixed width records, and columns of varint differences. JSON
+# batch starts with '[' instead of version byte.
+VERSION = 1
+DELTA_VERSION = 2
+
+# Header and record of binary batch, the same as ustruct formats of device (see wire.py in ESP8266 directory).
+HEADER = np.dtype([('version', 'u1'), ('device_id', '<u2'), ('epoch', '<u4'), ('base', '<u4'), ('offset', '<i2'),
+                   ('count', '<u2')])
+RECORD = np.dtype([('delta', '<u2'), ('hr', 'u1'), ('spo2', '<u2'), ('temperature', '<i2'), ('alarm', 'u1')])
+
+# Header of delta batch is followed by flags. Flag set if alarm column is sent as (run length, alarm code) pairs.
+DELTA_HEADER = np.dtype(HEADER.descr + [('flags', 'u1')])
+RLE_ALARMS = 1
+
+# Alarm bits set by device, and strings these were sent as in JSON batches.
+ALARMS = ((1, 'HR_TOO_LOW|'), (2, 'HR_TOO_HIGH|'), (4, 'SPO2_TOO_LOW|'), (8, 'TEMP_TOO_HIGH'))
+
+
+def alarm_name(code):
+    """ Get alarm string of alarm 'code', the same one device sends in JSON batch. '-' means no alarm. """
+    return ''.join(name for bit, name in ALARMS if code & bit) or '-'
+
+
+def read_varints(data):
+    """
+    Read all zigzag mapped LEB128 varints (see wire.py of device) of 'data' array of bytes at once. Every varint ends
+    with byte whose highest bit is clear. Return array of values.
+    """
+    ends = np.flatnonzero(data < 0x80)
+    starts = np.concatenate(([0], ends[:-1] + 1))
+    # Every byte carries 7 bits, shifted by 7 bits more than the previous byte of the same varint.
+    shifts = 7 * (np.arange(len(data)) - np.repeat(starts, ends - starts + 1))
+    values = np.add.reduceat((data & 0x7F).astype(np.int64) << shifts, starts)
+    return (values >> 1) ^ -(values & 1)
+
+
+def decode(payload):
+    """
+    Decode batch received from device, binary or JSON one. Return seven lists, the same as JSON batch keeps: dates
+    (dd.mm.yyyy), local times (hh:mm:ss), beat times in ms since clock origin of device, hr, spo2, temperature and alarm
+    strings. Records or columns of binary batch are read at once by NumPy, and date and time strings are made from
+    epoch of clock origin and beat times.
+    """
+    if isinstance(payload, str):
+        payload = payload.encode('utf-8')
+    if payload[:1] == b'[':
+        return json.loads(payload)
+
+    version = payload[0]
+    if version == VERSION:
+        header = np.frombuffer(payload, dtype=HEADER, count=1)[0]
+        records = np.frombuffer(payload, dtype=RECORD, count=int(header['count']), offset=HEADER.itemsize)
+        times = int(header['base']) + np.cumsum(records['delta'], dtype=np.int64)
+        hr = records['hr']
+        spo2 = records['spo2']
+        temperature = records['temperature']
+        alarms = records['alarm']
+    elif version == DELTA_VERSION:
+        header = np.frombuffer(payload, dtype=DELTA_HEADER, count=1)[0]
+        count = int(header['count'])
+        values = read_varints(np.frombuffer(payload, dtype=np.uint8, offset=DELTA_HEADER.itemsize))
+        # Every column is sent as differences between consecutive values, so summing them up gives values back.
+        columns = np.cumsum(values[:4 * count].reshape(4, count), axis=1)
+        times = int(header['base']) + columns[0]
+        hr, spo2, temperature = columns[1:]
+        alarms = values[4 * count:]
+        if header['flags'] & RLE_ALARMS:
+            alarms = np.repeat(alarms[1::2], alarms[0::2])
+    else:
+        raise ValueError(f"Unknown batch version: {version}")
+
+    # Local time of every beat as 'yyyy-mm-ddThh:mm:ss' strings.
+    local = (int(header['epoch']) + int(header['offset']) * 60) * 1000 + times
+    stamps = np.datetime_as_string(local.astype('datetime64[ms]'), unit='s').tolist()
+    return [[f'{stamp[8:10]}.{stamp[5:7]}.{stamp[:4]}' for stamp in stamps],
+            [stamp[11:] for stamp in stamps],
+            times.tolist(),
+            hr.tolist(),
+            (spo2 / 100).tolist(),
+            (temperature / 100).tolist(),
+            [alarm_name(code) for code in alarms.tolist()]]